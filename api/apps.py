@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from .health import connection_stats
+        connection_created.connect(connection_stats.connection_created)
+        request_started.connect(connection_stats.request_started)
@@ -0,0 +1,203 @@
+"""
+Readiness probes for the load balancer.
+
+The database probe runs on the calling request thread, against the same
+persistent connection (CONN_MAX_AGE) the worker serves traffic with, under a
+statement timeout of READINESS_PROBE_TIMEOUT; reconnecting is bounded by the
+DATABASE_CONNECT_TIMEOUT setting. The other probes run on a small
+thread pool, bounded by the same timeout; a probe still hanging from an
+earlier run is reported as failed instead of being queued again, so a hung
+backend can't tie up the pool once it recovers. The combined result is
+cached per process for READINESS_CACHE_TTL seconds. Only one request runs
+the probes at a time; concurrent callers get the previous result rather
+than waiting, so a burst of health checks costs the backends at most one
+round of probes and a stuck probe blocks no other request.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from weakref import WeakKeyDictionary
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+
+# The database is required to serve traffic; storage only degrades uploads/downloads
+CRITICAL_PROBES = ('database',)
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='readiness-probe')
+_lock = threading.Lock()
+_cached = None
+# Latest future per pooled probe, to skip probes whose last run still hangs
+_running = {}
+
+
+def probe_database():
+    connection = connections['default']
+    # Drop a broken persistent connection so the probe reconnects the way
+    # the next request would; never close one mid-transaction
+    if connection.connection is not None and not connection.in_atomic_block and not connection.is_usable():
+        connection.close()
+    if connection.vendor != 'postgresql':
+        # No transaction: on SQLite it would take the write lock
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        return
+    with transaction.atomic(using='default'), connection.cursor() as cursor:
+        cursor.execute('SET LOCAL statement_timeout = %s', [int(settings.READINESS_PROBE_TIMEOUT * 1000)])
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def probe_storage():
+    client = getattr(default_storage, 'client', None)
+    bucket_name = getattr(default_storage, 'bucket_name', None)
+    if client is not None and bucket_name:
+        if not client.bucket_exists(bucket_name):
+            raise RuntimeError(f'Bucket {bucket_name} does not exist')
+    else:
+        default_storage.exists('readiness-probe')
+
+
+# Run on the request thread
+LOCAL_PROBES = {
+    'database': probe_database,
+}
+
+# Run on the probe pool
+PROBES = {
+    'storage': probe_storage,
+}
+
+
+def timed(probe):
+    start = time.perf_counter()
+    probe()
+    return time.perf_counter() - start
+
+
+def outcome(run):
+    try:
+        elapsed = run()
+    except FutureTimeout:
+        return {'ok': False, 'error': f'timed out after {settings.READINESS_PROBE_TIMEOUT}s'}
+    except Exception as error:
+        return {'ok': False, 'error': f'{type(error).__name__}: {error}'[:200]}
+    return {'ok': True, 'latency_ms': round(elapsed * 1000, 2)}
+
+
+def submit(name, probe):
+    """
+    Start a pooled probe, or return None if its previous run hasn't finished
+    """
+    previous = _running.get(name)
+    if previous is not None and not previous.done():
+        return None
+    _running[name] = _executor.submit(timed, probe)
+    return _running[name]
+
+
+def run_probes():
+    timeout = settings.READINESS_PROBE_TIMEOUT
+    futures = {name: submit(name, probe) for name, probe in PROBES.items()}
+    deadline = time.monotonic() + timeout
+    checks = {name: outcome(lambda: timed(probe)) for name, probe in LOCAL_PROBES.items()}
+    for name, future in futures.items():
+        if future is None:
+            checks[name] = {'ok': False, 'error': 'previous probe is still running'}
+        else:
+            checks[name] = outcome(lambda: future.result(timeout=max(deadline - time.monotonic(), 0)))
+
+    if all(check['ok'] for check in checks.values()):
+        status = 'ready'
+    elif all(checks[name]['ok'] for name in CRITICAL_PROBES):
+        status = 'degraded'
+    else:
+        status = 'unavailable'
+    return {'status': status, 'checks': checks, 'checked_at': time.time()}
+
+
+def readiness():
+    """
+    Return the cached probe result, re-running the probes once it expires.
+    The second value tells whether the result came from the cache.
+    """
+    global _cached
+    cached = _cached
+    if cached is not None and time.monotonic() - cached[0] < settings.READINESS_CACHE_TTL:
+        return cached[1], True
+    # While another request probes, answer with the previous result instead
+    # of queueing behind a probe that may be stuck on a dead backend
+    if cached is not None:
+        acquired = _lock.acquire(blocking=False)
+    else:
+        acquired = _lock.acquire(timeout=settings.READINESS_PROBE_TIMEOUT * 2)
+    if not acquired:
+        if cached is not None:
+            return cached[1], True
+        return {'status': 'unavailable', 'checks': {}, 'error': 'probes in progress', 'checked_at': time.time()}, False
+    try:
+        if _cached is not None and _cached is not cached:
+            # Refreshed by the request that held the lock
+            return _cached[1], True
+        result = run_probes()
+        _cached = (time.monotonic(), result)
+        return result, False
+    finally:
+        _lock.release()
+
+
+def reset():
+    global _cached
+    with _lock:
+        _cached = None
+        _running.clear()
+
+
+class ConnectionStats:
+    """
+    Per-process counts of new database connections versus requests served,
+    showing how well persistent connections (CONN_MAX_AGE) are reused
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._opened_at = WeakKeyDictionary()
+        self.connections_opened = 0
+        self.requests = 0
+
+    def connection_created(self, sender, connection, **kwargs):
+        with self._lock:
+            self._opened_at[connection] = time.monotonic()
+            self.connections_opened += 1
+
+    def request_started(self, sender, **kwargs):
+        with self._lock:
+            self.requests += 1
+
+    def snapshot(self):
+        """
+        Stats for this process plus the age of the calling thread's connections
+        """
+        result = {}
+        for alias in connections:
+            connection = connections[alias]
+            opened_at = self._opened_at.get(connection) if connection.connection is not None else None
+            result[alias] = {
+                'vendor': connection.vendor,
+                'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE'),
+                'conn_health_checks': connection.settings_dict.get('CONN_HEALTH_CHECKS'),
+                'connected': connection.connection is not None,
+                'age_seconds': round(time.monotonic() - opened_at, 3) if opened_at is not None else None,
+            }
+        with self._lock:
+            opened, requests = self.connections_opened, self.requests
+        return {
+            'connections': result,
+            'connections_opened': opened,
+            'requests': requests,
+            'requests_per_connection': round(requests / opened, 2) if opened else None,
+        }
+
+
+connection_stats = ConnectionStats()
@@ -0,0 +1,85 @@
+import hashlib
+
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+FINGERPRINT_NAME = '.collectstatic-fingerprint'
+
+
+def pending_migrations(using=DEFAULT_DB_ALIAS):
+    executor = MigrationExecutor(connections[using])
+    return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+def static_fingerprint():
+    """
+    Digest of every file collectstatic would copy (path and content)
+    """
+    digest = hashlib.sha256()
+    found = []
+    for finder in finders.get_finders():
+        for path, storage in finder.list(['CVS', '.*', '*~']):
+            found.append((path, storage))
+    # First match wins in collectstatic too
+    seen = set()
+    for path, storage in sorted(found, key=lambda item: item[0]):
+        if path in seen:
+            continue
+        seen.add(path)
+        digest.update(path.encode())
+        with storage.open(path) as source:
+            digest.update(hashlib.sha256(source.read()).digest())
+    return digest.hexdigest()
+
+
+def stored_fingerprint():
+    if not staticfiles_storage.exists(FINGERPRINT_NAME):
+        return None
+    with staticfiles_storage.open(FINGERPRINT_NAME) as stored:
+        return stored.read().decode().strip()
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the deploy-time tasks once per release: apply pending migrations and "
+        "collect static files, skipping each when there is nothing to do"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--skip-migrate', action='store_true',
+            help="Don't check for unapplied migrations",
+        )
+        parser.add_argument(
+            '--skip-collectstatic', action='store_true',
+            help="Don't check whether static files changed",
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Run both tasks even if nothing changed",
+        )
+
+    def handle(self, *args, skip_migrate=False, skip_collectstatic=False, force=False, **options):
+        if not skip_migrate:
+            plan = pending_migrations()
+            if plan or force:
+                self.stdout.write(f"Applying {len(plan)} migration(s)")
+                call_command('migrate', interactive=False, verbosity=0)
+            else:
+                self.stdout.write("No pending migrations")
+
+        if not skip_collectstatic:
+            fingerprint = static_fingerprint()
+            if force or fingerprint != stored_fingerprint():
+                self.stdout.write("Collecting static files")
+                call_command('collectstatic', interactive=False, verbosity=0)
+                if staticfiles_storage.exists(FINGERPRINT_NAME):
+                    staticfiles_storage.delete(FINGERPRINT_NAME)
+                staticfiles_storage.save(FINGERPRINT_NAME, ContentFile(fingerprint.encode()))
+            else:
+                self.stdout.write("Static files are up to date")
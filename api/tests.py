@@ -1,3 +1,289 @@
-from django.test import TestCase
+import io
+import os
+import runpy
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework import parsers, renderers, serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APIClient
+
+from api import health
+from core.parsers import JSONParser
+from core.renderers import JSONRenderer
+from core.storage import MinioMediaStorage
+from core.metrics import registry as metrics_registry
+from tasks.models import Task
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        metrics_registry.reset()
+        Task.objects.create(title='Instrumented')
+
+    def metrics(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_requests_are_recorded_per_view(self):
+        self.client.get(reverse('task-list'))
+        self.client.get(reverse('task-list'))
+
+        body = self.metrics()
+
+        labels = 'view="task-list",method="GET",status="200"'
+        self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 2', body)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2', body)
+        self.assertIn(f'http_request_db_queries_bucket{{{labels},le="0"}} 0', body)
+        self.assertRegex(body, rf'http_request_db_seconds_total\{{{labels}\}} [0-9.e-]+')
+        self.assertRegex(body, rf'http_request_serializer_seconds_total\{{{labels}\}} [0-9.e-]+')
+
+    def test_values_serializer_time_is_recorded_without_patching_drf(self):
+        self.client.get(reverse('task-list'))
+
+        labels = ('task-list', 'GET', '200')
+        self.assertGreater(metrics_registry.serializer_time[labels], 0)
+        self.assertEqual(serializers.Serializer.data.fget.__module__, 'rest_framework.serializers')
+
+    async def test_async_requests_are_recorded(self):
+        response = await AsyncClient().get(reverse('async-conversation-list'))
+
+        self.assertEqual(response.status_code, 200)
+        labels = 'view="async-conversation-list",method="GET",status="200"'
+        self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 1', metrics_registry.render())
+
+    def test_unresolved_paths_share_one_label(self):
+        self.client.get('/no/such/path/')
+        self.client.get('/another/missing/path/')
+
+        self.assertIn('view="<unresolved>",method="GET",status="404"} 2', self.metrics())
+
+    @override_settings(METRICS_SLOW_REQUEST_THRESHOLD=0, METRICS_SLOW_REQUEST_SAMPLE_RATE=1)
+    def test_slow_requests_are_logged_with_their_sql(self):
+        with self.assertLogs('core.metrics', 'WARNING') as logs:
+            self.client.get(reverse('task-list'))
+
+        self.assertIn('Slow request GET /tasks/', logs.output[0])
+        self.assertIn('FROM "tasks_task"', logs.output[0])
+
+
+@override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class ReadinessTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        health.reset()
+
+    def test_ready_when_probes_pass(self):
+        response = self.client.get(reverse('readiness'))
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['status'], 'ready')
+        self.assertEqual(set(body['checks']), {'database', 'storage'})
+        self.assertTrue(all(check['ok'] for check in body['checks'].values()))
+        self.assertFalse(body['cached'])
+        self.assertIn('default', body['connections'])
+        self.assertIn('requests_per_connection', body)
+
+    def test_results_are_cached(self):
+        probe = mock.Mock()
+        with mock.patch.dict(health.PROBES, storage=probe):
+            self.client.get(reverse('readiness'))
+            response = self.client.get(reverse('readiness'))
+
+        self.assertTrue(response.json()['cached'])
+        probe.assert_called_once_with()
+
+    @override_settings(READINESS_PROBE_TIMEOUT=0.05)
+    def test_slow_storage_degrades(self):
+        with mock.patch.dict(health.PROBES, storage=lambda: time.sleep(0.5)):
+            response = self.client.get(reverse('readiness'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'degraded')
+        self.assertIn('timed out', response.json()['checks']['storage']['error'])
+
+    def test_database_failure_is_unavailable(self):
+        def broken():
+            raise OSError('connection refused')
+
+        with mock.patch.dict(health.LOCAL_PROBES, database=broken):
+            response = self.client.get(reverse('readiness'))
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['checks']['database']['error'], 'OSError: connection refused')
+
+    def test_database_probe_checks_the_request_threads_connection(self):
+        # connections is thread-local: only the calling thread's wrapper is patched
+        connection = connections['default']
+        with mock.patch.object(connection, 'cursor', wraps=connection.cursor) as cursor:
+            result = health.run_probes()
+
+        cursor.assert_called()
+        self.assertTrue(result['checks']['database']['ok'])
+        self.assertIsNotNone(connection.connection)
+
+    @override_settings(READINESS_CACHE_TTL=0)
+    def test_concurrent_callers_get_the_previous_result(self):
+        previous, _ = health.readiness()
+        probing = threading.Event()
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def slow():
+            probing.set()
+            release.wait(5)
+
+        # The probing thread can't take SQLite's write lock from this test's transaction
+        with mock.patch.dict(health.PROBES, storage=slow), mock.patch.dict(health.LOCAL_PROBES, database=lambda: None):
+            thread = threading.Thread(target=health.readiness)
+            thread.start()
+            self.assertTrue(probing.wait(5))
+            result, cached = health.readiness()
+            release.set()
+            thread.join(5)
+
+        self.assertIs(result, previous)
+        self.assertTrue(cached)
+
+    @override_settings(READINESS_PROBE_TIMEOUT=0.05)
+    def test_hung_probe_is_not_queued_again(self):
+        release = threading.Event()
+        probe = mock.Mock(side_effect=lambda: release.wait(5))
+        self.addCleanup(release.set)
+        with mock.patch.dict(health.PROBES, storage=probe):
+            health.run_probes()
+            result = health.run_probes()
+
+        probe.assert_called_once_with()
+        self.assertEqual(result['checks']['storage']['error'], 'previous probe is still running')
+        self.assertEqual(result['status'], 'degraded')
+
+
+class StartupCommandTests(TestCase):
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root, ignore_errors=True)
+        storages = {
+            'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        }
+        overrides = override_settings(STATIC_ROOT=self.static_root, STORAGES=storages)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def startup(self, *args):
+        output = StringIO()
+        call_command('startup', *args, stdout=output)
+        return output.getvalue()
+
+    def test_collects_static_files_only_when_they_change(self):
+        output = self.startup()
+        self.assertIn("No pending migrations", output)
+        self.assertIn("Collecting static files", output)
+        self.assertTrue(os.path.exists(os.path.join(self.static_root, 'rest_framework')))
+
+        self.assertIn("Static files are up to date", self.startup())
+
+        with open(os.path.join(self.static_root, '.collectstatic-fingerprint'), 'w') as marker:
+            marker.write('stale')
+        self.assertIn("Collecting static files", self.startup())
+
+
+class GunicornConfigTests(SimpleTestCase):
+    def load(self, **environ):
+        with mock.patch.dict(os.environ, environ), mock.patch('os.sched_getaffinity', return_value={0, 1, 2, 3}):
+            return runpy.run_path(os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'))
+
+    def test_workers_follow_cpu_count_and_worker_class(self):
+        self.assertEqual(self.load(GUNICORN_WORKER_CLASS='gthread')['workers'], 4)
+        self.assertEqual(self.load(GUNICORN_WORKER_CLASS='sync')['workers'], 9)
+
+        asgi = self.load(GUNICORN_WORKER_CLASS='uvicorn_worker.UvicornWorker', WEB_CONCURRENCY='3')
+        self.assertEqual(asgi['workers'], 3)
+        self.assertEqual(asgi['wsgi_app'], 'core.asgi:application')
+
+    def test_asgi_defaults_to_one_worker_with_the_in_process_broker(self):
+        worker_class = 'uvicorn_worker.UvicornWorker'
+        with mock.patch.dict(os.environ):
+            os.environ.pop('WEB_CONCURRENCY', None)
+            os.environ.pop('SUPPORT_EVENT_BROKER', None)
+            self.assertEqual(self.load(GUNICORN_WORKER_CLASS=worker_class)['workers'], 1)
+            shared = self.load(GUNICORN_WORKER_CLASS=worker_class, SUPPORT_EVENT_BROKER='myapp.events.RedisBroker')
+        self.assertEqual(shared['workers'], 4)
+
+
+class LeanBootTests(TestCase):
+    @override_settings(API_DOCS_ENABLED=False)
+    def test_index_describes_the_api_without_docs(self):
+        response = APIClient().get(reverse('index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['endpoints']['health_check'], '/api/health/')
+
+    @override_settings(MINIO_STORAGE_MEDIA_BUCKET_NAME='media', MINIO_STORAGE_ACCESS_KEY='key',
+                       MINIO_STORAGE_SECRET_KEY='secret')
+    def test_minio_bucket_is_checked_on_first_use(self):
+        with mock.patch('minio.Minio.bucket_exists', return_value=True) as bucket_exists:
+            storage = MinioMediaStorage()
+            bucket_exists.assert_not_called()
+
+            storage.client
+            checks = bucket_exists.call_count
+            storage.client
+        self.assertGreater(checks, 0)
+        self.assertEqual(bucket_exists.call_count, checks)
+        bucket_exists.assert_called_with('media')
+
+
+class JSONTests(SimpleTestCase):
+    data = {
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'text': 'Grüße \u2028 line \u2029 paragraph 🚀',
+        'at': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+        'amount': Decimal('12.50'),
+        'label': gettext_lazy('Open'),
+        'nested': [{'count': 3, 'ratio': 0.25, 'ok': True, 'none': None}, ('a', 'b')],
+    }
+
+    def test_renders_the_same_bytes_as_drf(self):
+        expected = renderers.JSONRenderer().render(self.data)
+        self.assertEqual(JSONRenderer().render(self.data), expected)
+        self.assertIn(b'\\u2028', expected)
+        self.assertIn(b'"2024-05-01T12:30:15.123456Z"', expected)
+
+    def test_falls_back_to_the_stdlib(self):
+        big = {'value': 2 ** 70}
+        self.assertEqual(JSONRenderer().render(big), renderers.JSONRenderer().render(big))
+        indented = JSONRenderer().render({'a': 1}, 'application/json; indent=4')
+        self.assertEqual(indented, renderers.JSONRenderer().render({'a': 1}, 'application/json; indent=4'))
+        self.assertEqual(JSONRenderer().render(None), b'')
+
+    def test_parses_like_drf(self):
+        body = renderers.JSONRenderer().render({**self.data, 'big': 2 ** 70})
+        self.assertEqual(JSONParser().parse(io.BytesIO(body)), parsers.JSONParser().parse(io.BytesIO(body)))
+
+        for malformed in (b'{"a": ', b'{"a": NaN}'):
+            with self.assertRaises(ParseError) as expected:
+                parsers.JSONParser().parse(io.BytesIO(malformed))
+            with self.assertRaises(ParseError) as parsed:
+                JSONParser().parse(io.BytesIO(malformed))
+            self.assertEqual(parsed.exception.detail, expected.exception.detail)
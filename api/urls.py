@@ -1,8 +1,11 @@
 # api/urls.py
 
 from django.urls import path
-from .views import HealthCheckView
+from .views import HealthCheckView, ReadinessView, CacheStatsView, MetricsView
 
 urlpatterns = [
     path('health/', HealthCheckView.as_view(), name='health-check'),
+    path('ready/', ReadinessView.as_view(), name='readiness'),
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
@@ -3,8 +3,14 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from django.conf import settings
+from django.http import HttpResponse
 from django.shortcuts import redirect
 
+from core.cache import get_cache, stats as cache_stats
+from core.metrics import registry as metrics_registry
+from .health import connection_stats, readiness
+
 
 class HealthCheckView(APIView):
     """Health check endpoint for CapRover monitoring"""
@@ -18,6 +24,42 @@ class HealthCheckView(APIView):
         )
 
 
+class ReadinessView(APIView):
+    """Readiness check: probes the database and storage, 503 when the database is unusable"""
+    authentication_classes = []
+    permission_classes = []
+    
+    def get(self, request):
+        result, cached = readiness()
+        return Response(
+            dict(result, cached=cached, **connection_stats.snapshot()),
+            status=status.HTTP_503_SERVICE_UNAVAILABLE if result['status'] == 'unavailable' else status.HTTP_200_OK
+        )
+
+
+class CacheStatsView(APIView):
+    """Response cache hit/miss counters for this worker process"""
+    authentication_classes = []
+    permission_classes = []
+    
+    def get(self, request):
+        return Response({
+            "backend": type(get_cache()).__name__,
+            "timeout": settings.RESPONSE_CACHE_TIMEOUT,
+            "enabled": settings.RESPONSE_CACHE_ENABLED,
+            "namespaces": cache_stats.snapshot(),
+        })
+
+
+class MetricsView(APIView):
+    """Request latency and SQL metrics of this worker process, in Prometheus text format"""
+    authentication_classes = []
+    permission_classes = []
+    
+    def get(self, request):
+        return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 class IndexView(APIView):
     """Root endpoint that provides API information"""
     authentication_classes = []
@@ -30,10 +72,12 @@ class IndexView(APIView):
             "description": "WOOOBA REST API using Django REST Framework",
             "endpoints": {
                 "health_check": "/api/health/",
-                "documentation": "/swagger/"
+                "readiness": "/api/ready/",
+                "metrics": "/api/metrics/",
             }
         }
-        # return Response(api_info)
-        # Alternatively, redirect to the Swagger UI:
+        if not settings.API_DOCS_ENABLED:
+            return Response(api_info)
+        # Redirect to the Swagger UI when it is served
         return redirect('schema-swagger-ui')
         
\ No newline at end of file
@@ -129,7 +129,7 @@ done
 
 # Test 9: Check response time with multiple tasks
 run_test "Response Time" \
-  "curl -s -X GET \"${BASE_URL}/tasks/v1/\" | jq 'length'" \
+  "curl -s -X GET \"${BASE_URL}/tasks/v1/\" | jq '.results | length'" \
   "" \
   "[ \$(cat) -gt 5 ] && echo true"
 
@@ -0,0 +1,6 @@
+"""
+Load-test and benchmark suite for the API.
+
+Run ``python -m benchmarks --help`` for options. Results are written as JSON
+so runs from different commits can be compared with ``--compare``.
+"""
@@ -0,0 +1,103 @@
+"""
+Command line entry point: ``python -m benchmarks --help``
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+
+IN_MEMORY_STORAGE = {'BACKEND': 'django.core.files.storage.InMemoryStorage'}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', help="Base URL of a running server; by default requests go through the "
+                                      "in-process Django test client against a throwaway test database")
+    parser.add_argument('--scale', default='', help="Dataset size, e.g. tasks=1000,conversations=200,messages=20")
+    parser.add_argument('--seed-data', action='store_true',
+                        help="--url only: write the --scale dataset into the server's database through the ORM "
+                             "before the run; by default the run reads the rows already there. Only for a "
+                             "dedicated benchmark database")
+    parser.add_argument('--scenarios', default='', help="Comma-separated subset of scenarios to run")
+    parser.add_argument('--list-scenarios', action='store_true', help="List scenarios and exit")
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help="Concurrent connections (--url only; the test client runs one request at a time)")
+    parser.add_argument('--requests', type=int, default=1000, help="Measured requests")
+    parser.add_argument('--warmup', type=int, default=50, help="Requests sent before measuring")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for the data and the request mix")
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    parser.add_argument('--compare', metavar='BASELINE', help="Compare against a previous JSON report")
+    options = parser.parse_args(argv)
+    if options.seed_data and not options.url:
+        parser.error("--seed-data needs --url; the test client always seeds its throwaway database")
+    return options
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    import django
+    django.setup()
+    from django.conf import settings
+
+    from . import runner, scenarios
+    from .client import HttpTransport, TestClientTransport
+    from .seed import Scale, load_existing, seed
+
+    if options.list_scenarios:
+        for scenario in scenarios.SCENARIOS + scenarios.ASYNC_SCENARIOS:
+            print(f'{scenario.name:<26}weight {scenario.weight}')
+        return 0
+
+    selected = scenarios.select(options.scenarios)
+    scale = Scale.parse(options.scale)
+    meta = {
+        'target': options.url or 'test-client',
+        'concurrency': options.concurrency if options.url else 1,
+        'requests': options.requests,
+        'warmup': options.warmup,
+        'seed': options.seed,
+        'scale': vars(scale) if options.seed_data or not options.url else None,
+        'scenarios': [scenario.name for scenario in selected],
+    }
+    run_options = {
+        'requests': options.requests, 'concurrency': meta['concurrency'],
+        'warmup': options.warmup, 'seed': options.seed,
+    }
+
+    if options.url:
+        # Seeding writes through the ORM into whatever database this process is configured
+        # for, so it only happens when asked for
+        dataset = seed(scale, random.Random(options.seed)) if options.seed_data else load_existing()
+        samples, duration = runner.run(HttpTransport(options.url), selected, dataset, **run_options)
+    else:
+        from django.db import connection
+        from django.test.utils import override_settings, setup_test_environment
+        setup_test_environment()
+        # Attachment files stay in memory rather than reaching MinIO
+        override_settings(STORAGES=dict(settings.STORAGES, default=IN_MEMORY_STORAGE)).enable()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            dataset = seed(scale, random.Random(options.seed))
+            samples, duration = runner.run(TestClientTransport(), selected, dataset, **run_options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    report = runner.build_report(samples, duration, meta)
+    print('\n'.join(runner.format_report(report)))
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    if options.compare:
+        with open(options.compare) as baseline:
+            print()
+            print('\n'.join(runner.compare(json.load(baseline), report)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
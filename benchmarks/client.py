@@ -0,0 +1,179 @@
+"""
+Transports used by the benchmark runner.
+
+``HttpTransport`` is a small asyncio HTTP/1.1 client with one keep-alive
+connection per worker, so the numbers measure the server rather than
+process start-up. ``TestClientTransport`` drives the Django stack
+in-process through the test client, with no network or server needed.
+"""
+import asyncio
+import ssl
+from dataclasses import replace
+from urllib.parse import urlsplit
+
+
+class HttpError(Exception):
+    pass
+
+
+class HttpConnection:
+    def __init__(self, host, port, use_ssl):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.reader = None
+        self.writer = None
+
+    async def open(self):
+        context = ssl.create_default_context() if self.use_ssl else None
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=context)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+            self.reader = self.writer = None
+
+    async def request(self, request, host_header):
+        if self.writer is None:
+            await self.open()
+        head = (
+            f'{request.method} {request.path} HTTP/1.1\r\n'
+            f'Host: {host_header}\r\n'
+            'Accept: application/json\r\n'
+            'Connection: keep-alive\r\n'
+            f'Content-Length: {len(request.body)}\r\n'
+        )
+        if request.body:
+            head += f'Content-Type: {request.content_type}\r\n'
+        self.writer.write(head.encode('latin-1') + b'\r\n' + request.body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise HttpError('Connection closed by server')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            await self._read_chunked()
+        elif 'content-length' in headers:
+            await self.reader.readexactly(int(headers['content-length']))
+        elif request.method != 'HEAD' and status not in (204, 304):
+            await self.reader.read()
+            await self.close()
+            return status
+
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status
+
+    async def _read_chunked(self):
+        while True:
+            size = int((await self.reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                # Trailers end with an empty line
+                while (await self.reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return
+            await self.reader.readexactly(size + 2)
+
+
+class HttpTransport:
+    """
+    Send requests to a running server, one persistent connection per worker
+    """
+    blocking = False
+
+    def __init__(self, base_url, timeout=30.0):
+        self.timeout = timeout
+        parts = urlsplit(base_url)
+        self.use_ssl = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.use_ssl else 80)
+        self.host_header = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+
+    def connect(self):
+        return HttpConnection(self.host, self.port, self.use_ssl)
+
+    async def send(self, connection, request):
+        if self.prefix:
+            request = replace(request, path=self.prefix + request.path)
+        try:
+            try:
+                return await asyncio.wait_for(connection.request(request, self.host_header), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError, HttpError):
+                # Stale keep-alive connection: reconnect once
+                await connection.close()
+                return await asyncio.wait_for(connection.request(request, self.host_header), self.timeout)
+        except asyncio.TimeoutError:
+            # The connection is mid-response; start over on the next request
+            await connection.close()
+            raise
+
+    async def disconnect(self, connection):
+        await connection.close()
+
+
+class TestClientTransport:
+    """
+    Run requests in-process through django.test.Client.
+
+    Views run in the calling thread, one request at a time, so this measures
+    the per-request cost of the Django stack (and works inside a TestCase
+    transaction). Use HttpTransport to measure behaviour under concurrency.
+    """
+    blocking = True
+
+    def connect(self):
+        from django.test import Client
+        return Client(headers={'accept': 'application/json'})
+
+    def send(self, client, request):
+        method = getattr(client, request.method.lower())
+        if request.method in ('GET', 'HEAD', 'DELETE'):
+            response = method(request.path)
+        else:
+            response = method(request.path, request.body, content_type=request.content_type)
+        return response.status_code
+
+
+
+async def hold_slow_connection(host, port, interval, stop):
+    """
+    A slow client: send a request's headers one line every ``interval``
+    seconds and never finish it. Returns 'held' if the connection was still
+    open when ``stop`` was set, 'closed' if the server gave up on it and
+    'failed' if it couldn't connect.
+    """
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return 'failed'
+    try:
+        writer.write(f'GET /api/health/ HTTP/1.1\r\nHost: {host}\r\n'.encode('latin-1'))
+        await writer.drain()
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(reader.read(1), interval)
+            except asyncio.TimeoutError:
+                writer.write(b'X-Slow-Client: 1\r\n')
+                await writer.drain()
+                continue
+            # The server answered (e.g. 408) or closed the connection
+            return 'closed'
+        return 'held'
+    except ConnectionError:
+        return 'closed'
+    finally:
+        writer.close()
@@ -0,0 +1,206 @@
+"""
+Run a weighted scenario mix with concurrent workers and build a JSON report
+"""
+import asyncio
+import math
+import platform
+import random
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of already sorted ``values``
+    """
+    if not values:
+        return None
+    rank = max(math.ceil(fraction * len(values)), 1)
+    return values[rank - 1]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def usable_scenarios(scenarios, dataset, rng):
+    """
+    Drop scenarios the dataset can't build requests for (e.g. no tasks seeded)
+    """
+    usable = []
+    for scenario in scenarios:
+        try:
+            scenario.build(dataset, rng)
+        except (IndexError, ValueError):
+            continue
+        usable.append(scenario)
+    return usable
+
+
+def make_plan(scenarios, dataset, requests, warmup, seed):
+    rng = random.Random(seed)
+    scenarios = usable_scenarios(scenarios, dataset, rng)
+    if not scenarios:
+        raise ValueError("No scenario can run against this dataset")
+    return rng.choices(scenarios, weights=[scenario.weight for scenario in scenarios], k=warmup + requests)
+
+
+async def run_async(transport, scenarios, dataset, requests=1000, concurrency=10, warmup=0, seed=0):
+    """
+    Send ``warmup`` + ``requests`` requests from ``concurrency`` workers and
+    return per-scenario samples as ``{name: [(seconds, status), ...]}``
+    plus the wall-clock duration of the measured part
+    """
+    plan = make_plan(scenarios, dataset, requests, warmup, seed)
+    samples = defaultdict(list)
+    position = 0
+    measured_start = None
+
+    async def worker(worker_rng):
+        nonlocal position, measured_start
+        connection = transport.connect()
+        try:
+            while position < len(plan):
+                index = position
+                position += 1
+                scenario = plan[index]
+                if index == warmup and measured_start is None:
+                    measured_start = time.perf_counter()
+                request = scenario.build(dataset, worker_rng)
+                start = time.perf_counter()
+                try:
+                    status = await transport.send(connection, request)
+                except Exception as error:
+                    status = type(error).__name__
+                if index >= warmup:
+                    samples[scenario.name].append((time.perf_counter() - start, status))
+        finally:
+            await transport.disconnect(connection)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(random.Random(seed + number + 1)) for number in range(concurrency)))
+    duration = time.perf_counter() - (measured_start or start)
+    return samples, duration
+
+
+def run_blocking(transport, scenarios, dataset, requests=1000, warmup=0, seed=0, **options):
+    """
+    Same as run_async for in-process transports, one request at a time
+    in the calling thread (and so on its database connection)
+    """
+    plan = make_plan(scenarios, dataset, requests, warmup, seed)
+    samples = defaultdict(list)
+    worker_rng = random.Random(seed + 1)
+    client = transport.connect()
+    measured_start = time.perf_counter()
+    for index, scenario in enumerate(plan):
+        if index == warmup:
+            measured_start = time.perf_counter()
+        request = scenario.build(dataset, worker_rng)
+        request_start = time.perf_counter()
+        try:
+            status = transport.send(client, request)
+        except Exception as error:
+            status = type(error).__name__
+        if index >= warmup:
+            samples[scenario.name].append((time.perf_counter() - request_start, status))
+    return samples, time.perf_counter() - measured_start
+
+
+def run(transport, scenarios, dataset, **options):
+    if transport.blocking:
+        return run_blocking(transport, scenarios, dataset, **options)
+    return asyncio.run(run_async(transport, scenarios, dataset, **options))
+
+
+def summarize(latencies, errors, duration):
+    latencies = sorted(latencies)
+    milliseconds = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / duration, 2) if duration else None,
+        'mean_ms': milliseconds(sum(latencies) / len(latencies)) if latencies else None,
+        'p50_ms': milliseconds(percentile(latencies, 0.50)),
+        'p95_ms': milliseconds(percentile(latencies, 0.95)),
+        'p99_ms': milliseconds(percentile(latencies, 0.99)),
+        'max_ms': milliseconds(latencies[-1]) if latencies else None,
+    }
+
+
+def is_error(status):
+    return not isinstance(status, int) or status >= 400
+
+
+def build_report(samples, duration, meta):
+    endpoints = {}
+    all_latencies, all_errors = [], 0
+    for name in sorted(samples):
+        latencies = [seconds for seconds, _ in samples[name]]
+        statuses = defaultdict(int)
+        for _, status in samples[name]:
+            statuses[str(status)] += 1
+        errors = sum(1 for _, status in samples[name] if is_error(status))
+        endpoints[name] = {**summarize(latencies, errors, duration), 'statuses': dict(statuses)}
+        all_latencies.extend(latencies)
+        all_errors += errors
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'duration_s': round(duration, 3),
+            **meta,
+        },
+        'totals': summarize(all_latencies, all_errors, duration),
+        'endpoints': endpoints,
+    }
+
+
+COMPARED_FIELDS = ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms')
+
+
+def compare(baseline, current, labels=None):
+    """
+    Lines describing the change of every endpoint between two reports
+    """
+    def delta(before, after):
+        if before in (None, 0) or after is None:
+            return 'n/a'
+        return f'{(after - before) / before * 100:+.1f}%'
+
+    header = f"{'endpoint':<26}" + ''.join(f'{field:>32}' for field in COMPARED_FIELDS)
+    before_label, after_label = labels or (baseline['meta'].get('commit'), current['meta'].get('commit'))
+    lines = [f"baseline {before_label} -> current {after_label}", header]
+    rows = [('TOTAL', baseline['totals'], current['totals'])]
+    for name in sorted(set(baseline['endpoints']) | set(current['endpoints'])):
+        rows.append((name, baseline['endpoints'].get(name, {}), current['endpoints'].get(name, {})))
+    for name, before, after in rows:
+        cells = []
+        for field in COMPARED_FIELDS:
+            old, new = before.get(field), after.get(field)
+            cells.append(f'{old} -> {new} ({delta(old, new)})'.rjust(32))
+        lines.append(f'{name:<26}' + ''.join(cells))
+    return lines
+
+
+def format_report(report):
+    lines = [
+        f"commit {report['meta'].get('commit')} target {report['meta'].get('target')} "
+        f"concurrency {report['meta'].get('concurrency')} duration {report['meta']['duration_s']}s",
+        f"{'endpoint':<26}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}",
+    ]
+    rows = [*report['endpoints'].items(), ('TOTAL', report['totals'])]
+    for name, stats in rows:
+        lines.append(
+            f"{name:<26}{stats['requests']:>10}{stats['errors']:>8}{stats['throughput_rps']!s:>10}"
+            f"{stats['p50_ms']!s:>10}{stats['p95_ms']!s:>10}{stats['p99_ms']!s:>10}"
+        )
+    return lines
@@ -0,0 +1,85 @@
+"""
+Weighted request mix. Each scenario builds one request from the seeded dataset.
+"""
+import json
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass(frozen=True)
+class Request:
+    method: str
+    path: str
+    body: bytes = b''
+    content_type: str = 'application/json'
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    weight: int
+    build: Callable  # (dataset, rng) -> Request
+
+
+def _json(data):
+    return json.dumps(data).encode()
+
+
+def _conversation(dataset, rng):
+    return rng.choice(dataset.conversation_ids)
+
+
+def _messages_path(dataset, rng):
+    return f'/support/v1/conversations/{_conversation(dataset, rng)}/messages/'
+
+
+SCENARIOS = [
+    Scenario('tasks.list', 10, lambda d, r: Request('GET', '/tasks/v1/')),
+    Scenario('tasks.retrieve', 10, lambda d, r: Request('GET', f'/tasks/v1/{r.choice(d.task_ids)}/')),
+    Scenario('tasks.create', 3, lambda d, r: Request(
+        'POST', '/tasks/v1/', _json({'title': f'Benchmark task {r.random()}', 'completed': False})
+    )),
+    Scenario('tasks.update', 3, lambda d, r: Request(
+        'PATCH', f'/tasks/v1/{r.choice(d.task_ids)}/', _json({'completed': r.random() < 0.5})
+    )),
+    Scenario('conversations.list', 10, lambda d, r: Request(
+        'GET', f'/support/v1/conversations/?session_key={r.choice(d.session_keys)}'
+    )),
+    Scenario('conversations.retrieve', 8, lambda d, r: Request(
+        'GET', f'/support/v1/conversations/{_conversation(d, r)}/'
+    )),
+    Scenario('messages.list', 8, lambda d, r: Request('GET', _messages_path(d, r))),
+    Scenario('messages.create', 3, lambda d, r: Request(
+        'POST', f'/support/v1/conversations/{_conversation(d, r)}/add_message/',
+        _json({'content': ' '.join(r.sample(d.words, 4)), 'sender_name': 'Benchmark'})
+    )),
+    Scenario('search', 4, lambda d, r: Request('GET', f'/support/v1/search/?q={r.choice(d.words)}')),
+]
+
+
+# The same reads through the async ORM views (support/async_views.py); not in the default mix
+ASYNC_SCENARIOS = [
+    Scenario('async.conversations.list', 10, lambda d, r: Request(
+        'GET', f'/support/v1/async/conversations/?session_key={r.choice(d.session_keys)}'
+    )),
+    Scenario('async.conversations.retrieve', 8, lambda d, r: Request(
+        'GET', f'/support/v1/async/conversations/{_conversation(d, r)}/'
+    )),
+    Scenario('async.messages.list', 8, lambda d, r: Request(
+        'GET', f'/support/v1/async/conversations/{_conversation(d, r)}/messages/'
+    )),
+]
+
+
+def select(names=None):
+    """
+    Scenarios to run; ``names`` is an optional comma-separated subset
+    """
+    if not names:
+        return list(SCENARIOS)
+    wanted = {name.strip() for name in names.split(',')}
+    known = SCENARIOS + ASYNC_SCENARIOS
+    unknown = wanted - {scenario.name for scenario in known}
+    if unknown:
+        raise ValueError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+    return [scenario for scenario in known if scenario.name in wanted]
@@ -0,0 +1,108 @@
+"""
+Seed a database with benchmark data at a configurable scale
+"""
+import random
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from support.models import Attachment, Conversation, Message
+from tasks.models import Task
+
+BATCH_SIZE = 1000
+
+
+@dataclass
+class Scale:
+    tasks: int = 1000
+    conversations: int = 200
+    messages: int = 20
+    attachments: int = 1
+    sessions: int = 50
+
+    @classmethod
+    def parse(cls, value):
+        """
+        Parse ``tasks=1000,conversations=200,messages=20,...``
+        """
+        scale = cls()
+        for item in filter(None, value.split(',')):
+            name, _, number = item.partition('=')
+            if not hasattr(scale, name.strip()):
+                raise ValueError(f"Unknown scale dimension {name!r}")
+            setattr(scale, name.strip(), int(number))
+        return scale
+
+
+@dataclass
+class Dataset:
+    """
+    Ids of seeded rows, used by scenarios to build requests
+    """
+    task_ids: list = field(default_factory=list)
+    conversation_ids: list = field(default_factory=list)
+    message_ids: dict = field(default_factory=dict)
+    session_keys: list = field(default_factory=list)
+    words: tuple = ('invoice', 'refund', 'delivery', 'password', 'upgrade', 'crash', 'billing', 'shipping')
+
+
+@transaction.atomic
+def seed(scale, rng=None):
+    """
+    Insert ``scale`` worth of tasks and conversations (with messages and
+    attachment rows) and return the resulting Dataset
+    """
+    rng = rng or random.Random(0)
+    dataset = Dataset(session_keys=[f'bench-{index}' for index in range(max(scale.sessions, 1))])
+    words = dataset.words
+
+    tasks = Task.objects.bulk_create(
+        (Task(title=f'Benchmark task {index}', description=rng.choice(words), completed=index % 3 == 0)
+         for index in range(scale.tasks)),
+        batch_size=BATCH_SIZE,
+    )
+    dataset.task_ids = [task.id for task in tasks]
+
+    statuses = [choice[0] for choice in Conversation.STATUS_CHOICES]
+    conversations = Conversation.objects.bulk_create(
+        (Conversation(title=f'Benchmark conversation {index}', session_key=rng.choice(dataset.session_keys),
+                      status=rng.choice(statuses))
+         for index in range(scale.conversations)),
+        batch_size=BATCH_SIZE,
+    )
+    dataset.conversation_ids = [conversation.id for conversation in conversations]
+
+    messages = Message.objects.bulk_create(
+        (Message(conversation=conversation, is_from_staff=index % 2 == 1,
+                 content=' '.join(rng.choice(words) for _ in range(12)))
+         for conversation in conversations for index in range(scale.messages)),
+        batch_size=BATCH_SIZE,
+    )
+    for message in messages:
+        dataset.message_ids.setdefault(message.conversation_id, []).append(message.id)
+
+    # Attachment rows only: list endpoints never read the file bodies
+    Attachment.objects.bulk_create(
+        (Attachment(message=message, file=f'benchmarks/{message.id}-{index}.txt', filename=f'file-{index}.txt',
+                    file_size=1024, content_type='text/plain')
+         for message in messages for index in range(scale.attachments)),
+        batch_size=BATCH_SIZE,
+    )
+    Conversation.objects.filter(pk__in=dataset.conversation_ids).rebuild_counters()
+    return dataset
+
+
+def load_existing(limit=1000):
+    """
+    Dataset built from rows already in the database (``--url`` runs without ``--seed-data``)
+    """
+    dataset = Dataset()
+    dataset.task_ids = list(Task.objects.order_by('-id').values_list('id', flat=True)[:limit])
+    conversations = Conversation.objects.order_by('-updated_at').values_list('id', 'session_key')[:limit]
+    dataset.conversation_ids = [conversation_id for conversation_id, _ in conversations]
+    dataset.session_keys = sorted({session_key for _, session_key in conversations if session_key})
+    for message_id, conversation_id in Message.objects.filter(
+        conversation_id__in=dataset.conversation_ids
+    ).values_list('id', 'conversation_id'):
+        dataset.message_ids.setdefault(conversation_id, []).append(message_id)
+    return dataset
@@ -0,0 +1,128 @@
+"""
+Microbenchmark JSON rendering and parsing of conversation payloads.
+
+``python -m benchmarks.serialization`` seeds conversations of
+``--sizes`` messages (one attachment each) into a throwaway test database,
+loads each one the way the detail view does and times, per size:
+
+- serialize: ``ConversationSerializer(conversation).data``
+- messages: the message list query serialized through ``MessageSerializer``
+  against ``MessageValuesSerializer`` on ``.values()`` rows
+- render: DRF's stdlib ``JSONRenderer`` against ``core.renderers.JSONRenderer``
+- parse: DRF's stdlib ``JSONParser`` against ``core.parsers.JSONParser``
+
+Every timing is the median of ``--repeat`` runs. The report also records
+whether both renderers, and both message serializers, produced the same
+bytes.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+IN_MEMORY_STORAGE = {'BACKEND': 'django.core.files.storage.InMemoryStorage'}
+
+
+def median_ms(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def measure(conversation, repeat=20):
+    from rest_framework import parsers, renderers
+
+    from core.parsers import JSONParser
+    from core.renderers import JSONRenderer
+    from support.models import Message
+    from support.serializers import ConversationSerializer, MessageSerializer, MessageValuesSerializer
+
+    messages = Message.objects.filter(conversation=conversation).with_attachments()
+    data = ConversationSerializer(conversation).data
+    stdlib_renderer, fast_renderer = renderers.JSONRenderer(), JSONRenderer()
+    stdlib_parser, fast_parser = parsers.JSONParser(), JSONParser()
+    content = stdlib_renderer.render(data)
+    stats = {
+        'messages': len(data['messages']),
+        'bytes': len(content),
+        'identical': fast_renderer.render(data) == content,
+        'values_identical': (
+            fast_renderer.render(MessageValuesSerializer(MessageValuesSerializer.values(messages), many=True).data)
+            == fast_renderer.render(MessageSerializer(messages.all(), many=True).data)
+        ),
+        'serialize_ms': median_ms(lambda: ConversationSerializer(conversation).data, repeat),
+        'messages_model_ms': median_ms(lambda: MessageSerializer(messages.all(), many=True).data, repeat),
+        'messages_values_ms': median_ms(
+            lambda: MessageValuesSerializer(MessageValuesSerializer.values(messages), many=True).data, repeat
+        ),
+        'render_stdlib_ms': median_ms(lambda: stdlib_renderer.render(data), repeat),
+        'render_fast_ms': median_ms(lambda: fast_renderer.render(data), repeat),
+        'parse_stdlib_ms': median_ms(lambda: stdlib_parser.parse(io.BytesIO(content)), repeat),
+        'parse_fast_ms': median_ms(lambda: fast_parser.parse(io.BytesIO(content)), repeat),
+    }
+    stats['render_speedup'] = round(stats['render_stdlib_ms'] / max(stats['render_fast_ms'], 0.001), 1)
+    stats['parse_speedup'] = round(stats['parse_stdlib_ms'] / max(stats['parse_fast_ms'], 0.001), 1)
+    stats['values_speedup'] = round(stats['messages_model_ms'] / max(stats['messages_values_ms'], 0.001), 1)
+    return stats
+
+
+def format_results(results):
+    columns = ('messages', 'bytes', 'serialize_ms', 'render_stdlib_ms', 'render_fast_ms', 'render_speedup',
+               'parse_stdlib_ms', 'parse_fast_ms', 'parse_speedup', 'identical', 'messages_model_ms',
+               'messages_values_ms', 'values_speedup', 'values_identical')
+    lines = [''.join(f'{column:>20}' for column in columns)]
+    for stats in results:
+        lines.append(''.join(f'{stats[column]!s:>20}' for column in columns))
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.serialization', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10,100,500', help="Messages per conversation")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the JSON results to this file")
+    options = parser.parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import override_settings, setup_test_environment
+
+    from support.models import Conversation
+    from .seed import Scale, seed
+
+    setup_test_environment()
+    # Attachment URLs come from storage; keep them off MinIO
+    override_settings(STORAGES=dict(settings.STORAGES, default=IN_MEMORY_STORAGE)).enable()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    rng = random.Random(options.seed)
+    results = []
+    try:
+        for size in map(int, options.sizes.split(',')):
+            dataset = seed(Scale(tasks=0, conversations=1, messages=size, attachments=1, sessions=1), rng)
+            conversation = Conversation.objects.with_messages().get(pk=dataset.conversation_ids[0])
+            results.append(measure(conversation, options.repeat))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    print('\n'.join(format_results(results)))
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
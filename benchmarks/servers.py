@@ -0,0 +1,191 @@
+"""
+Compare serving modes under load: WSGI against ASGI with many slow
+clients, or the gunicorn defaults against the tuned ``gunicorn.conf.py``.
+
+``python -m benchmarks.servers`` seeds a throwaway SQLite database, then
+for each mode starts gunicorn on a free local port:
+
+- wsgi: ``core.wsgi:application`` with sync workers, read through the DRF views
+- asgi: ``core.asgi:application`` with uvicorn workers, read through the
+  async ORM views (``/support/v1/async/...``)
+- default: what the Dockerfile used to run, ``core.wsgi:application`` with
+  gunicorn's defaults (one sync worker)
+- tuned: ``gunicorn --config gunicorn.conf.py`` as deployed now (worker
+  count, threads and preload from the config, not ``--workers``)
+
+``--modes default,tuned --slow-clients 0`` measures plain throughput.
+While ``--slow-clients`` connections trickle in request headers, a fast
+client measures read throughput and latency. The report records, per mode,
+how many slow connections the server kept open alongside the usual
+per-endpoint numbers.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MODES = {
+    'wsgi': {
+        'command': ['core.wsgi:application', '--worker-class', 'sync'],
+        'scenarios': 'conversations.list,conversations.retrieve,messages.list',
+    },
+    'asgi': {
+        'command': ['core.asgi:application', '--worker-class', 'uvicorn_worker.UvicornWorker'],
+        'scenarios': 'async.conversations.list,async.conversations.retrieve,async.messages.list',
+    },
+    'default': {
+        'command': ['core.wsgi:application'],
+        'scenarios': 'conversations.list,conversations.retrieve,messages.list',
+        'workers': 1,
+    },
+    'tuned': {
+        'command': ['--config', str(ROOT / 'gunicorn.conf.py')],
+        'scenarios': 'conversations.list,conversations.retrieve,messages.list',
+        'workers': None,
+        'env': {'RUN_STARTUP_TASKS': 'False'},
+    },
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.servers', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='wsgi,asgi')
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn worker processes of the wsgi and asgi modes")
+    parser.add_argument('--slow-clients', type=int, default=100)
+    parser.add_argument('--slow-interval', type=float, default=1.0, help="Seconds between slow header lines")
+    parser.add_argument('--concurrency', type=int, default=10, help="Concurrent fast connections")
+    parser.add_argument('--requests', type=int, default=300, help="Measured fast requests per mode")
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--timeout', type=float, default=5.0, help="Per-request timeout of the fast client")
+    parser.add_argument('--scale', default='tasks=0,conversations=200,messages=20,attachments=0,sessions=20')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write both JSON reports to this file")
+    return parser.parse_args(argv)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(port, process, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server did not listen on port {port} within {timeout}s")
+
+
+def start_server(mode, port, workers, env):
+    command = [
+        sys.executable, '-m', 'gunicorn', *MODES[mode]['command'], '--chdir', str(ROOT),
+        '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+    ]
+    workers = MODES[mode].get('workers', workers)
+    if workers is not None:
+        command += ['--workers', str(workers)]
+    env = dict(env, **MODES[mode].get('env', {}))
+    # Started outside the project, or gunicorn would pick up ./gunicorn.conf.py
+    # in every mode. Access logs go to stdout
+    process = subprocess.Popen(command, cwd=tempfile.gettempdir(), env=env, stdout=subprocess.DEVNULL)
+    try:
+        wait_until_up(port, process)
+    except Exception:
+        process.terminate()
+        raise
+    return process
+
+
+async def measure(port, options, selected, dataset):
+    from . import runner
+    from .client import HttpTransport, hold_slow_connection
+
+    stop = asyncio.Event()
+    slow = [
+        asyncio.ensure_future(hold_slow_connection('127.0.0.1', port, options.slow_interval, stop))
+        for _ in range(options.slow_clients)
+    ]
+    # Let the slow clients connect before measuring
+    await asyncio.sleep(min(options.slow_interval, 1.0))
+    try:
+        samples, duration = await runner.run_async(
+            HttpTransport(f'http://127.0.0.1:{port}', timeout=options.timeout), selected, dataset,
+            requests=options.requests, concurrency=options.concurrency, warmup=options.warmup, seed=options.seed,
+        )
+    finally:
+        stop.set()
+        outcomes = await asyncio.gather(*slow)
+    held = {outcome: outcomes.count(outcome) for outcome in ('held', 'closed', 'failed')}
+    return samples, duration, held
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    directory = tempfile.mkdtemp(prefix='woooba-bench-')
+    database = Path(directory) / 'bench.sqlite3'
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}', DEBUG='False', METRICS_ENABLED='False')
+    os.environ.update(DATABASE_URL=env['DATABASE_URL'], DJANGO_SETTINGS_MODULE='core.settings')
+
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from django.db import connections
+
+    from . import runner, scenarios
+    from .seed import Scale, seed
+
+    call_command('migrate', verbosity=0)
+    dataset = seed(Scale.parse(options.scale), random.Random(options.seed))
+    connections.close_all()
+
+    modes = options.modes.split(',')
+    reports = {}
+    try:
+        for mode in modes:
+            selected = scenarios.select(MODES[mode]['scenarios'])
+            port = free_port()
+            process = start_server(mode, port, options.workers, env)
+            try:
+                samples, duration, held = asyncio.run(measure(port, options, selected, dataset))
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+            # Same endpoint names in both reports so they can be compared
+            samples = {name.removeprefix('async.'): values for name, values in samples.items()}
+            reports[mode] = runner.build_report(samples, duration, {
+                'target': mode, 'workers': MODES[mode].get('workers', options.workers), 'concurrency': options.concurrency,
+                'slow_clients': options.slow_clients, 'slow_interval': options.slow_interval,
+                'slow_connections': held, 'scale': options.scale,
+            })
+            print('\n'.join(runner.format_report(reports[mode])))
+            print(f"slow connections: {held}\n")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if len(modes) == 2:
+        print('\n'.join(runner.compare(reports[modes[0]], reports[modes[1]], labels=modes)))
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(reports, output, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
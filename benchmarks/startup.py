@@ -0,0 +1,128 @@
+"""
+Profile how long a worker takes to boot and how much memory it holds.
+
+``python -m benchmarks.startup`` boots the WSGI application the way a
+gunicorn worker does (settings, app registry, middleware chain and URLconf)
+in fresh interpreters under ``python -X importtime``, once per profile:
+
+- lean: production defaults, ``DEBUG=False`` (no API docs, no browsable API)
+- full: ``API_DOCS_ENABLED`` and ``BROWSABLE_API_ENABLED`` on, as in development
+
+It reports the median boot time and peak RSS of each profile, and the
+top-level packages that took the longest to import.
+
+The committed profile is ``benchmarks/startup.json``; refresh it with
+``python -m benchmarks.startup --output benchmarks/startup.json``.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROFILES = {
+    'lean': {'DEBUG': 'False', 'API_DOCS_ENABLED': 'False', 'BROWSABLE_API_ENABLED': 'False'},
+    'full': {'DEBUG': 'False', 'API_DOCS_ENABLED': 'True', 'BROWSABLE_API_ENABLED': 'True'},
+}
+
+# Loads what a worker loads before serving its first request. ru_maxrss
+# would report the peak of the process that spawned this one, so memory is
+# read from /proc where available
+BOOT = """
+import json, resource, sys, time
+start = time.perf_counter()
+from core.wsgi import application
+from django.urls import get_resolver
+get_resolver().url_patterns
+boot = time.perf_counter() - start
+try:
+    with open('/proc/self/status') as status:
+        memory = dict(line.split(':', 1) for line in status if line.startswith(('VmHWM', 'VmRSS')))
+    max_rss_kb, rss_kb = int(memory['VmHWM'].split()[0]), int(memory['VmRSS'].split()[0])
+except OSError:
+    max_rss_kb = rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    'boot_s': boot,
+    'max_rss_kb': max_rss_kb,
+    'rss_kb': rss_kb,
+    'modules': sorted(sys.modules),
+}))
+"""
+
+IMPORT_TIME = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def boot(profile, importtime=False):
+    """
+    Boot the application in a new interpreter and return its measurements,
+    with microseconds of import time per top-level package if ``importtime``
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='core.settings', **PROFILES[profile])
+    command = [sys.executable, *(['-X', 'importtime'] if importtime else []), '-c', BOOT]
+    result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    measurements = json.loads(result.stdout.strip().splitlines()[-1])
+    if importtime:
+        packages = Counter()
+        for line in result.stderr.splitlines():
+            match = IMPORT_TIME.match(line)
+            if match:
+                packages[match.group(4).partition('.')[0]] += int(match.group(1))
+        measurements['import_us'] = dict(packages)
+    return measurements
+
+
+def profile_boot(profile, runs=5, top=15):
+    samples = [boot(profile) for _ in range(runs)]
+    imports = boot(profile, importtime=True)['import_us']
+    modules = set(samples[0]['modules'])
+    return {
+        'profile': profile,
+        'runs': runs,
+        'boot_ms': round(statistics.median(sample['boot_s'] for sample in samples) * 1000, 1),
+        'max_rss_mb': round(statistics.median(sample['max_rss_kb'] for sample in samples) / 1024, 1),
+        'modules': len(modules),
+        'top_imports_ms': {name: round(us / 1000, 1) for name, us in Counter(imports).most_common(top)},
+    }
+
+
+def format_profile(report):
+    lines = [
+        f"{report['profile']}: boot {report['boot_ms']} ms, max RSS {report['max_rss_mb']} MB, "
+        f"{report['modules']} modules (median of {report['runs']})",
+    ]
+    for name, ms in report['top_imports_ms'].items():
+        lines.append(f"  {name:<28}{ms:>8} ms")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.startup', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', default='full,lean')
+    parser.add_argument('--runs', type=int, default=5, help="Boots per profile")
+    parser.add_argument('--top', type=int, default=15, help="Packages listed in the import report")
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    options = parser.parse_args(argv)
+
+    reports = [profile_boot(profile, options.runs, options.top) for profile in options.profiles.split(',')]
+    for report in reports:
+        print('\n'.join(format_profile(report)) + '\n')
+    if len(reports) == 2:
+        before, after = reports
+        for field in ('boot_ms', 'max_rss_mb', 'modules'):
+            change = (after[field] - before[field]) / before[field] * 100
+            print(f"{field:<12}{before['profile']} {before[field]} -> {after['profile']} {after[field]} ({change:+.1f}%)")
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(reports, output, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
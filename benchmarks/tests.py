@@ -0,0 +1,90 @@
+import random
+from contextlib import redirect_stderr
+from io import StringIO
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from support.models import Conversation
+
+from . import runner, scenarios, serialization, startup
+from .__main__ import parse_args
+from .client import TestClientTransport
+from .seed import Scale, seed
+
+TEST_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+class ReportTests(SimpleTestCase):
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(runner.percentile(values, 0.50), 50)
+        self.assertEqual(runner.percentile(values, 0.95), 95)
+        self.assertEqual(runner.percentile(values, 0.99), 99)
+        self.assertEqual(runner.percentile([7], 0.99), 7)
+        self.assertIsNone(runner.percentile([], 0.5))
+
+    def test_scale_parse(self):
+        scale = Scale.parse('tasks=10, messages=3')
+        self.assertEqual((scale.tasks, scale.messages, scale.conversations), (10, 3, Scale().conversations))
+        with self.assertRaises(ValueError):
+            Scale.parse('users=5')
+
+    def test_report_and_compare(self):
+        samples = {'tasks.list': [(0.010, 200), (0.020, 200), (0.030, 500)]}
+        report = runner.build_report(samples, 1.0, {'target': 'test-client'})
+        stats = report['endpoints']['tasks.list']
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['errors'], 1)
+        self.assertEqual(stats['p50_ms'], 20.0)
+        self.assertEqual(stats['statuses'], {'200': 2, '500': 1})
+
+        faster = runner.build_report({'tasks.list': [(0.005, 200)] * 3}, 0.5, {})
+        lines = runner.compare(report, faster)
+        self.assertTrue(any(line.startswith('tasks.list') and '+100.0%' in line for line in lines))
+
+    def test_url_runs_only_seed_when_asked(self):
+        self.assertFalse(parse_args(['--url', 'http://localhost:8000']).seed_data)
+        self.assertTrue(parse_args(['--url', 'http://localhost:8000', '--seed-data']).seed_data)
+        with self.assertRaises(SystemExit), redirect_stderr(StringIO()):
+            parse_args(['--seed-data'])
+
+@override_settings(STORAGES=TEST_STORAGES)
+class SmokeRunTests(TestCase):
+    def test_every_scenario_succeeds_in_process(self):
+        dataset = seed(Scale(tasks=5, conversations=3, messages=2, attachments=1, sessions=2), random.Random(1))
+        samples, duration = runner.run(
+            TestClientTransport(), scenarios.select(), dataset, requests=60, seed=1
+        )
+        report = runner.build_report(samples, duration, {'target': 'test-client'})
+        self.assertEqual(report['totals']['requests'], 60)
+        self.assertEqual(report['totals']['errors'], 0, report['endpoints'])
+
+    def test_serialization_microbenchmark(self):
+        dataset = seed(Scale(tasks=0, conversations=1, messages=3, attachments=1, sessions=1), random.Random(1))
+        conversation = Conversation.objects.with_messages().get(pk=dataset.conversation_ids[0])
+        stats = serialization.measure(conversation, repeat=2)
+        self.assertEqual(stats['messages'], 3)
+        self.assertTrue(stats['identical'])
+        self.assertTrue(stats['values_identical'])
+
+
+class StartupTests(SimpleTestCase):
+    """
+    Worker boot regression check: production settings must not load the API
+    docs or a storage client, and must load fewer modules into less memory
+    than with them. Boot time is too noisy to assert on; see
+    ``python -m benchmarks.startup``
+    """
+    def test_lean_boot_skips_docs_and_storage_clients(self):
+        lean = [startup.boot('lean') for _ in range(3)]
+        full = [startup.boot('full') for _ in range(3)]
+
+        for module in ('drf_yasg', 'pkg_resources', 'minio', 'minio_storage.storage'):
+            self.assertNotIn(module, lean[0]['modules'])
+        self.assertIn('drf_yasg', full[0]['modules'])
+
+        self.assertLess(len(lean[0]['modules']), len(full[0]['modules']))
+        self.assertLess(max(run['max_rss_kb'] for run in lean), min(run['max_rss_kb'] for run in full))
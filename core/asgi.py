@@ -1,3 +1,7 @@
+"""
+ASGI entry point, used for the async read views and conversation streams.
+Run it locally with ./run-asgi.sh (gunicorn with uvicorn workers).
+"""
 import os
 
 from django.core.asgi import get_asgi_application
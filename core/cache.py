@@ -0,0 +1,167 @@
+"""
+Versioned response cache for read endpoints.
+
+Cached payloads are keyed by the versions of the namespaces they depend on
+(e.g. ``tasks`` or ``conversation:<id>``). Writers never delete entries;
+they bump the namespace version so every dependent key changes at once and
+the stale entries age out through the backend's TTL / size eviction.
+"""
+import contextvars
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+
+class CacheStats:
+    """
+    Per-process hit/miss counters, grouped by cache namespace
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: defaultdict(int))
+
+    def incr(self, namespace, counter):
+        with self._lock:
+            self._counters[namespace][counter] += 1
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for namespace, counters in self._counters.items():
+                hits, misses = counters['hits'], counters['misses']
+                lookups = hits + misses
+                result[namespace] = dict(counters, hit_ratio=round(hits / lookups, 4) if lookups else None)
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+
+stats = CacheStats()
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _version_key(namespace):
+    return f'{settings.RESPONSE_CACHE_PREFIX}:version:{namespace}'
+
+
+def get_versions(namespaces):
+    """
+    Return the current version of each namespace, initialising missing ones
+    """
+    cache = get_cache()
+    keys = {_version_key(namespace): namespace for namespace in namespaces}
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Seed from the clock so an evicted version never resurrects old entries
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(*namespaces):
+    cache = get_cache()
+    for namespace in namespaces:
+        try:
+            cache.incr(_version_key(namespace))
+        except ValueError:
+            cache.set(_version_key(namespace), time.time_ns(), timeout=None)
+        stats.incr(namespace.split(':')[0], 'invalidations')
+
+
+# Set by mute_invalidation() for bulk writes that invalidate once themselves
+_invalidation_muted = contextvars.ContextVar('invalidation_muted', default=False)
+
+
+@contextmanager
+def mute_invalidation():
+    """
+    Make invalidate() a no-op inside the block, so per-row signal receivers
+    don't bump versions during a bulk write; the caller invalidates the
+    affected namespaces once afterwards
+    """
+    token = _invalidation_muted.set(True)
+    try:
+        yield
+    finally:
+        _invalidation_muted.reset(token)
+
+
+def invalidation_muted():
+    return _invalidation_muted.get()
+
+
+def invalidate(*namespaces):
+    """
+    Bump namespace versions now and again once the transaction commits,
+    so readers can't re-cache data from before the commit
+    """
+    if invalidation_muted():
+        return
+    bump(*namespaces)
+    transaction.on_commit(lambda: bump(*namespaces))
+
+
+class CachedResponseMixin:
+    """
+    Serve list and retrieve from the response cache.
+
+    Viewsets define ``get_cache_namespaces(detail)`` returning the namespaces
+    the response depends on. Only successful responses are cached and the key
+    covers the absolute URL, so pagination links and file URLs stay correct.
+
+    The validators ConditionalGetMixin computed for the response are cached
+    with it and served on hits, so a stale copy (e.g. in another worker's
+    LocMemCache) never goes out under a fresh ETag.
+    """
+    def get_cache_namespaces(self, detail):
+        raise NotImplementedError
+
+    def cached_response(self, request, detail, build_response):
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return build_response()
+
+        namespaces = self.get_cache_namespaces(detail)
+        stats_namespace = namespaces[0].split(':')[0]
+        versions = get_versions(namespaces)
+        digest = hashlib.md5(request.build_absolute_uri().encode(), usedforsecurity=False).hexdigest()
+        key = '{}:response:{}:{}:{}'.format(
+            settings.RESPONSE_CACHE_PREFIX, ':'.join(namespaces),
+            '.'.join(str(version) for version in versions), digest
+        )
+
+        cache = get_cache()
+        entry = cache.get(key)
+        if entry is not None:
+            stats.incr(stats_namespace, 'hits')
+            data, validators = entry
+            return Response(data, headers=validators)
+
+        stats.incr(stats_namespace, 'misses')
+        validators = getattr(self, 'response_validators', {})
+        response = build_response()
+        if response.status_code == 200:
+            cache.set(key, (response.data, validators), timeout=settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, False, lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, True, lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs)
+        )
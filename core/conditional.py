@@ -0,0 +1,86 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """
+    Build a strong ETag from the given validator parts
+    """
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode(), usedforsecurity=False)
+    return f'"{digest.hexdigest()}"'
+
+
+class ConditionalGetMixin:
+    """
+    Answer If-None-Match / If-Modified-Since on list and retrieve with a 304
+    before anything is serialized.
+
+    Validators come from a single cheap query on ``validator_field``:
+    max(updated_at) plus a row count for lists (ETag only), the row's own
+    timestamp for detail routes (ETag and Last-Modified).
+    """
+    validator_field = 'updated_at'
+
+    def get_validator_queryset(self):
+        """
+        Queryset the validators are computed from. Override it to skip
+        annotations or prefetches that get_queryset() adds for serialization.
+        """
+        return self.get_queryset()
+
+    def get_list_validators(self, request):
+        queryset = self.filter_queryset(self.get_validator_queryset()).order_by()
+        state = queryset.aggregate(last_modified=Max(self.validator_field), count=Count('pk'))
+        last_modified = state['last_modified']
+        etag = make_etag('list', request.get_full_path(), last_modified and last_modified.isoformat(), state['count'])
+        # Deletions don't move max(updated_at), so lists only validate by ETag
+        return etag, None
+
+    def get_detail_validators(self, request):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        last_modified = (
+            self.get_validator_queryset().order_by().filter(**filter_kwargs)
+            .values_list(self.validator_field, flat=True).first()
+        )
+        if last_modified is None:
+            return None, None
+        etag = make_etag('detail', request.get_full_path(), last_modified.isoformat())
+        return etag, last_modified
+
+    def conditional_response(self, request, etag, last_modified, build_response):
+        if etag is None:
+            return build_response()
+
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        # Read by CachedResponseMixin, which stores them with the payload
+        self.response_validators = {'ETag': etag}
+        if timestamp is not None:
+            self.response_validators['Last-Modified'] = http_date(timestamp)
+        if response is None:
+            response = build_response()
+            if response.status_code != 200:
+                return response
+
+        # A cached body keeps the validators it was cached with
+        for header, value in self.response_validators.items():
+            response.setdefault(header, value)
+        # Let clients keep a copy but always revalidate it
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = self.get_list_validators(request)
+        return self.conditional_response(
+            request, etag, last_modified, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        etag, last_modified = self.get_detail_validators(request)
+        return self.conditional_response(
+            request, etag, last_modified, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        )
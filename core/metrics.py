@@ -0,0 +1,285 @@
+"""
+Per-request latency, SQL and serializer instrumentation.
+
+``MetricsMiddleware`` times every request and, through
+``connection.execute_wrapper``, counts the queries it runs and the time
+spent in the database. Serializers built on ``TimedDataMixin`` (and
+``core.serializers.ValuesSerializer``) add the time spent building their
+``data`` as well. Aggregates are kept per process and exposed in the
+Prometheus text format by ``api.views.MetricsView``; slow requests are
+logged with their SQL for a sampled fraction of them.
+
+Recording a request costs a few counter updates under one lock, so the
+middleware is cheap enough to stay enabled in production.
+
+Under ASGI the ORM runs on executor threads, whose connections the
+middleware can't wrap per request. There every connection gets a
+permanent ``record_sql`` wrapper instead, which finds the request through
+the ``current_request`` context variable.
+"""
+import bisect
+import contextvars
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Metrics of the request being handled in the current thread / task
+current_request = contextvars.ContextVar('current_request_metrics', default=None)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus layout
+    """
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            total += count
+            yield bound, total
+
+
+class MetricsRegistry:
+    """
+    Per-process request metrics, keyed by (view, method, status)
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.durations = defaultdict(lambda: Histogram(DURATION_BUCKETS))
+            self.query_counts = defaultdict(lambda: Histogram(QUERY_COUNT_BUCKETS))
+            self.db_time = defaultdict(float)
+            self.serializer_time = defaultdict(float)
+
+    def record(self, labels, request_metrics, duration):
+        with self._lock:
+            self.durations[labels].observe(duration)
+            self.query_counts[labels].observe(request_metrics.queries)
+            self.db_time[labels] += request_metrics.db_time
+            self.serializer_time[labels] += request_metrics.serializer_time
+
+    def render(self):
+        """
+        Serialize all metrics in the Prometheus text exposition format
+        """
+        with self._lock:
+            lines = []
+            self._render_histogram(
+                lines, 'http_request_duration_seconds', 'Request latency by view', self.durations
+            )
+            self._render_histogram(
+                lines, 'http_request_db_queries', 'SQL queries per request by view', self.query_counts
+            )
+            self._render_counter(
+                lines, 'http_request_db_seconds_total', 'Time spent in SQL queries by view', self.db_time
+            )
+            self._render_counter(
+                lines, 'http_request_serializer_seconds_total', 'Time spent building serializer data by view',
+                self.serializer_time
+            )
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _labels(labels, **extra):
+        view, method, status = labels
+        pairs = {'view': view, 'method': method, 'status': status, **extra}
+        return ','.join(f'{key}="{escape_label(value)}"' for key, value in pairs.items())
+
+    def _render_histogram(self, lines, name, help_text, histograms):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for labels, histogram in sorted(histograms.items()):
+            for bound, total in histogram.cumulative():
+                lines.append(f'{name}_bucket{{{self._labels(labels, le=bound)}}} {total}')
+            lines.append(f'{name}_sum{{{self._labels(labels)}}} {histogram.sum}')
+            lines.append(f'{name}_count{{{self._labels(labels)}}} {sum(histogram.counts)}')
+
+    def _render_counter(self, lines, name, help_text, values):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for labels, value in sorted(values.items()):
+            lines.append(f'{name}{{{self._labels(labels)}}} {value}')
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetrics:
+    """
+    Counters for a single request; also the execute_wrapper recording its SQL
+    """
+    def __init__(self, max_statements, is_async=False):
+        self.is_async = is_async
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+        self.max_statements = max_statements
+        self.statements = []
+        self._sequence = itertools.count()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += duration
+            # Keep the slowest statements, as SQL text only: parameters may hold personal data
+            entry = (duration, next(self._sequence), sql)
+            if len(self.statements) < self.max_statements:
+                heapq.heappush(self.statements, entry)
+            elif duration > self.statements[0][0]:
+                heapq.heapreplace(self.statements, entry)
+
+
+def record_sql(execute, sql, params, many, context):
+    """
+    Connection-wide execute_wrapper used for requests served by the ASGI handler
+    """
+    request_metrics = current_request.get()
+    if request_metrics is None or not request_metrics.is_async:
+        return execute(sql, params, many, context)
+    return request_metrics(execute, sql, params, many, context)
+
+
+def install_sql_recorder(sender, connection, **kwargs):
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_sql)
+
+
+@contextmanager
+def timed_serialization():
+    """
+    Add the time spent in the block to the current request's serializer time;
+    nested blocks (a serializer building another one's data) count once
+    """
+    request_metrics = current_request.get()
+    if request_metrics is None or request_metrics.serializing:
+        yield
+        return
+    request_metrics.serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        request_metrics.serializer_time += time.perf_counter() - start
+        request_metrics.serializing = False
+
+
+class TimedDataMixin:
+    """
+    Serializer mixin recording the cost of building ``data`` in the request
+    metrics. ModelSerializers using it set ``list_serializer_class`` to
+    TimedListSerializer in their Meta so ``many=True`` is timed as well.
+    """
+    @property
+    def data(self):
+        with timed_serialization():
+            return super().data
+
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    pass
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match.route
+
+
+class MetricsMiddleware:
+    """
+    Record latency, SQL and serializer time of every request
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            connection_created.connect(install_sql_recorder, dispatch_uid='core.metrics.install_sql_recorder')
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        request_metrics = RequestMetrics(settings.METRICS_SLOW_REQUEST_MAX_STATEMENTS)
+        token = current_request.set(request_metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(request_metrics))
+                response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.record(request, response, request_metrics, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+
+        request_metrics = RequestMetrics(settings.METRICS_SLOW_REQUEST_MAX_STATEMENTS, is_async=True)
+        token = current_request.set(request_metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.record(request, response, request_metrics, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, request_metrics, duration):
+        labels = (view_label(request), request.method, str(response.status_code))
+        registry.record(labels, request_metrics, duration)
+        if duration >= settings.METRICS_SLOW_REQUEST_THRESHOLD and random.random() < settings.METRICS_SLOW_REQUEST_SAMPLE_RATE:
+            log_slow_request(request, labels, request_metrics, duration)
+
+
+def log_slow_request(request, labels, request_metrics, duration):
+    statements = sorted(request_metrics.statements, reverse=True)
+    logger.warning(
+        "Slow request %s %s (%s) took %.3fs: %s queries in %.3fs, serializers %.3fs\n%s",
+        request.method, request.path, labels[0], duration, request_metrics.queries, request_metrics.db_time,
+        request_metrics.serializer_time,
+        '\n'.join(f'  {seconds * 1000:.1f}ms {sql}' for seconds, _, sql in statements),
+    )
@@ -0,0 +1,20 @@
+"""
+Random field values for the randomized serializer tests.
+
+The text covers JSON escapes, non-ASCII and the JavaScript line
+separators; datetimes are either whole seconds or carry microseconds, so
+both renderings of a timestamp are exercised.
+"""
+from datetime import datetime, timedelta, timezone
+
+ALPHABET = 'abc XYZ 019 "\\/<>&\'\t\n é ß 漢字 🚀 \u2028\u2029'
+
+
+def random_text(rng, max_length=40):
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, max_length)))
+
+
+def random_datetime(rng):
+    moment = datetime(2020, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=rng.randint(0, 10 ** 8))
+    # Whole seconds render without a fraction
+    return moment.replace(microsecond=rng.choice([0, rng.randint(1, 999999)]))
@@ -0,0 +1,43 @@
+"""
+JSON renderer backed by orjson, falling back to DRF's stdlib renderer.
+
+Output matches ``rest_framework.renderers.JSONRenderer`` for the compact,
+UTF-8 responses the API returns: same separators, unescaped non-ASCII text,
+U+2028/U+2029 escaped, and values orjson doesn't know (datetimes, decimals,
+lazy strings...) converted by DRF's own encoder. Floats in exponent notation
+are written without padding (``1e-7`` rather than ``1e-07``) and NaN as
+``null``. Indented output, ASCII-only settings, values orjson can't encode
+(such as integers beyond 64 bits) and environments without orjson use the
+stdlib.
+"""
+from rest_framework import renderers
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+if orjson is not None:
+    # Datetimes go through the encoder so UTC renders as "Z" like DRF does
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            content = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except TypeError:
+            # orjson.JSONEncodeError: out-of-range integers and the like
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same as DRF: keep the output safe to embed in JavaScript
+        if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+            content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return content
@@ -0,0 +1,242 @@
+"""
+Read-only serializers over ``.values()`` rows.
+
+A ``ValuesSerializer`` reproduces what an existing ModelSerializer
+(``serializer_class``) returns for reads, without building model instances
+or going through each field's ``get_attribute``/``to_representation``.
+It selects only the columns the serializer reads and converts each value
+with an extractor compiled once from the DRF field:
+
+- strings, booleans, integers and floats: the builtin constructor DRF uses
+- UUIDs: ``str`` (``hex_verbose``) or ``.hex``
+- datetimes: ISO 8601 in the field's timezone, UTC written as ``Z``
+- files: the storage URL, made absolute when a request is in the context
+
+Nested ``many=True`` ModelSerializers (``MessageSerializer.attachments``)
+are filled from one extra ``.values()`` query, like a prefetch. Fields
+outside that set (method fields, related fields, dotted sources...) are
+rejected with ImproperlyConfigured when the serializer is first used.
+"""
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import ManyToOneRel
+from rest_framework import serializers
+from rest_framework.fields import ISO_8601
+from rest_framework.settings import api_settings
+
+from .metrics import timed_serialization
+
+# ValuesSerializer per ModelSerializer class, for nested fields
+_registry = {}
+
+# Checked in order: EmailField is a CharField, UUIDField is not
+SIMPLE_FIELDS = (
+    (serializers.BooleanField, bool),
+    (serializers.CharField, str),
+    (serializers.IntegerField, int),
+    (serializers.FloatField, float),
+)
+
+
+class ValuesSerializer:
+    """
+    Drop-in for ``serializer_class(instance, many=..., context=...).data``
+    where ``instance`` holds rows from ``values(queryset)``
+    """
+    serializer_class = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Nested serializers of other classes reuse this one
+        if cls.serializer_class is not None:
+            _registry.setdefault(cls.serializer_class, cls)
+
+    def __init__(self, instance=None, many=False, context=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+
+    @classmethod
+    def get_plan(cls):
+        """
+        (name, source, kind, field) per readable field, built on first use
+        """
+        if '_plan' not in cls.__dict__:
+            cls._plan = compile_plan(cls.serializer_class)
+        return cls._plan
+
+    @classmethod
+    def get_columns(cls):
+        model = cls.serializer_class.Meta.model
+        columns = [source for _, source, kind, _ in cls.get_plan() if kind != 'nested']
+        if any(kind == 'nested' for _, _, kind, _ in cls.get_plan()) and model._meta.pk.attname not in columns:
+            columns.append(model._meta.pk.attname)
+        return columns
+
+    @classmethod
+    def values(cls, queryset):
+        """
+        The queryset reduced to the columns this serializer reads
+        """
+        return queryset.prefetch_related(None).values(*cls.get_columns())
+
+    @property
+    def data(self):
+        with timed_serialization():
+            rows = list(self.instance) if self.many else [self.instance]
+            results = self.to_representation(rows)
+        return results if self.many else results[0]
+
+    def to_representation(self, rows):
+        extractors = []
+        for name, source, kind, field in self.get_plan():
+            if kind == 'nested':
+                # Children are attached to the rows and copied as they are
+                children = self.nested_representations(field, rows)
+                pk = self.serializer_class.Meta.model._meta.pk.attname
+                for row in rows:
+                    row[source] = children.get(row[pk], [])
+                extractors.append((name, source, identity))
+            else:
+                extractors.append((name, source, make_extractor(kind, field, self.context)))
+        return [
+            {name: None if (value := row[source]) is None else extract(value) for name, source, extract in extractors}
+            for row in rows
+        ]
+
+    def nested_representations(self, field, rows):
+        """
+        Child representations per parent pk, fetched in one query
+        """
+        relation = self.serializer_class.Meta.model._meta.get_field(field.source)
+        child_class = values_serializer_for(field.child.__class__)
+        foreign_key = relation.field.attname
+        pk = self.serializer_class.Meta.model._meta.pk.attname
+        queryset = relation.related_model._default_manager.filter(
+            **{f'{foreign_key}__in': [row[pk] for row in rows]}
+        )
+        columns = child_class.get_columns()
+        child_rows = list(queryset.values(*columns, *([foreign_key] if foreign_key not in columns else [])))
+        children = child_class(child_rows, many=True, context=self.context).data
+        grouped = {}
+        for row, child in zip(child_rows, children):
+            grouped.setdefault(row[foreign_key], []).append(child)
+        return grouped
+
+
+def identity(value):
+    return value
+
+
+def values_serializer_for(serializer_class):
+    """
+    ValuesSerializer reproducing ``serializer_class``: the declared one, or
+    one created on first use
+    """
+    if serializer_class not in _registry:
+        type(f'{serializer_class.__name__}Values', (ValuesSerializer,), {'serializer_class': serializer_class})
+    return _registry[serializer_class]
+
+
+def compile_plan(serializer_class):
+    model = serializer_class.Meta.model
+    plan = []
+    for field in serializer_class()._readable_fields:
+        if '.' in field.source or field.source == '*':
+            raise ImproperlyConfigured(f"{serializer_class.__name__}.{field.field_name}: unsupported source")
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            raise ImproperlyConfigured(f"{serializer_class.__name__}.{field.field_name} is not a model field")
+
+        if isinstance(field, serializers.ListSerializer):
+            if not isinstance(model_field, ManyToOneRel) or not isinstance(field.child, serializers.ModelSerializer):
+                raise ImproperlyConfigured(f"{serializer_class.__name__}.{field.field_name}: unsupported nesting")
+            plan.append((field.field_name, field.source, 'nested', field))
+        elif model_field.is_relation:
+            raise ImproperlyConfigured(f"{serializer_class.__name__}.{field.field_name}: relations aren't supported")
+        elif isinstance(field, serializers.FileField):
+            plan.append((field.field_name, model_field.attname, 'file', field))
+        elif isinstance(field, serializers.DateTimeField):
+            plan.append((field.field_name, model_field.attname, 'datetime', field))
+        elif isinstance(field, serializers.UUIDField):
+            plan.append((field.field_name, model_field.attname, 'uuid', field))
+        elif any(isinstance(field, field_class) for field_class, _ in SIMPLE_FIELDS):
+            plan.append((field.field_name, model_field.attname, 'simple', field))
+        else:
+            raise ImproperlyConfigured(
+                f"{serializer_class.__name__}.{field.field_name}: {type(field).__name__} isn't supported"
+            )
+    return plan
+
+
+def make_extractor(kind, field, context):
+    """
+    Function converting a non-null column value the way ``field`` would
+    """
+    if kind == 'simple':
+        return next(convert for field_class, convert in SIMPLE_FIELDS if isinstance(field, field_class))
+    if kind == 'uuid':
+        if field.uuid_format == 'hex_verbose':
+            return str
+        if field.uuid_format == 'hex':
+            return lambda value: value.hex
+        return field.to_representation
+    if kind == 'datetime':
+        return datetime_extractor(field)
+    return file_extractor(field, context)
+
+
+def datetime_extractor(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def extract(value):
+        # Naive values need make_aware and its checks
+        if value.utcoffset() is None:
+            return field.to_representation(value)
+        text = value.astimezone(field_timezone).isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return extract
+
+
+def file_extractor(field, context):
+    model_field = field.parent.Meta.model._meta.get_field(field.source)
+    storage = model_field.storage
+    request = context.get('request')
+    if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+        return lambda name: name or None
+
+    def extract(name):
+        if not name:
+            return None
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+    return extract
+
+
+class ValuesReadMixin:
+    """
+    Serve GET list/retrieve through ``values_serializer_class`` from
+    ``.values()`` rows; other actions keep the ModelSerializer
+    """
+    values_serializer_class = None
+
+    def uses_values(self):
+        return (
+            self.values_serializer_class is not None
+            and self.action in ('list', 'retrieve')
+            and self.request.method in ('GET', 'HEAD')
+        )
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.uses_values():
+            return self.values_serializer_class.values(queryset)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.uses_values():
+            return self.values_serializer_class
+        return super().get_serializer_class()
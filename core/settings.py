@@ -10,6 +10,11 @@ SECRET_KEY = config('SECRET_KEY', default='django-insecure-key-for-dev')
 
 DEBUG = config('DEBUG', default=True, cast=bool)
 
+# Swagger/redoc (drf_yasg) and DRF's browsable API. Off in API-only production
+# workers, which then boot without their schema machinery and templates
+API_DOCS_ENABLED = config('API_DOCS_ENABLED', default=DEBUG, cast=bool)
+BROWSABLE_API_ENABLED = config('BROWSABLE_API_ENABLED', default=DEBUG, cast=bool)
+
 ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='*', cast=Csv())
 
 # Application definition
@@ -22,24 +27,26 @@ INSTALLED_APPS = [
     
     # REST framework
     'rest_framework',
-    'drf_yasg',
     'corsheaders',
     
     # Project apps
     'api',
     'tasks',
     'support',
+    'jobs',
     
     # Storage apps
-    'storages',
     'minio_storage', 
-    # Add this line
 ]
 
+if API_DOCS_ENABLED:
+    INSTALLED_APPS.append('drf_yasg')
+
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -70,21 +77,108 @@ WSGI_APPLICATION = 'core.wsgi.application'
 
 # REST Framework settings
 REST_FRAMEWORK = {
+    # orjson-backed JSON (core/renderers.py, core/parsers.py); the stdlib
+    # versions from rest_framework are drop-in replacements
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',  
+        'core.renderers.JSONRenderer',
+        *(['rest_framework.renderers.BrowsableAPIRenderer'] if BROWSABLE_API_ENABLED else []),
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [],  
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny', 
     ],
+    # Keyset pagination; each viewset declares its own cursor ordering
+    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.CursorPagination',
+    'PAGE_SIZE': config('API_PAGE_SIZE', default=50, cast=int),
 }
 
+# Cache
+# The default in-process LocMemCache is an LRU with per-entry TTL that culls
+# once MAX_ENTRIES is reached. Point CACHE_BACKEND / CACHE_LOCATION at a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache) to share entries
+# between workers.
+CACHE_BACKEND = config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': config('CACHE_LOCATION', default='woooba-api'),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
+    }
+}
+if CACHE_BACKEND.endswith('LocMemCache'):
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=5000, cast=int)}
+
+# Response cache for read endpoints (see core/cache.py). Writes only
+# invalidate the cache of the worker that handled them, so it is off by
+# default on the per-process LocMemCache; enable it there only when serving
+# with a single worker.
+RESPONSE_CACHE_ENABLED = config(
+    'RESPONSE_CACHE_ENABLED', default=not CACHE_BACKEND.endswith('LocMemCache'), cast=bool
+)
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_PREFIX = 'rc'
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=60, cast=int)
+
+# Readiness probes (api/health.py)
+READINESS_PROBE_TIMEOUT = config('READINESS_PROBE_TIMEOUT', default=2.0, cast=float)
+READINESS_CACHE_TTL = config('READINESS_CACHE_TTL', default=5.0, cast=float)
+
+# Request metrics (core/metrics.py), exposed at /api/metrics/
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_SLOW_REQUEST_THRESHOLD = config('METRICS_SLOW_REQUEST_THRESHOLD', default=1.0, cast=float)
+METRICS_SLOW_REQUEST_SAMPLE_RATE = config('METRICS_SLOW_REQUEST_SAMPLE_RATE', default=0.1, cast=float)
+METRICS_SLOW_REQUEST_MAX_STATEMENTS = config('METRICS_SLOW_REQUEST_MAX_STATEMENTS', default=20, cast=int)
+
+# Support conversation event streaming
+SUPPORT_EVENT_BROKER = config('SUPPORT_EVENT_BROKER', default='support.events.InProcessBroker')
+SUPPORT_STREAM_HEARTBEAT = config('SUPPORT_STREAM_HEARTBEAT', default=15, cast=int)
+SUPPORT_STREAM_RETRY_MS = config('SUPPORT_STREAM_RETRY_MS', default=3000, cast=int)
+# Seconds of messages before a recent ?since= cursor re-sent on sync, so
+# messages committed out of created_at order aren't skipped (0 disables)
+SUPPORT_SYNC_OVERLAP = config('SUPPORT_SYNC_OVERLAP', default=5, cast=int)
+
+# Support attachments
+SUPPORT_ATTACHMENT_MAX_SIZE = config('SUPPORT_ATTACHMENT_MAX_SIZE', default=100 * 1024 * 1024, cast=int)
+SUPPORT_UPLOAD_URL_EXPIRY = config('SUPPORT_UPLOAD_URL_EXPIRY', default=900, cast=int)
+
+# Archival of old closed conversations (manage.py archive_conversations)
+SUPPORT_ARCHIVE_AFTER_DAYS = config('SUPPORT_ARCHIVE_AFTER_DAYS', default=180, cast=int)
+SUPPORT_ARCHIVE_BATCH_SIZE = config('SUPPORT_ARCHIVE_BATCH_SIZE', default=500, cast=int)
+
+# Support full-text search
+SUPPORT_SEARCH_PAGE_SIZE = config('SUPPORT_SEARCH_PAGE_SIZE', default=20, cast=int)
+SUPPORT_SEARCH_MAX_RESULTS = config('SUPPORT_SEARCH_MAX_RESULTS', default=100, cast=int)
+
+# Image attachment thumbnails (see support/thumbnails.py)
+SUPPORT_THUMBNAIL_SIZE = (320, 320)
+SUPPORT_THUMBNAIL_QUALITY = config('SUPPORT_THUMBNAIL_QUALITY', default=80, cast=int)
+SUPPORT_THUMBNAIL_MAX_SOURCE_SIZE = config('SUPPORT_THUMBNAIL_MAX_SOURCE_SIZE', default=20 * 1024 * 1024, cast=int)
+
+# Background jobs (manage.py run_workers)
+JOBS_WORKER_THREADS = config('JOBS_WORKER_THREADS', default=4, cast=int)
+JOBS_POLL_INTERVAL = config('JOBS_POLL_INTERVAL', default=1.0, cast=float)
+JOBS_MAX_ATTEMPTS = config('JOBS_MAX_ATTEMPTS', default=5, cast=int)
+JOBS_BACKOFF_BASE = config('JOBS_BACKOFF_BASE', default=10, cast=int)
+JOBS_BACKOFF_MAX = config('JOBS_BACKOFF_MAX', default=3600, cast=int)
+# Running jobs locked for longer than this are assumed orphaned and requeued
+JOBS_LOCK_TIMEOUT = config('JOBS_LOCK_TIMEOUT', default=600, cast=int)
+
 # Database
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Take the write lock when a transaction starts so concurrent writers
+        # wait for each other instead of failing with "database is locked"
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+        # File-backed test database: shared-cache memory databases don't
+        # honour the busy timeout
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -96,6 +190,11 @@ if DATABASE_URL:
         conn_max_age=600,
         conn_health_checks=True,
     )
+    # Bound connecting to an unreachable server (readiness probes reconnect
+    # on the request thread)
+    DATABASES['default'].setdefault('OPTIONS', {})['connect_timeout'] = config(
+        'DATABASE_CONNECT_TIMEOUT', default=5, cast=int
+    )
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -148,15 +247,16 @@ MINIO_STORAGE_STATIC_USE_PRESIGNED = config('MINIO_STORAGE_STATIC_USE_PRESIGNED'
 MINIO_STORAGE_MEDIA_URL_ENDPONT = config('MINIO_STORAGE_MEDIA_URL_ENDPONT', default=MINIO_STORAGE_ENDPOINT)
 MINIO_STORAGE_STATIC_URL_ENDPONT = config('MINIO_STORAGE_STATIC_URL_ENDPONT', default=MINIO_STORAGE_ENDPOINT)
 
-# Configure Django storage backends to use MinIO
+# Configure Django storage backends to use MinIO (core/storage.py: the bucket
+# check runs on first use rather than when the storage is constructed)
 STORAGES = {
     # Media file management
     "default": {
-        "BACKEND": "minio_storage.storage.MinioMediaStorage",
+        "BACKEND": "core.storage.MinioMediaStorage",
     },
     # CSS and JS file management
     "staticfiles": {
-        "BACKEND": "minio_storage.storage.MinioStaticStorage",
+        "BACKEND": "core.storage.MinioStaticStorage",
     },
 }
 
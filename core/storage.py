@@ -0,0 +1,47 @@
+"""
+MinIO storage backends that don't talk to the server when constructed.
+
+django-minio-storage checks (and possibly creates) the bucket in the storage
+constructor, so the first request touching a file, or anything that merely
+resolves ``default_storage``, pays a network round trip and fails outright
+when MinIO is unreachable. Here the check runs once, on the first use of the
+client.
+"""
+import threading
+
+from minio_storage import storage
+
+
+class DeferredBucketCheckMixin:
+    _bucket_checked = False
+    _checking_bucket = False
+
+    def _init_check(self):
+        # Called by MinioStorage.__init__; postponed to the first client use
+        self._bucket_lock = threading.RLock()
+
+    @property
+    def client(self):
+        if not self._bucket_checked:
+            with self._bucket_lock:
+                # The check itself goes through this property
+                if not self._bucket_checked and not self._checking_bucket:
+                    self._checking_bucket = True
+                    try:
+                        storage.MinioStorage._init_check(self)
+                    finally:
+                        self._checking_bucket = False
+                    self._bucket_checked = True
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+
+class MinioMediaStorage(DeferredBucketCheckMixin, storage.MinioMediaStorage):
+    pass
+
+
+class MinioStaticStorage(DeferredBucketCheckMixin, storage.MinioStaticStorage):
+    pass
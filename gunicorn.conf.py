@@ -0,0 +1,106 @@
+"""
+Production gunicorn settings, read with ``gunicorn --config gunicorn.conf.py``.
+
+Sized from the CPUs available to the container and overridable through
+environment variables:
+
+- GUNICORN_WORKER_CLASS: ``gthread`` (default), ``sync`` or
+  ``uvicorn_worker.UvicornWorker`` (serves ``core.asgi`` instead of ``core.wsgi``)
+- WEB_CONCURRENCY: worker processes (default depends on the worker class;
+  a single ASGI worker while SUPPORT_EVENT_BROKER is the in-process broker,
+  whose conversation streams only see events published in their own process)
+- GUNICORN_THREADS: threads per gthread worker (default 2)
+- GUNICORN_PRELOAD: import the app in the master before forking (default True)
+- GUNICORN_MAX_REQUESTS / GUNICORN_MAX_REQUESTS_JITTER: worker recycling
+- GUNICORN_TIMEOUT, GUNICORN_KEEPALIVE
+- RUN_STARTUP_TASKS: run ``manage.py startup`` once in the master (default True)
+- HOST / PORT: listen address
+"""
+import os
+
+# A module-level `config` would be read as gunicorn's own config setting
+from decouple import config as env
+
+UVICORN_WORKER = 'uvicorn_worker.UvicornWorker'
+IN_PROCESS_BROKER = 'support.events.InProcessBroker'
+
+
+def cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def default_workers(worker_class, cpus, event_broker=IN_PROCESS_BROKER):
+    """
+    Sync workers block on I/O, so oversubscribe the CPUs; threaded and
+    event loop workers already overlap I/O inside one process, and more
+    processes than cores only adds context switches. ASGI workers serve
+    conversation streams, which need a shared event broker to span processes
+    """
+    if worker_class == 'sync':
+        return 2 * cpus + 1
+    if worker_class == UVICORN_WORKER and event_broker == IN_PROCESS_BROKER:
+        return 1
+    return cpus
+
+
+worker_class = env('GUNICORN_WORKER_CLASS', default='gthread')
+event_broker = env('SUPPORT_EVENT_BROKER', default=IN_PROCESS_BROKER)
+workers = env('WEB_CONCURRENCY', default=default_workers(worker_class, cpu_count(), event_broker), cast=int)
+threads = env('GUNICORN_THREADS', default=2, cast=int)
+wsgi_app = 'core.asgi:application' if worker_class == UVICORN_WORKER else 'core.wsgi:application'
+bind = f"{env('HOST', default='0.0.0.0')}:{env('PORT', default=8000, cast=int)}"
+
+# Load Django once in the master: workers share its memory copy-on-write
+# and boot without importing the project again
+preload_app = env('GUNICORN_PRELOAD', default=True, cast=bool)
+
+# Recycle workers to bound slow memory growth; the jitter keeps them from
+# all restarting at the same moment
+max_requests = env('GUNICORN_MAX_REQUESTS', default=1000, cast=int)
+max_requests_jitter = env('GUNICORN_MAX_REQUESTS_JITTER', default=100, cast=int)
+
+timeout = env('GUNICORN_TIMEOUT', default=30, cast=int)
+graceful_timeout = 30
+keepalive = env('GUNICORN_KEEPALIVE', default=5, cast=int)
+
+# Heartbeat files on tmpfs, so a slow disk can't get workers killed
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = '-'
+errorlog = '-'
+loglevel = env('GUNICORN_LOG_LEVEL', default='info')
+
+
+def on_starting(server):
+    """
+    Migrate and collect static files once, in the master, before any worker
+    is forked (workers that are recycled later don't repeat it)
+    """
+    if worker_class == UVICORN_WORKER and event_broker == IN_PROCESS_BROKER and workers > 1:
+        server.log.warning(
+            "%s ASGI workers share no conversation events with the in-process broker: "
+            "streams miss messages posted to other workers. Set SUPPORT_EVENT_BROKER "
+            "to a shared broker or run one worker.", workers
+        )
+    if not env('RUN_STARTUP_TASKS', default=True, cast=bool):
+        return
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from django.db import connections
+
+    call_command('startup')
+    # Forked workers must not share the master's sockets
+    connections.close_all()
+
+
+def post_fork(server, worker):
+    from django.conf import settings
+    if settings.configured:
+        from django.db import connections
+        connections.close_all()
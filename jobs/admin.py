@@ -0,0 +1,15 @@
+from django.contrib import admin
+from .models import Job
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'last_error')
+    readonly_fields = ('locked_by', 'locked_at', 'last_error', 'created_at', 'finished_at')
+    actions = ['retry_jobs']
+    
+    @admin.action(description="Retry selected jobs")
+    def retry_jobs(self, request, queryset):
+        retried = queryset.retry()
+        self.message_user(request, f"Requeued {retried} job(s)")
@@ -0,0 +1,39 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "Run deferred jobs from the job table until stopped"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=settings.JOBS_WORKER_THREADS,
+            help="Number of jobs run concurrently; 0 runs them inline in the main thread",
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.JOBS_POLL_INTERVAL,
+            help="Seconds to wait before checking an empty queue again",
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Exit once no jobs are due instead of waiting for more",
+        )
+
+    def handle(self, *args, threads, poll_interval, once=False, **options):
+        worker = Worker(threads=threads, poll_interval=poll_interval)
+
+        def shutdown(signum, frame):
+            self.stdout.write("Finishing running jobs before exiting...")
+            worker.stop()
+
+        if not once:
+            signal.signal(signal.SIGTERM, shutdown)
+            signal.signal(signal.SIGINT, shutdown)
+
+        self.stdout.write(f"Worker {worker.worker_id} started with {threads} thread(s)")
+        processed = worker.run(once=once)
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)"))
@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+class JobQuerySet(models.QuerySet):
+    def due(self, now=None):
+        return self.filter(status=Job.QUEUED, run_at__lte=now or timezone.now())
+
+    def claim(self, worker_id, limit):
+        """
+        Atomically mark up to ``limit`` due jobs as running for ``worker_id``
+        and return them, oldest first.
+
+        On databases with SKIP LOCKED, concurrent workers skip each other's
+        candidate rows instead of queueing on their locks. Elsewhere (SQLite)
+        the status guard on the UPDATE keeps two workers from claiming the
+        same job; the loser simply gets fewer jobs.
+        """
+        now = timezone.now()
+        with transaction.atomic(using=self.db):
+            candidates = self.due(now).order_by('run_at', 'id')
+            if connections[self.db].features.has_select_for_update_skip_locked:
+                candidates = candidates.select_for_update(skip_locked=True)
+            ids = list(candidates.values_list('id', flat=True)[:limit])
+            if not ids:
+                return []
+            self.filter(pk__in=ids, status=Job.QUEUED).update(
+                status=Job.RUNNING, locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1
+            )
+        return list(
+            self.filter(pk__in=ids, status=Job.RUNNING, locked_by=worker_id, locked_at=now).order_by('run_at', 'id')
+        )
+
+    def requeue_stale(self, timeout):
+        """
+        Release jobs whose worker died mid-run (locked for longer than
+        ``timeout`` seconds). Jobs out of attempts are dead-lettered instead.
+        Returns the number of jobs released.
+        """
+        now = timezone.now()
+        stale = self.filter(status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=timeout))
+        stale.filter(attempts__gte=F('max_attempts')).update(
+            status=Job.DEAD, locked_by='', locked_at=None, finished_at=now,
+            last_error='Worker stopped responding while running the job',
+        )
+        return stale.update(status=Job.QUEUED, locked_by='', locked_at=None, run_at=now)
+
+    def retry(self):
+        """
+        Put jobs (typically dead ones) back in the queue with a fresh attempt budget
+        """
+        return self.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(), locked_by='', locked_at=None, finished_at=None
+        )
+
+
+class Job(models.Model):
+    """
+    A unit of deferred work, run by ``manage.py run_workers``
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    DEAD = 'dead'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (DEAD, 'Dead'),
+    ]
+
+    name = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Claim scans only the due part of the queue
+            models.Index(
+                fields=['run_at', 'id'], name='jobs_job_queued_run_at_idx', condition=Q(status='queued')
+            ),
+            models.Index(fields=['status', 'locked_at'], name='jobs_job_status_locked_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
@@ -0,0 +1,62 @@
+"""
+Registry of job functions and the ``defer`` entry point used by views.
+
+Job functions are plain callables taking JSON-serializable keyword
+arguments, registered with the ``@job`` decorator in an app's ``jobs.py``.
+"""
+import random
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Job
+
+JobSpec = namedtuple('JobSpec', ['func', 'max_attempts'])
+
+registry = {}
+
+
+def job(name, max_attempts=None):
+    """
+    Register the decorated function as the job ``name``
+    """
+    def decorator(func):
+        if name in registry and registry[name].func is not func:
+            raise ValueError(f"Job {name!r} is already registered")
+        registry[name] = JobSpec(func, max_attempts)
+        return func
+    return decorator
+
+
+def get_job(name):
+    try:
+        return registry[name]
+    except KeyError:
+        raise LookupError(f"Unknown job {name!r}") from None
+
+
+def defer(name, delay=0, max_attempts=None, **payload):
+    """
+    Queue the job ``name`` with ``payload`` as its keyword arguments.
+
+    The row is written in the caller's transaction, so the job only becomes
+    visible to workers if the surrounding write commits.
+    """
+    spec = get_job(name)
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or spec.max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+
+
+def backoff_delay(attempts):
+    """
+    Seconds to wait before retrying a job that has failed ``attempts`` times:
+    exponential, capped, with jitter so failed batches don't retry in lockstep
+    """
+    delay = min(settings.JOBS_BACKOFF_BASE * 2 ** (attempts - 1), settings.JOBS_BACKOFF_MAX)
+    return random.uniform(delay / 2, delay)
@@ -0,0 +1,148 @@
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from .models import Job
+from .registry import backoff_delay, defer, job
+from .worker import Worker, run_job
+
+calls = []
+long_job_started = threading.Event()
+long_job_release = threading.Event()
+
+
+@job('jobs.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@job('jobs.tests.long')
+def long_running():
+    long_job_started.set()
+    long_job_release.wait(10)
+
+
+@job('jobs.tests.fail', max_attempts=2)
+def fail():
+    raise RuntimeError('boom')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_defer_and_run(self):
+        queued = defer('jobs.tests.record', value=1)
+
+        processed = Worker(threads=0).run(once=True)
+
+        self.assertEqual((processed, calls), (1, [1]))
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Job.SUCCEEDED, 1))
+        self.assertIsNotNone(queued.finished_at)
+
+    def test_unknown_job_is_rejected(self):
+        with self.assertRaises(LookupError):
+            defer('jobs.tests.missing')
+
+    def test_delayed_jobs_are_not_claimed_early(self):
+        defer('jobs.tests.record', delay=60, value=1)
+
+        self.assertEqual(Job.objects.claim('worker', 10), [])
+
+    def test_claimed_jobs_are_not_claimed_twice(self):
+        defer('jobs.tests.record', value=1)
+        defer('jobs.tests.record', value=2)
+
+        first = Job.objects.claim('first', 1)
+        second = Job.objects.claim('second', 10)
+
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(second), 1)
+        self.assertNotEqual(first[0].pk, second[0].pk)
+        self.assertEqual(Job.objects.claim('third', 10), [])
+
+    def test_failures_retry_with_backoff_then_dead_letter(self):
+        queued = defer('jobs.tests.fail')
+
+        with self.assertLogs('jobs.worker', 'WARNING'):
+            self.assertEqual(run_job(Job.objects.claim('worker', 1)[0]), Job.QUEUED)
+        queued.refresh_from_db()
+        self.assertGreater(queued.run_at, timezone.now())
+        self.assertIn('RuntimeError: boom', queued.last_error)
+
+        Job.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            self.assertEqual(run_job(Job.objects.claim('worker', 1)[0]), Job.DEAD)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Job.DEAD, 2))
+
+        Job.objects.filter(pk=queued.pk).retry()
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Job.QUEUED, 0))
+
+    def test_backoff_grows_and_is_capped(self):
+        with self.settings(JOBS_BACKOFF_BASE=10, JOBS_BACKOFF_MAX=100):
+            self.assertTrue(5 <= backoff_delay(1) <= 10)
+            self.assertTrue(20 <= backoff_delay(3) <= 40)
+            self.assertTrue(50 <= backoff_delay(20) <= 100)
+
+    def test_stale_jobs_are_requeued(self):
+        defer('jobs.tests.record', value=1)
+        claimed = Job.objects.claim('crashed', 1)[0]
+        Job.objects.filter(pk=claimed.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(Job.objects.requeue_stale(600), 1)
+        self.assertEqual(Job.objects.get(pk=claimed.pk).status, Job.QUEUED)
+
+
+class ThreadedWorkerTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_run_workers_drains_the_queue(self):
+        for value in range(10):
+            defer('jobs.tests.record', value=value)
+        out = StringIO()
+
+        call_command('run_workers', '--once', '--threads', '4', stdout=out)
+
+        self.assertIn('Processed 10 job(s)', out.getvalue())
+        self.assertEqual(sorted(calls), list(range(10)))
+        self.assertFalse(Job.objects.exclude(status=Job.SUCCEEDED).exists())
+
+    def test_idle_threads_claim_while_a_long_job_runs(self):
+        long_job_started.clear()
+        long_job_release.clear()
+        worker = Worker(threads=4, poll_interval=0.05)
+
+        def run():
+            try:
+                worker.run()
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=run)
+        defer('jobs.tests.long')
+        thread.start()
+        try:
+            self.assertTrue(long_job_started.wait(5))
+            defer('jobs.tests.record', value='queued')
+
+            deadline = time.monotonic() + 5
+            while not calls and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+            self.assertEqual(calls, ['queued'])
+            self.assertFalse(long_job_release.is_set())
+        finally:
+            long_job_release.set()
+            worker.stop()
+            thread.join(10)
+        self.assertEqual(worker.processed, 2)
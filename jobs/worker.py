@@ -0,0 +1,125 @@
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import Job
+from .registry import backoff_delay, get_job
+
+logger = logging.getLogger(__name__)
+
+
+def run_job(job):
+    """
+    Run one claimed job and record the outcome: success, a retry with
+    backoff, or dead-lettering once it is out of attempts
+    """
+    claimed = Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by)
+    try:
+        get_job(job.name).func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            logger.error("Job %s (%s) failed for good after %s attempts", job.pk, job.name, job.attempts)
+            claimed.update(status=Job.DEAD, last_error=error, locked_by='', locked_at=None, finished_at=now)
+            return Job.DEAD
+        delay = backoff_delay(job.attempts)
+        logger.warning("Job %s (%s) failed, retrying in %.0fs", job.pk, job.name, delay)
+        claimed.update(
+            status=Job.QUEUED, last_error=error, locked_by='', locked_at=None, run_at=now + timedelta(seconds=delay)
+        )
+        return Job.QUEUED
+
+    claimed.update(status=Job.SUCCEEDED, locked_by='', locked_at=None, finished_at=timezone.now())
+    return Job.SUCCEEDED
+
+
+class Worker:
+    """
+    Claims due jobs and runs them on a thread pool.
+
+    With ``threads=0`` jobs run inline in the calling thread, which is handy
+    for debugging and tests.
+    """
+    def __init__(self, threads=None, poll_interval=None, worker_id=None):
+        self.threads = settings.JOBS_WORKER_THREADS if threads is None else threads
+        self.poll_interval = settings.JOBS_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.stopping = threading.Event()
+        self.processed = 0
+
+    def stop(self):
+        self.stopping.set()
+
+    def requeue_stale(self):
+        released = Job.objects.requeue_stale(settings.JOBS_LOCK_TIMEOUT)
+        if released:
+            logger.warning("Released %s stale job(s)", released)
+
+    def run(self, once=False):
+        """
+        Process jobs until stopped, or with ``once`` until the queue has no due jobs
+        """
+        self.requeue_stale()
+        if self.threads < 1:
+            return self._run_inline(once)
+
+        last_stale_check = time.monotonic()
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='job-worker') as executor:
+            while not self.stopping.is_set():
+                jobs = []
+                capacity = self.threads - len(in_flight)
+                if capacity:
+                    jobs = Job.objects.claim(self.worker_id, capacity)
+                    in_flight.update(executor.submit(self._run_in_thread, job) for job in jobs)
+
+                if once and not jobs and not in_flight:
+                    break
+                if time.monotonic() - last_stale_check > settings.JOBS_LOCK_TIMEOUT:
+                    self.requeue_stale()
+                    last_stale_check = time.monotonic()
+                if in_flight:
+                    # Block until a thread frees up when all are busy; with idle
+                    # threads, claim again at the next poll even while jobs run
+                    timeout = None if len(in_flight) >= self.threads else self.poll_interval
+                    done, in_flight = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                    self.processed += len(done)
+                elif not jobs:
+                    self.stopping.wait(self.poll_interval)
+        # Leaving the executor block lets in-flight jobs finish before returning
+        self.processed += len(in_flight)
+        return self.processed
+
+    def _run_inline(self, once):
+        while not self.stopping.is_set():
+            jobs = Job.objects.claim(self.worker_id, 1)
+            if not jobs:
+                if once:
+                    break
+                self.stopping.wait(self.poll_interval)
+                continue
+            run_job(jobs[0])
+            self.processed += 1
+        return self.processed
+
+    def _run_in_thread(self, job):
+        close_old_connections()
+        try:
+            return run_job(job)
+        except Exception:
+            # Recording the outcome failed (e.g. the database went away);
+            # the lock timeout will hand the job to another worker
+            logger.exception("Could not record the outcome of job %s", job.pk)
+        finally:
+            close_old_connections()
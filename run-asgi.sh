@@ -0,0 +1,16 @@
+#!/bin/bash
+# Serve the ASGI application (async views and conversation streams) locally:
+# gunicorn manages uvicorn worker processes, tuned by gunicorn.conf.py.
+# Extra arguments go to gunicorn.
+#   ./run-asgi.sh --reload
+#
+# Conversation streams only receive events published in their own process
+# while SUPPORT_EVENT_BROKER is the default in-process broker, so a single
+# worker is started unless WEB_CONCURRENCY says otherwise. Only raise it
+# together with a shared broker.
+
+export GUNICORN_WORKER_CLASS=uvicorn_worker.UvicornWorker
+export RUN_STARTUP_TASKS="${RUN_STARTUP_TASKS:-False}"
+exec gunicorn --config gunicorn.conf.py \
+  --bind "${HOST:-127.0.0.1}:${PORT:-8000}" \
+  "$@"
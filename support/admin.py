@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Conversation, Message, Attachment
+from jobs.registry import defer
+from .models import Conversation, Message, Attachment, ArchivedConversation
 
 class MessageInline(admin.TabularInline):
     model = Message
@@ -11,10 +12,17 @@ class AttachmentInline(admin.TabularInline):
 
 @admin.register(Conversation)
 class ConversationAdmin(admin.ModelAdmin):
-    list_display = ('id', 'title', 'contact_name', 'contact_email', 'status', 'created_at', 'updated_at')
+    list_display = ('id', 'title', 'contact_name', 'contact_email', 'status', 'message_count', 'created_at', 'updated_at')
     search_fields = ('title', 'contact_name', 'contact_email')
     list_filter = ('status', 'created_at', 'updated_at')
     inlines = [MessageInline]
+    actions = ['rebuild_counters']
+    
+    @admin.action(description="Rebuild counters in the background")
+    def rebuild_counters(self, request, queryset):
+        ids = list(queryset.values_list('id', flat=True))
+        defer('support.rebuild_counters', conversation_ids=ids)
+        self.message_user(request, f"Queued a counter rebuild for {len(ids)} conversation(s)")
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
@@ -27,4 +35,10 @@ class MessageAdmin(admin.ModelAdmin):
 class AttachmentAdmin(admin.ModelAdmin):
     list_display = ('id', 'message', 'filename', 'content_type', 'uploaded_at')
     list_filter = ('content_type', 'uploaded_at')
-    search_fields = ('filename',)
\ No newline at end of file
+    search_fields = ('filename',)
+
+@admin.register(ArchivedConversation)
+class ArchivedConversationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'message_count', 'conversation_updated_at', 'archived_at', 'archive')
+    list_filter = ('status', 'archived_at')
+    readonly_fields = ('id', 'archive', 'offset', 'length', 'status', 'message_count', 'conversation_updated_at')
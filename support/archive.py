@@ -0,0 +1,161 @@
+"""
+Cold storage for old closed conversations.
+
+``archive_conversations`` writes conversations in batches to gzip-compressed
+JSONL files in the storage backend and deletes them from the hot tables.
+Every line (one conversation with its messages and attachment metadata) is
+its own gzip member, so a batch file is an ordinary ``.jsonl.gz`` while a
+single conversation can still be fetched with one ranged read.
+``rehydrate_conversation`` restores a conversation from its archive line.
+
+Attachment files are already in object storage and stay where they are;
+only their rows are archived.
+"""
+import gzip
+import json
+import uuid
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from django.core import serializers
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from core.cache import invalidate, mute_invalidation
+from .models import ArchivedConversation, Attachment, Conversation, Message
+from .signals import invalidate_conversation
+from .storage import get_object_store
+
+ARCHIVABLE_STATUSES = ('closed', 'resolved', 'user_closed')
+
+
+class ArchiveJSONEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder rounds datetimes to milliseconds; archives keep them exact
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def archivable_conversations(older_than_days):
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    return Conversation.objects.filter(status__in=ARCHIVABLE_STATUSES, updated_at__lt=cutoff)
+
+
+def encode_conversation(conversation):
+    """
+    One gzip-compressed JSONL line holding a prefetched conversation tree
+    """
+    messages = list(conversation.messages.all())
+    attachments = [attachment for message in messages for attachment in message.attachments.all()]
+    objects = serializers.serialize('python', [conversation, *messages, *attachments])
+    line = json.dumps({'id': str(conversation.id), 'objects': objects}, cls=ArchiveJSONEncoder) + '\n'
+    return gzip.compress(line.encode())
+
+
+def archive_batch(conversation_ids):
+    """
+    Archive one batch of conversations into a single storage file.
+
+    Conversations that change after they were exported are left in the
+    hot tables. Returns the number of conversations archived.
+    """
+    conversations = Conversation.objects.filter(pk__in=conversation_ids).with_messages().order_by('updated_at', 'id')
+    body = BytesIO()
+    entries = []
+    for conversation in conversations:
+        member = encode_conversation(conversation)
+        entries.append(ArchivedConversation(
+            id=conversation.id,
+            offset=body.tell(),
+            length=len(member),
+            status=conversation.status,
+            message_count=conversation.message_count,
+            conversation_updated_at=conversation.updated_at,
+        ))
+        body.write(member)
+    if not entries:
+        return 0
+
+    # Upload first: the rows are only deleted once their archive exists
+    name = default_storage.save(
+        timezone.now().strftime(f'support_archive/%Y/%m/%d/{uuid.uuid4().hex}.jsonl.gz'), ContentFile(body.getvalue())
+    )
+
+    with transaction.atomic():
+        versions = dict(
+            Conversation.objects.select_for_update().filter(pk__in=[entry.id for entry in entries])
+            .values_list('id', 'updated_at')
+        )
+        unchanged = [entry for entry in entries if versions.get(entry.id) == entry.conversation_updated_at]
+        for entry in unchanged:
+            entry.archive = name
+        ArchivedConversation.objects.bulk_create(unchanged)
+        archived_ids = [entry.id for entry in unchanged]
+        # One delete per table instead of a cascade running the cache
+        # receivers (and the attachment's message lookup) row by row
+        with mute_invalidation():
+            Attachment.objects.filter(message__conversation_id__in=archived_ids).delete()
+            Message.objects.filter(conversation_id__in=archived_ids).delete()
+            Conversation.objects.filter(pk__in=archived_ids).delete()
+        invalidate('conversations', *(f'conversation:{conversation_id}' for conversation_id in archived_ids))
+    return len(unchanged)
+
+
+def read_archived(entry):
+    """
+    Decode the archived conversation tree behind an ArchivedConversation
+    """
+    store = get_object_store()
+    member = b''.join(store.iter_range(entry.archive, entry.offset, entry.offset + entry.length - 1))
+    record = json.loads(gzip.decompress(member))
+    return [deserialized.object for deserialized in serializers.deserialize('python', record['objects'])]
+
+
+def restore_rows(model, objects, timestamp_fields):
+    """
+    Insert archived rows, keeping their original auto_now(_add) timestamps
+    """
+    # bulk_create overwrites auto timestamps; put the archived ones back
+    timestamps = [[getattr(obj, field) for field in timestamp_fields] for obj in objects]
+    model.objects.bulk_create(objects)
+    for obj, values in zip(objects, timestamps):
+        for field, value in zip(timestamp_fields, values):
+            setattr(obj, field, value)
+    model.objects.bulk_update(objects, timestamp_fields)
+
+
+def rehydrate_conversation(conversation_id):
+    """
+    Move an archived conversation back into the hot tables.
+    Returns True if the conversation is (now) available.
+    """
+    try:
+        conversation_id = uuid.UUID(str(conversation_id))
+    except ValueError:
+        return False
+
+    entry = ArchivedConversation.objects.filter(pk=conversation_id).first()
+    if entry is None:
+        return Conversation.objects.filter(pk=conversation_id).exists()
+    # Read outside the transaction so the write lock isn't held during the download
+    objects = read_archived(entry)
+
+    with transaction.atomic():
+        if not ArchivedConversation.objects.select_for_update().filter(pk=entry.pk).exists():
+            # Another request rehydrated it first
+            return Conversation.objects.filter(pk=conversation_id).exists()
+
+        conversation = next(obj for obj in objects if isinstance(obj, Conversation))
+        messages = [obj for obj in objects if isinstance(obj, Message)]
+        attachments = [obj for obj in objects if isinstance(obj, Attachment)]
+
+        restore_rows(Conversation, [conversation], ['created_at', 'updated_at'])
+        restore_rows(Message, messages, ['created_at'])
+        restore_rows(Attachment, attachments, ['uploaded_at'])
+        entry.delete()
+        invalidate_conversation(conversation.id)
+    return True
@@ -0,0 +1,104 @@
+"""
+Async variants of the support read endpoints, for the ASGI application.
+
+They return the same JSON as the DRF viewsets but read through the async
+ORM, so a slow client or a slow query holds a coroutine rather than a
+worker thread. Served by WSGI they still work, one request per worker.
+The response cache and ETag revalidation of the sync views are not
+applied here.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import require_GET
+from functools import wraps
+from rest_framework import exceptions
+from rest_framework.request import Request
+
+from core.renderers import JSONRenderer
+
+from .archive import rehydrate_conversation
+from .models import Conversation, Message
+from .pagination import ConversationCursorPagination, MessageCursorPagination, encode_message_cursor
+from .serializers import ConversationSerializer, ConversationSummarySerializer, MessageSerializer
+from .views import filter_conversations, messages_resent, messages_since, wants_messages
+
+renderer = JSONRenderer()
+
+def render(data, status=200):
+    return HttpResponse(renderer.render(data), status=status, content_type='application/json')
+
+def api_view(view):
+    """
+    Wrap the Django request for DRF pagination/serializers and turn
+    API errors into the same JSON bodies DRF's exception handler returns
+    """
+    @require_GET
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view(Request(request), *args, **kwargs)
+        except Http404 as error:
+            return render({'detail': str(exceptions.NotFound(*error.args).detail)}, status=404)
+        except exceptions.APIException as error:
+            detail = error.detail if isinstance(error.detail, (list, dict)) else {'detail': error.detail}
+            return render(detail, status=error.status_code)
+    return wrapper
+
+async def aget_or_404(queryset, **lookup):
+    try:
+        return await queryset.aget(**lookup)
+    except queryset.model.DoesNotExist:
+        raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+
+@api_view
+async def conversation_list(request):
+    queryset = filter_conversations(Conversation.objects.all(), request.query_params)
+    if wants_messages(request.query_params):
+        queryset, serializer_class = queryset.with_messages(), ConversationSerializer
+    else:
+        queryset, serializer_class = queryset.with_summary(), ConversationSummarySerializer
+
+    paginator = ConversationCursorPagination()
+    page = await paginator.apaginate_queryset(queryset, request)
+    serializer = serializer_class(page, many=True, context={'request': request})
+    return render(paginator.get_paginated_response(serializer.data).data)
+
+@api_view
+async def conversation_detail(request, pk):
+    queryset = filter_conversations(Conversation.objects.all(), request.query_params).with_messages()
+    try:
+        conversation = await aget_or_404(queryset, pk=pk)
+    except Http404:
+        # Archived conversations come back from cold storage on first access
+        if not await sync_to_async(rehydrate_conversation)(pk):
+            raise
+        conversation = await aget_or_404(queryset, pk=pk)
+    return render(ConversationSerializer(conversation, context={'request': request}).data)
+
+@api_view
+async def message_list(request, conversation_pk):
+    queryset = Message.objects.filter(conversation__id=conversation_pk).with_attachments()
+    context = {'request': request}
+    since = request.query_params.get('since')
+    if since is None:
+        paginator = MessageCursorPagination()
+        page = await paginator.apaginate_queryset(queryset, request)
+        return render(paginator.get_paginated_response(MessageSerializer(page, many=True, context=context).data).data)
+
+    page_size = MessageCursorPagination().get_page_size(request)
+    resent = messages_resent(queryset, since, page_size)
+    resent = [message async for message in resent][::-1] if resent is not None else []
+    messages = [message async for message in messages_since(queryset, since)[:page_size + 1]]
+    has_more = len(messages) > page_size
+    messages = messages[:page_size]
+    return render({
+        'results': MessageSerializer([*resent, *messages], many=True, context=context).data,
+        'next_cursor': encode_message_cursor(messages[-1]) if messages else since,
+        'has_more': has_more,
+    })
+
+@api_view
+async def message_detail(request, conversation_pk, pk):
+    queryset = Message.objects.filter(conversation__id=conversation_pk).with_attachments()
+    message = await aget_or_404(queryset, pk=pk)
+    return render(MessageSerializer(message, context={'request': request}).data)
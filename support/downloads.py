@@ -0,0 +1,95 @@
+"""
+Streaming attachment downloads with HTTP range and validator support.
+"""
+import re
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+from core.conditional import make_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_byte_range(header, size):
+    """
+    Parse a single-range ``Range`` header into an inclusive (start, end) pair.
+
+    Returns None when the header should be ignored (absent, malformed or
+    multi-range) and raises ValueError when the range is unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('Empty suffix range')
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('Range not satisfiable')
+    return start, end
+
+
+def if_range_matches(request, etag, last_modified):
+    """
+    A Range request only applies while the If-Range validator still matches
+    """
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    timestamp = parse_http_date_safe(if_range)
+    # A date only validates when it is exactly Last-Modified (RFC 9110 13.1.5)
+    return timestamp is not None and last_modified is not None and timestamp == last_modified
+
+
+def download_response(request, attachment, store, info, as_attachment=True):
+    """
+    Build a streaming (partial) response for an attachment's stored object
+    """
+    etag = f'"{info.etag}"' if info.etag else make_etag('attachment', attachment.id, info.size, info.last_modified)
+    modified = info.last_modified or attachment.uploaded_at
+    last_modified = int(modified.timestamp())
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        return not_modified
+
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Accept-Ranges': 'bytes',
+        'Content-Disposition': content_disposition_header(as_attachment, attachment.filename),
+    }
+
+    byte_range = None
+    if info.size and if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_byte_range(request.META.get('HTTP_RANGE'), info.size)
+        except ValueError:
+            return HttpResponse(status=416, headers={'Content-Range': f'bytes */{info.size}', **headers})
+
+    if byte_range:
+        start, end = byte_range
+        status = 206
+        headers['Content-Range'] = f'bytes {start}-{end}/{info.size}'
+    else:
+        start, end = 0, info.size - 1
+        status = 200
+    headers['Content-Length'] = str(end - start + 1)
+
+    if request.method == 'HEAD' or info.size == 0:
+        content = []
+    else:
+        content = store.iter_range(attachment.file.name, start, end)
+    return StreamingHttpResponse(content, status=status, content_type=attachment.content_type, headers=headers)
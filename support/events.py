@@ -0,0 +1,146 @@
+"""
+Conversation event broker used to push updates to streaming clients.
+
+Views publish events keyed by conversation id and the SSE stream endpoint
+subscribes to them. The broker class is configured with the
+``SUPPORT_EVENT_BROKER`` setting so a shared backend can replace the
+in-process one when several server processes need to see the same events.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+_brokers = {}
+_brokers_lock = threading.Lock()
+
+
+class Subscription:
+    """
+    A single client's view of a channel, bound to the event loop it was created in
+    """
+    def __init__(self, broker, channel, max_queue_size):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_queue_size)
+        self.dropped = 0
+
+    def deliver(self, event):
+        """
+        Hand an event to the subscriber; safe to call from any thread
+        """
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The subscriber's loop is gone; the stream is shutting down
+            self.close()
+
+    def _put(self, event):
+        if self.queue.full():
+            # Slow consumer: drop the oldest event rather than buffer without bound
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class BaseBroker:
+    """
+    Interface for event brokers
+    """
+    def publish(self, channel, event):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+class InProcessBroker(BaseBroker):
+    """
+    Fan events out to subscribers living in the current process
+    """
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.max_queue_size)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+
+def get_broker():
+    """
+    Return the broker configured by SUPPORT_EVENT_BROKER (one instance per class)
+    """
+    path = settings.SUPPORT_EVENT_BROKER
+    with _brokers_lock:
+        if path not in _brokers:
+            _brokers[path] = import_string(path)()
+        return _brokers[path]
+
+
+def publish_event(conversation_id, event_type, data, event_id=None):
+    """
+    Publish an event for a conversation once the current transaction commits
+    """
+    event = {'id': event_id, 'type': event_type, 'data': data}
+    channel = str(conversation_id)
+
+    def send():
+        try:
+            get_broker().publish(channel, event)
+        except Exception:
+            # Streaming is best effort; clients can always resync over HTTP
+            logger.exception("Failed to publish %s for conversation %s", event_type, channel)
+
+    transaction.on_commit(send)
+
+
+def format_sse(event):
+    """
+    Encode an event in the text/event-stream wire format
+    """
+    lines = []
+    if event.get('id'):
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event['data'], cls=DjangoJSONEncoder)}")
+    return '\n'.join(lines) + '\n\n'
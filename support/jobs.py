@@ -0,0 +1,37 @@
+"""
+Deferred support work, run by ``manage.py run_workers``
+"""
+import logging
+
+from core.cache import invalidate
+from jobs.registry import job
+from .models import Conversation
+from .thumbnails import generate_thumbnail
+
+logger = logging.getLogger(__name__)
+
+
+@job('support.generate_thumbnail', max_attempts=3)
+def generate_thumbnail_job(attachment_id, force=False):
+    generate_thumbnail(attachment_id, force=force)
+
+
+@job('support.conversation_status_changed')
+def conversation_status_changed(conversation_id, status, previous_status):
+    """
+    Notify about a status change (currently an audit log entry)
+    """
+    logger.info("Conversation %s moved from %s to %s", conversation_id, previous_status, status)
+
+
+@job('support.rebuild_counters')
+def rebuild_counters(conversation_ids=None):
+    """
+    Recompute denormalized counters, for the given conversations or all of them
+    """
+    conversations = Conversation.objects.all()
+    if conversation_ids is not None:
+        conversations = conversations.filter(pk__in=conversation_ids)
+    conversations.rebuild_counters()
+    # Counters only appear in list summaries
+    invalidate('conversations')
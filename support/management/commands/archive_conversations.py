@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from support.archive import archivable_conversations, archive_batch
+
+
+class Command(BaseCommand):
+    help = "Move old closed conversations to compressed JSONL archives in storage"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=settings.SUPPORT_ARCHIVE_AFTER_DAYS,
+            help="Only archive conversations not updated for this many days",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.SUPPORT_ARCHIVE_BATCH_SIZE,
+            help="Number of conversations per archive file",
+        )
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help="Maximum number of conversations to archive",
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Only report how many conversations would be archived",
+        )
+
+    def handle(self, *args, older_than, batch_size, limit=None, dry_run=False, **options):
+        candidates = archivable_conversations(older_than).order_by('updated_at', 'id')
+        if dry_run:
+            total = candidates.count()
+            self.stdout.write(f"{min(total, limit) if limit else total} conversation(s) would be archived")
+            return
+
+        archived = seen = 0
+        while limit is None or seen < limit:
+            size = batch_size if limit is None else min(batch_size, limit - seen)
+            batch = list(candidates.values_list('updated_at', 'id')[:size])
+            if not batch:
+                break
+            archived += archive_batch([pk for _, pk in batch])
+            seen += len(batch)
+            # Keyset: skip past this batch even if some of it changed and stayed behind
+            last_updated_at, last_id = batch[-1]
+            candidates = candidates.filter(
+                Q(updated_at__gt=last_updated_at) | Q(updated_at=last_updated_at, id__gt=last_id)
+            )
+            self.stdout.write(f"Archived {archived} conversation(s) so far")
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} conversation(s)"))
@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from support.models import Attachment
+from support.thumbnails import THUMBNAIL_CONTENT_TYPES, generate_thumbnail
+
+
+class Command(BaseCommand):
+    help = "Generate missing thumbnails for image attachments"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Regenerate thumbnails that already exist",
+        )
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help="Maximum number of attachments to process",
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help="Number of attachments processed in parallel",
+        )
+
+    def handle(self, *args, force=False, limit=None, workers=4, **options):
+        attachments = Attachment.objects.filter(
+            content_type__in=THUMBNAIL_CONTENT_TYPES, file_size__lte=settings.SUPPORT_THUMBNAIL_MAX_SOURCE_SIZE
+        ).order_by('uploaded_at', 'id')
+        if not force:
+            attachments = attachments.filter(thumbnail='')
+        ids = list(attachments.values_list('id', flat=True)[:limit])
+
+        def process(attachment_id):
+            try:
+                return generate_thumbnail(attachment_id, force=force)
+            except Exception as error:
+                self.stderr.write(f"{attachment_id}: {error}")
+                return None
+
+        def process_in_thread(attachment_id):
+            try:
+                return process(attachment_id)
+            finally:
+                # Pool threads would otherwise keep persistent connections open
+                connection.close()
+
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                names = list(executor.map(process_in_thread, ids))
+        else:
+            names = [process(attachment_id) for attachment_id in ids]
+        generated = sum(1 for name in names if name)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {generated} thumbnail(s) for {len(ids)} attachment(s)"
+        ))
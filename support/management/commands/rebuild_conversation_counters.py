@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from support.models import Conversation
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized conversation counters from the message and attachment tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report conversations whose counters drifted; exit with an error if any did",
+        )
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help="Maximum number of drifted conversations to list",
+        )
+
+    def handle(self, *args, check=False, limit=20, **options):
+        drifted = Conversation.objects.with_counter_drift().order_by()
+        total = drifted.count()
+
+        for conversation in drifted[:limit]:
+            self.stdout.write(
+                f"{conversation.id}: messages {conversation.message_count} -> {conversation.actual_message_count}, "
+                f"attachments {conversation.attachment_count} -> {conversation.actual_attachment_count}, "
+                f"last message {conversation.last_message_at} -> {conversation.actual_last_message_at}"
+            )
+
+        if check:
+            if total:
+                raise CommandError(f"{total} conversation(s) have drifted counters")
+            self.stdout.write(self.style.SUCCESS("No counter drift"))
+            return
+
+        updated = Conversation.objects.rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt counters for {updated} conversation(s); {total} had drifted"
+        ))
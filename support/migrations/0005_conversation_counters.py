@@ -0,0 +1,56 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:33
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Conversation = apps.get_model('support', 'Conversation')
+    Message = apps.get_model('support', 'Message')
+    Attachment = apps.get_model('support', 'Attachment')
+
+    messages = Message.objects.filter(conversation=OuterRef('pk'))
+    latest = messages.order_by('-created_at')
+    message_count = messages.order_by().values('conversation').annotate(total=Count('*')).values('total')
+    attachment_count = Attachment.objects.filter(message__conversation=OuterRef('pk')).order_by().values(
+        'message__conversation'
+    ).annotate(total=Count('*')).values('total')
+
+    Conversation.objects.update(
+        message_count=Coalesce(Subquery(message_count), 0),
+        attachment_count=Coalesce(Subquery(attachment_count), 0),
+        last_message_at=Subquery(latest.values('created_at')[:1]),
+        last_message_from_staff=Subquery(latest.values('is_from_staff')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0004_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='attachment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_from_staff',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from support.search import install_search_index
+    install_search_index(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    from support.search import uninstall_search_index
+    uninstall_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0006_attachment_thumbnail'),
+    ]
+
+    operations = [
+        # tsvector column + GIN index on PostgreSQL, FTS5 table + triggers on SQLite
+        migrations.RunPython(install, uninstall),
+    ]
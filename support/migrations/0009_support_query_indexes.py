@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0008_archived_conversation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attachment',
+            index=models.Index(fields=['message', 'uploaded_at', 'id'], name='support_att_msg_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['session_key', '-updated_at', '-id'], name='support_conv_session_upd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['status', '-updated_at', '-id'], name='support_conv_status_upd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(condition=models.Q(('status__in', ['open', 'in_progress'])), fields=['-updated_at', '-id'], name='support_conv_active_upd_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from support.search import install_search_index
+    install_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0009_support_query_indexes'),
+    ]
+
+    operations = [
+        # SQLite: replace the rowid-keyed external-content FTS5 table with a
+        # contentless one numbered through a message id side table
+        migrations.RunPython(install, migrations.RunPython.noop),
+    ]
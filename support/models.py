@@ -1,6 +1,139 @@
 from django.db import models
+from django.db.models import (
+    BooleanField, Case, Count, DateTimeField, F, IntegerField, OuterRef, Prefetch, Q, Subquery, TextField, Value, When
+)
+from django.db.models.functions import Coalesce, Greatest, Substr
+from django.utils import timezone
 import uuid
 
+# Number of characters of the latest message exposed in conversation summaries
+MESSAGE_PREVIEW_LENGTH = 120
+
+def actual_counter_expressions():
+    """
+    Subquery expressions computing each denormalized Conversation counter
+    from the message and attachment rows
+    """
+    messages = Message.objects.filter(conversation=OuterRef('pk'))
+    latest = messages.order_by('-created_at')
+    message_count = messages.order_by().values('conversation').annotate(total=Count('*')).values('total')
+    attachment_count = Attachment.objects.filter(message__conversation=OuterRef('pk')).order_by().values(
+        'message__conversation'
+    ).annotate(total=Count('*')).values('total')
+    
+    return {
+        'message_count': Coalesce(Subquery(message_count, output_field=IntegerField()), 0),
+        'attachment_count': Coalesce(Subquery(attachment_count, output_field=IntegerField()), 0),
+        'last_message_at': Subquery(latest.values('created_at')[:1], output_field=DateTimeField()),
+        'last_message_from_staff': Subquery(latest.values('is_from_staff')[:1], output_field=BooleanField()),
+    }
+
+class ConversationQuerySet(models.QuerySet):
+    def active(self):
+        """
+        Conversations still waiting on staff; the filter matches the
+        predicate of the support_conv_active_upd_idx partial index
+        """
+        return self.filter(status__in=Conversation.ACTIVE_STATUSES)
+    
+    def touch(self, at=None, **fields):
+        """
+        Move updated_at forward to ``at`` (default: now) and optionally set
+        other fields, with a single targeted UPDATE instead of rewriting the
+        whole row. updated_at never moves backwards, whatever order
+        concurrent writers commit in. Returns the number of rows updated.
+        """
+        at = at or timezone.now()
+        return self.update(updated_at=Greatest(F('updated_at'), Value(at)), **fields)
+    
+    def record_message(self, message):
+        """
+        Account for a newly created message: bump the counters and, unless a
+        newer message has already been recorded, the last-message fields
+        """
+        is_latest = Q(last_message_at__isnull=True) | Q(last_message_at__lte=message.created_at)
+        return self.touch(
+            at=message.created_at,
+            message_count=F('message_count') + 1,
+            last_message_at=Case(When(is_latest, then=Value(message.created_at)), default=F('last_message_at')),
+            last_message_from_staff=Case(
+                When(is_latest, then=Value(message.is_from_staff)), default=F('last_message_from_staff')
+            ),
+        )
+    
+    def forget_message(self, attachment_count=0):
+        """
+        Account for a deleted message (and its attachments). Must run after
+        the delete so the last-message fields are re-read from what remains.
+        """
+        latest = Message.objects.filter(conversation=OuterRef('pk')).order_by('-created_at')
+        return self.touch(
+            message_count=Greatest(F('message_count') - 1, Value(0)),
+            attachment_count=Greatest(F('attachment_count') - attachment_count, Value(0)),
+            last_message_at=Subquery(latest.values('created_at')[:1]),
+            last_message_from_staff=Subquery(latest.values('is_from_staff')[:1]),
+        )
+    
+    def record_attachments(self, delta, at=None):
+        """
+        Adjust attachment_count by ``delta`` (negative for deletions)
+        """
+        return self.touch(at=at, attachment_count=Greatest(F('attachment_count') + delta, Value(0)))
+    
+    def with_actual_counters(self):
+        """
+        Annotate each counter recomputed from the Message/Attachment tables,
+        prefixed with ``actual_``
+        """
+        return self.annotate(**{
+            f'actual_{name}': expression for name, expression in actual_counter_expressions().items()
+        })
+    
+    def with_counter_drift(self):
+        """
+        Conversations whose stored counters disagree with the actual rows
+        """
+        return self.with_actual_counters().exclude(
+            Q(message_count=F('actual_message_count'))
+            & Q(attachment_count=F('actual_attachment_count'))
+            & (
+                Q(last_message_at=F('actual_last_message_at'))
+                | Q(last_message_at__isnull=True, actual_last_message_at__isnull=True)
+            )
+            & (
+                Q(last_message_from_staff=F('actual_last_message_from_staff'))
+                | Q(last_message_from_staff__isnull=True, actual_last_message_from_staff__isnull=True)
+            )
+        )
+    
+    def rebuild_counters(self):
+        """
+        Recompute every denormalized counter from scratch in one UPDATE
+        """
+        return self.update(**actual_counter_expressions())
+    
+    def with_messages(self):
+        """
+        Prefetch the full message and attachment tree in two extra queries
+        """
+        return self.prefetch_related(
+            Prefetch('messages', queryset=Message.objects.with_attachments())
+        )
+    
+    def with_summary(self):
+        """
+        Annotate the latest message preview for list views; counts and
+        last-message fields are read from the denormalized columns
+        """
+        latest = Message.objects.filter(conversation=OuterRef('pk')).order_by('-created_at')
+        
+        return self.annotate(
+            last_message_preview=Subquery(
+                latest.values(preview=Substr('content', 1, MESSAGE_PREVIEW_LENGTH))[:1],
+                output_field=TextField()
+            ),
+        )
+
 class Conversation(models.Model):
     """
     Represents a support conversation between a user and support staff.
@@ -12,6 +145,8 @@ class Conversation(models.Model):
         ('closed', 'Closed'),
         ('user_closed', 'User Closed'),
     )
+    # Conversations still waiting on staff; covered by a partial index
+    ACTIVE_STATUSES = ('open', 'in_progress')
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=255)
@@ -28,12 +163,39 @@ class Conversation(models.Model):
     # Conversation status
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
     
+    # Denormalized message statistics, maintained by the support write paths
+    # (see ConversationQuerySet.record_message) and rebuilt by the
+    # rebuild_conversation_counters management command
+    message_count = models.PositiveIntegerField(default=0)
+    attachment_count = models.PositiveIntegerField(default=0)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    last_message_from_staff = models.BooleanField(null=True, blank=True)
+    
+    objects = ConversationQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='support_conv_updated_id_idx'),
+            # List filters, in the cursor pagination order (-updated_at, -id)
+            models.Index(fields=['session_key', '-updated_at', '-id'], name='support_conv_session_upd_idx'),
+            models.Index(fields=['status', '-updated_at', '-id'], name='support_conv_status_upd_idx'),
+            models.Index(
+                fields=['-updated_at', '-id'], name='support_conv_active_upd_idx',
+                condition=Q(status__in=['open', 'in_progress']),
+            ),
+        ]
     
     def __str__(self):
         return f"Conversation {self.id}: {self.title}"
 
+class MessageQuerySet(models.QuerySet):
+    def with_attachments(self):
+        """
+        Prefetch attachments in a single extra query
+        """
+        return self.prefetch_related('attachments')
+
 class Message(models.Model):
     """
     Represents a message within a conversation.
@@ -47,8 +209,13 @@ class Message(models.Model):
     is_from_staff = models.BooleanField(default=False)
     sender_name = models.CharField(max_length=255, blank=True)
     
+    objects = MessageQuerySet.as_manager()
+    
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['conversation', 'created_at', 'id'], name='support_msg_conv_created_idx'),
+        ]
     
     def __str__(self):
         return f"Message in {self.conversation.id}"
@@ -59,11 +226,42 @@ class Attachment(models.Model):
     """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     message = models.ForeignKey(Message, on_delete=models.CASCADE, related_name='attachments')
-    file = models.FileField(upload_to='support_attachments/%Y/%m/%d/')
+    file = models.FileField(upload_to='support_attachments/%Y/%m/%d/', max_length=255)
     filename = models.CharField(max_length=255)
     file_size = models.PositiveIntegerField()
     content_type = models.CharField(max_length=100)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     
+    # Bounded-size preview for image attachments, stored next to the original
+    # by the thumbnail workers (see support/thumbnails.py)
+    thumbnail = models.FileField(max_length=255, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['message', 'uploaded_at', 'id'], name='support_att_msg_uploaded_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Attachment {self.filename} for message {self.message.id}"
+
+class ArchivedConversation(models.Model):
+    """
+    Index entry for a conversation moved to cold storage by the
+    archive_conversations command. The record lives in a gzip member at
+    ``offset``..``offset + length`` of ``archive``, so it can be read back
+    without downloading the whole batch file.
+    """
+    id = models.UUIDField(primary_key=True, editable=False)
+    archive = models.CharField(max_length=255)
+    offset = models.PositiveBigIntegerField()
+    length = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=Conversation.STATUS_CHOICES)
+    message_count = models.PositiveIntegerField(default=0)
+    conversation_updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-archived_at']
+    
     def __str__(self):
-        return f"Attachment {self.filename} for message {self.message.id}"
\ No newline at end of file
+        return f"Archived conversation {self.id}"
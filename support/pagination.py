@@ -0,0 +1,117 @@
+import base64
+import binascii
+import uuid
+
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+def encode_message_cursor(message):
+    """
+    Build an opaque sync cursor pointing just after the given message
+    (an instance or a ``.values()`` row)
+    """
+    if isinstance(message, dict):
+        raw = f"{message['created_at'].isoformat()}|{message['id']}"
+    else:
+        raw = f'{message.created_at.isoformat()}|{message.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_message_cursor(cursor):
+    """
+    Return the (created_at, id) position encoded in a sync cursor
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, message_id = raw.split('|')
+        position = (parse_datetime(created_at), uuid.UUID(message_id))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValidationError({'since': 'Invalid cursor.'})
+    if position[0] is None:
+        raise ValidationError({'since': 'Invalid cursor.'})
+    return position
+
+
+class AsyncCursorPaginationMixin:
+    """
+    ``apaginate_queryset`` for async views: DRF's CursorPagination with the
+    page fetched through the async ORM (prefetches included). The links and
+    cursors it produces are the same as the sync paginator's.
+    """
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            order = self.ordering[0]
+            order_attr = order.lstrip('-')
+            if self.cursor.reverse != order.startswith('-'):
+                queryset = queryset.filter(**{order_attr + '__lt': current_position})
+            else:
+                queryset = queryset.filter(**{order_attr + '__gt': current_position})
+
+        # One extra row tells whether another page follows
+        results = [obj async for obj in queryset[offset:offset + self.page_size + 1]]
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = (
+            self._get_position_from_instance(results[-1], self.ordering) if has_following_position else None
+        )
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+        return self.page
+
+
+class ConversationCursorPagination(AsyncCursorPaginationMixin, CursorPagination):
+    """
+    Keyset pagination over the inbox order (most recently updated first)
+    """
+    ordering = ('-updated_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class MessageCursorPagination(AsyncCursorPaginationMixin, CursorPagination):
+    """
+    Keyset pagination over a conversation's messages in chronological order
+    """
+    ordering = ('created_at', 'id')
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class AttachmentCursorPagination(CursorPagination):
+    """
+    Keyset pagination over a message's attachments in upload order
+    """
+    ordering = ('uploaded_at', 'id')
+    page_size_query_param = 'page_size'
+    max_page_size = 200
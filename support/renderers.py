@@ -0,0 +1,18 @@
+from rest_framework.renderers import BaseRenderer
+
+from core.renderers import JSONRenderer
+
+
+class PassthroughRenderer(BaseRenderer):
+    """
+    Accepts any media type during content negotiation so binary downloads
+    aren't refused with 406; the view returns the body itself. Error
+    payloads are still rendered as JSON.
+    """
+    media_type = '*/*'
+    format = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return JSONRenderer().render(data)
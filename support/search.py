@@ -0,0 +1,176 @@
+"""
+Full-text search over message content, ranked per conversation.
+
+PostgreSQL keeps a generated ``tsvector`` column on support_message with a
+GIN index. SQLite keeps a contentless FTS5 table in sync through triggers.
+support_message has a UUID key and no stable rowid (VACUUM may renumber
+it), so the FTS rows are numbered by a side table mapping them to message
+ids. Either way a query only touches the index entries of matching
+messages, so latency tracks the number of hits rather than the table size.
+The index objects are raw DDL, installed by migrations 0007 and 0010
+rather than declared on the model.
+"""
+import re
+
+from django.db import connections
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'support_message_fts'
+FTS_IDS_TABLE = 'support_message_fts_ids'
+FTS_TRIGGERS = ('support_message_fts_ai', 'support_message_fts_ad', 'support_message_fts_au')
+
+POSTGRES_INSTALL = [
+    f"""
+    ALTER TABLE support_message ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(content, '')), 'A') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(sender_name, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS support_msg_search_idx ON support_message USING GIN (search_vector)",
+]
+POSTGRES_UNINSTALL = [
+    "DROP INDEX IF EXISTS support_msg_search_idx",
+    "ALTER TABLE support_message DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_TABLES = [
+    f"CREATE TABLE {FTS_IDS_TABLE} (docid INTEGER PRIMARY KEY, message_id char(32) NOT NULL UNIQUE)",
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        content, sender_name, content='', tokenize='porter unicode61'
+    )
+    """,
+]
+SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER support_message_fts_ai AFTER INSERT ON support_message BEGIN
+        INSERT INTO {FTS_IDS_TABLE}(message_id) VALUES (new.id);
+        INSERT INTO {FTS_TABLE}(rowid, content, sender_name)
+        SELECT docid, new.content, new.sender_name FROM {FTS_IDS_TABLE} WHERE message_id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER support_message_fts_ad AFTER DELETE ON support_message BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content, sender_name)
+        SELECT 'delete', docid, old.content, old.sender_name FROM {FTS_IDS_TABLE} WHERE message_id = old.id;
+        DELETE FROM {FTS_IDS_TABLE} WHERE message_id = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER support_message_fts_au AFTER UPDATE OF content, sender_name ON support_message BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content, sender_name)
+        SELECT 'delete', docid, old.content, old.sender_name FROM {FTS_IDS_TABLE} WHERE message_id = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, content, sender_name)
+        SELECT docid, new.content, new.sender_name FROM {FTS_IDS_TABLE} WHERE message_id = new.id;
+    END
+    """,
+]
+SQLITE_FILL = [
+    f"INSERT INTO {FTS_IDS_TABLE}(message_id) SELECT id FROM support_message",
+    f"""
+    INSERT INTO {FTS_TABLE}(rowid, content, sender_name)
+    SELECT ids.docid, m.content, m.sender_name FROM {FTS_IDS_TABLE} ids JOIN support_message m ON m.id = ids.message_id
+    """,
+]
+SQLITE_UNINSTALL = [f"DROP TRIGGER IF EXISTS {name}" for name in FTS_TRIGGERS] + [
+    f"DROP TABLE IF EXISTS {FTS_TABLE}", f"DROP TABLE IF EXISTS {FTS_IDS_TABLE}",
+]
+
+def install_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for sql in POSTGRES_INSTALL:
+                cursor.execute(sql)
+        elif connection.vendor == 'sqlite':
+            # Always built from scratch: a contentless index can't be rebuilt in place
+            for sql in SQLITE_UNINSTALL + SQLITE_TABLES + SQLITE_TRIGGERS + SQLITE_FILL:
+                cursor.execute(sql)
+
+
+def uninstall_search_index(connection):
+    statements = {'postgresql': POSTGRES_UNINSTALL, 'sqlite': SQLITE_UNINSTALL}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def repair_search_index(using='default', **kwargs):
+    """
+    post_migrate hook: SQLite migrations that rebuild support_message copy
+    it into a new table, which drops the triggers. Reinstall and rebuild
+    the FTS index when that happened.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        names = {row[0] for row in cursor.fetchall()}
+    if 'support_message' in names and not set(FTS_TRIGGERS + (FTS_TABLE, FTS_IDS_TABLE)) <= names:
+        install_search_index(connection)
+
+
+def parse_terms(query):
+    """
+    Split a user query into plain search terms
+    """
+    return re.findall(r'\w+', query)
+
+
+def search_conversations(query, limit, session_key=None, status=None, using='default'):
+    """
+    Return ``(conversation_id, rank)`` pairs for conversations with messages
+    matching every term of ``query``, best match first. Ranks are
+    backend-specific; only their order is meaningful.
+    """
+    terms = parse_terms(query)
+    if not terms:
+        return []
+
+    connection = connections[using]
+    filters, filter_params = [], []
+    if session_key:
+        filters.append('c.session_key = %s')
+        filter_params.append(session_key)
+    if status:
+        filters.append('c.status = %s')
+        filter_params.append(status)
+    where = ''.join(f' AND {condition}' for condition in filters)
+
+    if connection.vendor == 'postgresql':
+        sql = f"""
+            SELECT m.conversation_id, MAX(ts_rank(m.search_vector, q.query)) AS rank
+            FROM support_message m
+            JOIN support_conversation c ON c.id = m.conversation_id
+            CROSS JOIN websearch_to_tsquery('{SEARCH_CONFIG}', %s) AS q(query)
+            WHERE m.search_vector @@ q.query{where}
+            GROUP BY m.conversation_id
+            ORDER BY rank DESC, m.conversation_id
+            LIMIT %s
+        """
+        params = [' '.join(terms), *filter_params, limit]
+    elif connection.vendor == 'sqlite':
+        # Quote every term so user input can't use FTS5 query syntax;
+        # the last one matches as a prefix for search-as-you-type
+        match = ' '.join(f'"{term}"' for term in terms) + '*'
+        sql = f"""
+            SELECT m.conversation_id, -MIN(hits.score) AS rank
+            FROM (
+                SELECT rowid, rank AS score FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s
+            ) AS hits
+            JOIN {FTS_IDS_TABLE} ids ON ids.docid = hits.rowid
+            JOIN support_message m ON m.id = ids.message_id
+            JOIN support_conversation c ON c.id = m.conversation_id
+            WHERE 1 = 1{where}
+            GROUP BY m.conversation_id
+            ORDER BY rank DESC, m.conversation_id
+            LIMIT %s
+        """
+        params = [match, *filter_params, limit]
+    else:
+        raise NotImplementedError(f"Full-text search is not supported on {connection.vendor}")
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
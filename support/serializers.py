@@ -1,27 +1,100 @@
+from django.conf import settings
 from rest_framework import serializers
+
+from core.metrics import TimedDataMixin, TimedListSerializer
+from core.serializers import ValuesSerializer
 from .models import Conversation, Message, Attachment
 
-class AttachmentSerializer(serializers.ModelSerializer):
+class AttachmentSerializer(TimedDataMixin, serializers.ModelSerializer):
+    # Null until the thumbnail workers have processed an image attachment
+    thumbnail_url = serializers.FileField(source='thumbnail', read_only=True)
+    
     class Meta:
         model = Attachment
-        fields = ['id', 'file', 'filename', 'file_size', 'content_type', 'uploaded_at']
+        list_serializer_class = TimedListSerializer
+        fields = ['id', 'file', 'thumbnail_url', 'filename', 'file_size', 'content_type', 'uploaded_at']
         read_only_fields = ['id', 'filename', 'file_size', 'content_type', 'uploaded_at']
 
-class MessageSerializer(serializers.ModelSerializer):
+class AttachmentValuesSerializer(ValuesSerializer):
+    """
+    AttachmentSerializer output for list/retrieve, read from ``.values()`` rows
+    """
+    serializer_class = AttachmentSerializer
+
+class AttachmentUploadSerializer(serializers.Serializer):
+    """
+    Request for a presigned direct-to-storage upload
+    """
+    filename = serializers.CharField(max_length=255)
+    content_type = serializers.CharField(max_length=100, default='application/octet-stream')
+    file_size = serializers.IntegerField(min_value=1)
+    
+    def validate_file_size(self, value):
+        if value > settings.SUPPORT_ATTACHMENT_MAX_SIZE:
+            raise serializers.ValidationError(
+                f'Attachments are limited to {settings.SUPPORT_ATTACHMENT_MAX_SIZE} bytes.'
+            )
+        return value
+
+class AttachmentFinalizeSerializer(serializers.Serializer):
+    upload_token = serializers.CharField()
+
+class MessageSerializer(TimedDataMixin, serializers.ModelSerializer):
     attachments = AttachmentSerializer(many=True, read_only=True)
     
     class Meta:
         model = Message
+        list_serializer_class = TimedListSerializer
         fields = ['id', 'content', 'created_at', 'is_from_staff', 'sender_name', 'attachments']
         read_only_fields = ['id', 'created_at', 'is_from_staff']
 
-class ConversationSerializer(serializers.ModelSerializer):
+class MessageValuesSerializer(ValuesSerializer):
+    """
+    MessageSerializer output for list/retrieve, read from ``.values()`` rows
+    (attachments in one extra query)
+    """
+    serializer_class = MessageSerializer
+
+class ConversationSerializer(TimedDataMixin, serializers.ModelSerializer):
     messages = MessageSerializer(many=True, read_only=True)
     
     class Meta:
         model = Conversation
+        list_serializer_class = TimedListSerializer
         fields = [
             'id', 'title', 'created_at', 'updated_at', 
             'contact_email', 'contact_name', 'session_key', 'status', 'messages'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
\ No newline at end of file
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+class ConversationSummarySerializer(TimedDataMixin, serializers.ModelSerializer):
+    """
+    Lightweight conversation representation for list views.
+    Expects a queryset annotated with ``Conversation.objects.with_summary()``.
+    """
+    last_message_preview = serializers.CharField(read_only=True, allow_null=True)
+    unread_for_staff = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Conversation
+        list_serializer_class = TimedListSerializer
+        fields = [
+            'id', 'title', 'created_at', 'updated_at',
+            'contact_email', 'contact_name', 'session_key', 'status',
+            'message_count', 'last_message_preview', 'last_message_at', 'unread_for_staff'
+        ]
+        read_only_fields = fields
+    
+    def get_unread_for_staff(self, obj):
+        # The latest message came from the user and no staff reply followed it
+        return obj.last_message_from_staff is False
+
+class ConversationSearchResultSerializer(ConversationSummarySerializer):
+    """
+    Conversation summary with its full-text search rank (higher is better)
+    """
+    rank = serializers.FloatField(read_only=True)
+    
+    class Meta(ConversationSummarySerializer.Meta):
+        fields = ConversationSummarySerializer.Meta.fields + ['rank']
+        read_only_fields = fields
@@ -0,0 +1,43 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import invalidate, invalidation_muted
+from .models import Conversation, Message, Attachment
+
+
+def invalidate_conversation(conversation_id):
+    """
+    Expire cached detail for one conversation and every cached conversation list
+    """
+    invalidate('conversations', f'conversation:{conversation_id}')
+
+
+@receiver([post_save, post_delete], sender=Conversation)
+def conversation_changed(sender, instance, **kwargs):
+    if invalidation_muted():
+        return
+    invalidate_conversation(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Message)
+def message_changed(sender, instance, **kwargs):
+    if invalidation_muted():
+        return
+    invalidate_conversation(instance.conversation_id)
+
+
+@receiver([post_save, post_delete], sender=Attachment)
+def attachment_changed(sender, instance, **kwargs):
+    if invalidation_muted():
+        # Skip the message lookup too; the bulk writer invalidates once
+        return
+    if Attachment.message.is_cached(instance):
+        conversation_id = instance.message.conversation_id
+    else:
+        conversation_id = Message.objects.filter(pk=instance.message_id).values_list(
+            'conversation_id', flat=True
+        ).first()
+    if conversation_id is None:
+        # The message is already gone, so its own delete signal covered the conversation
+        return
+    invalidate_conversation(conversation_id)
@@ -0,0 +1,115 @@
+"""
+Direct object-storage operations for attachments.
+
+Django's storage API has no notion of presigned uploads or HEAD requests, so
+these helpers talk to the MinIO client of the configured storage backend
+(any storage exposing ``client`` and ``bucket_name``, like
+``minio_storage.storage.MinioMediaStorage``). Storages without a client fall
+back to the plain Django storage API where that is possible.
+"""
+import mimetypes
+import posixpath
+from collections import namedtuple
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+
+ObjectInfo = namedtuple('ObjectInfo', ['size', 'content_type', 'etag', 'last_modified'])
+
+# S3 error codes meaning "there is no such object"
+MISSING_OBJECT_CODES = ('NoSuchKey', 'NoSuchObject', 'ResourceNotFound')
+
+
+class DirectUploadNotSupported(Exception):
+    """The storage backend can't hand out presigned upload URLs"""
+
+
+class ObjectStore:
+    """
+    Thin wrapper around a Django storage backend
+    """
+    def __init__(self, storage):
+        self.storage = storage
+
+    @property
+    def client(self):
+        return getattr(self.storage, 'client', None)
+
+    @property
+    def has_object_client(self):
+        return self.client is not None and hasattr(self.storage, 'bucket_name')
+
+    def presigned_put_url(self, name, expires_in):
+        """
+        URL the client can PUT the object body to, valid for ``expires_in`` seconds
+        """
+        if not self.has_object_client:
+            raise DirectUploadNotSupported(type(self.storage).__name__)
+        return self.client.presigned_put_object(
+            self.storage.bucket_name, name, expires=timedelta(seconds=expires_in)
+        )
+
+    def stat(self, name):
+        """
+        HEAD the object; returns an ObjectInfo, or None if it doesn't exist
+        """
+        if self.has_object_client:
+            try:
+                info = self.client.stat_object(self.storage.bucket_name, name)
+            except Exception as error:
+                if getattr(error, 'code', None) in MISSING_OBJECT_CODES:
+                    return None
+                raise
+            return ObjectInfo(info.size, info.content_type, (info.etag or '').strip('"'), info.last_modified)
+
+        if not self.storage.exists(name):
+            return None
+        try:
+            last_modified = self.storage.get_modified_time(name)
+        except NotImplementedError:
+            last_modified = None
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        return ObjectInfo(self.storage.size(name), content_type, None, last_modified)
+
+    def iter_range(self, name, start, end, chunk_size=64 * 1024):
+        """
+        Yield the bytes ``start``..``end`` (inclusive) of an object in chunks,
+        without ever holding more than one chunk in memory
+        """
+        length = end - start + 1
+        if self.has_object_client:
+            response = self.client.get_object(self.storage.bucket_name, name, offset=start, length=length)
+            try:
+                yield from response.stream(chunk_size)
+            finally:
+                response.close()
+                response.release_conn()
+            return
+
+        with self.storage.open(name, 'rb') as f:
+            f.seek(start)
+            while length > 0:
+                chunk = f.read(min(chunk_size, length))
+                if not chunk:
+                    break
+                length -= len(chunk)
+                yield chunk
+
+
+def fit_object_name(name, max_length):
+    """
+    Shorten the file name part of ``name`` to fit ``max_length`` characters,
+    keeping its extension where there is room for it
+    """
+    if len(name) <= max_length:
+        return name
+    directory, filename = posixpath.split(name)
+    available = max_length - len(directory) - 1
+    stem, extension = posixpath.splitext(filename)
+    if len(extension) >= available:
+        return posixpath.join(directory, filename[:available])
+    return posixpath.join(directory, stem[:available - len(extension)] + extension)
+
+
+def get_object_store():
+    return ObjectStore(default_storage)
@@ -1,3 +1,1359 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.core.files.storage import InMemoryStorage, storages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.cache import stats as cache_stats
+from core.randomized import random_datetime, random_text
+from jobs.models import Job
+from minio.datatypes import Object
+from minio.error import S3Error
+
+from .archive import archive_batch
+from .events import InProcessBroker, format_sse, get_broker
+from .models import Conversation, Message, Attachment, ArchivedConversation
+from .pagination import AttachmentCursorPagination, ConversationCursorPagination, MessageCursorPagination
+from .search import FTS_TRIGGERS, SQLITE_TRIGGERS
+from .serializers import AttachmentSerializer, AttachmentValuesSerializer, MessageSerializer, MessageValuesSerializer
+from .thumbnails import generate_thumbnail
+
+# Keep attachment storage in memory so tests never reach MinIO
+TEST_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+class StubObjectResponse:
+    def __init__(self, data):
+        self.data = data
+        self.released = False
+
+    def stream(self, amt):
+        for i in range(0, len(self.data), amt):
+            yield self.data[i:i + amt]
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        self.released = True
+
+
+class StubMinioClient:
+    """
+    In-memory stand-in for the subset of the minio client the API uses
+    """
+    def __init__(self):
+        self.objects = {}
+
+    def presigned_put_object(self, bucket_name, object_name, expires):
+        return f'http://minio.local/{bucket_name}/{object_name}?X-Amz-Expires={int(expires.total_seconds())}'
+
+    def put(self, bucket_name, object_name, data, content_type):
+        # What the client's PUT to the presigned URL amounts to
+        self.objects[(bucket_name, object_name)] = (data, content_type)
+
+    def stat_object(self, bucket_name, object_name):
+        if (bucket_name, object_name) not in self.objects:
+            raise S3Error('NoSuchKey', 'Object does not exist', object_name, None, None, None)
+        data, content_type = self.objects[(bucket_name, object_name)]
+        return Object(bucket_name, object_name, size=len(data), content_type=content_type, etag='"abc"')
+
+    def get_object(self, bucket_name, object_name, offset=0, length=0):
+        data = self.objects[(bucket_name, object_name)][0]
+        return StubObjectResponse(data[offset:offset + length] if length else data[offset:])
+
+    def remove_object(self, bucket_name, object_name):
+        self.objects.pop((bucket_name, object_name), None)
+
+
+class StubMinioStorage(InMemoryStorage):
+    """
+    Storage backend exposing a MinIO-compatible client like MinioMediaStorage
+    """
+    bucket_name = 'media'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.client = StubMinioClient()
+
+    def exists(self, name):
+        return (self.bucket_name, name) in self.client.objects or super().exists(name)
+
+    def delete(self, name):
+        self.client.remove_object(self.bucket_name, name)
+
+
+STUB_MINIO_STORAGES = dict(TEST_STORAGES, default={'BACKEND': 'support.tests.StubMinioStorage'})
+
+
+def seed_conversations(count, messages=3, attachments=1, session_key='seed'):
+    """
+    Create conversations with a full message/attachment tree for query tests
+    """
+    conversations = []
+    for i in range(count):
+        conversation = Conversation.objects.create(title=f'Conversation {i}', session_key=session_key)
+        for j in range(messages):
+            message = Message.objects.create(conversation=conversation, content=f'Message {j}')
+            for k in range(attachments):
+                attachment = Attachment(
+                    message=message, filename=f'file-{k}.txt', file_size=4, content_type='text/plain'
+                )
+                attachment.file.save(f'file-{k}.txt', ContentFile(b'data'), save=False)
+                attachment.save()
+        conversations.append(conversation)
+    Conversation.objects.rebuild_counters()
+    return conversations
+
+
+class ConversationListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.conversation = Conversation.objects.create(title='Billing', session_key='abc')
+        Message.objects.create(conversation=self.conversation, content='Hello', sender_name='Ann')
+        Message.objects.create(conversation=self.conversation, content='Still there?', sender_name='Ann')
+        self.empty = Conversation.objects.create(title='Empty', session_key='abc')
+        Conversation.objects.rebuild_counters()
+        self.url = reverse('conversation-list')
+
+    def test_list_returns_summaries_without_messages(self):
+        response = self.client.get(self.url, {'session_key': 'abc'})
+
+        self.assertEqual(response.status_code, 200)
+        rows = {row['id']: row for row in response.json()['results']}
+        summary = rows[str(self.conversation.id)]
+        self.assertNotIn('messages', summary)
+        self.assertEqual(summary['message_count'], 2)
+        self.assertEqual(summary['last_message_preview'], 'Still there?')
+        self.assertIsNotNone(summary['last_message_at'])
+        self.assertTrue(summary['unread_for_staff'])
+
+        empty = rows[str(self.empty.id)]
+        self.assertEqual(empty['message_count'], 0)
+        self.assertIsNone(empty['last_message_preview'])
+        self.assertFalse(empty['unread_for_staff'])
+
+    def test_staff_reply_clears_unread_flag(self):
+        Message.objects.create(conversation=self.conversation, content='Hi!', is_from_staff=True)
+        Conversation.objects.rebuild_counters()
+
+        response = self.client.get(self.url, {'session_key': 'abc'})
+
+        rows = {row['id']: row for row in response.json()['results']}
+        self.assertFalse(rows[str(self.conversation.id)]['unread_for_staff'])
+
+    def test_expand_messages_returns_full_tree(self):
+        response = self.client.get(self.url, {'session_key': 'abc', 'expand': 'messages'})
+
+        rows = {row['id']: row for row in response.json()['results']}
+        self.assertEqual(len(rows[str(self.conversation.id)]['messages']), 2)
+
+    def test_detail_returns_full_tree(self):
+        response = self.client.get(reverse('conversation-detail', args=[self.conversation.id]))
+
+        self.assertEqual(len(response.json()['messages']), 2)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class QueryBudgetTests(TestCase):
+    """
+    Every read endpoint must cost a constant number of SQL statements,
+    no matter how many conversations, messages or attachments it returns
+    """
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.conversations = seed_conversations(50)
+        self.conversation = self.conversations[0]
+        self.message = self.conversation.messages.first()
+
+    def assertQueryBudget(self, budget, url, params=None):
+        with self.assertNumQueries(budget):
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_conversation_list_summary(self):
+        # validators + page
+        self.assertQueryBudget(2, reverse('conversation-list'), {'session_key': 'seed'})
+
+    def test_conversation_list_expanded(self):
+        # validators, conversations, messages, attachments
+        self.assertQueryBudget(4, reverse('conversation-list'), {'session_key': 'seed', 'expand': 'messages'})
+
+    def test_conversation_detail(self):
+        self.assertQueryBudget(4, reverse('conversation-detail', args=[self.conversation.id]))
+
+    def test_conversation_not_modified(self):
+        url = reverse('conversation-detail', args=[self.conversation.id])
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_message_list(self):
+        self.assertQueryBudget(2, reverse('message-list', args=[self.conversation.id]))
+
+    def test_message_detail(self):
+        self.assertQueryBudget(2, reverse('message-detail', args=[self.conversation.id, self.message.id]))
+
+    def test_attachment_list(self):
+        self.assertQueryBudget(1, reverse('attachment-list', args=[self.conversation.id, self.message.id]))
+
+    def test_set_status(self):
+        url = reverse('conversation-set-status', args=[self.conversation.id])
+        # select + prefetch messages + prefetch attachments,
+        # then savepoint + update + notification job insert + release
+        with self.assertNumQueries(7):
+            response = self.client.patch(url, {'status': 'closed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+
+    def test_conversation_update(self):
+        url = reverse('conversation-detail', args=[self.conversation.id])
+        # select + update, then conversation + prefetch messages + prefetch attachments
+        for method in (self.client.put, self.client.patch):
+            with self.subTest(method=method.__name__), self.assertNumQueries(5):
+                response = method(url, {'title': 'Renamed'}, format='json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['messages']), self.conversation.messages.count())
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.conversation = Conversation.objects.create(title='Paged')
+        for i in range(7):
+            Message.objects.create(conversation=self.conversation, content=f'Message {i}')
+
+    def collect_pages(self, url, params):
+        contents, pages = [], 0
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertNotIn('count', body)
+            contents.extend(row['content'] for row in body['results'])
+            url, params, pages = body['next'], None, pages + 1
+        return contents, pages
+
+    def test_messages_are_paged_in_chronological_order(self):
+        url = reverse('message-list', args=[self.conversation.id])
+
+        contents, pages = self.collect_pages(url, {'page_size': 3})
+
+        self.assertEqual(contents, [f'Message {i}' for i in range(7)])
+        self.assertEqual(pages, 3)
+
+    def test_conversations_are_paged_newest_first(self):
+        newer = Conversation.objects.create(title='Newer')
+
+        response = self.client.get(reverse('conversation-list'), {'page_size': 1})
+
+        body = response.json()
+        self.assertEqual(body['results'][0]['id'], str(newer.id))
+        self.assertIsNotNone(body['next'])
+
+
+@override_settings(SUPPORT_SYNC_OVERLAP=0)
+class MessageSyncTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.conversation = Conversation.objects.create(title='Sync')
+        self.url = reverse('message-list', args=[self.conversation.id])
+        for i in range(3):
+            Message.objects.create(conversation=self.conversation, content=f'Message {i}')
+
+    def test_sync_returns_only_new_messages(self):
+        body = self.client.get(self.url, {'since': ''}).json()
+        self.assertEqual([row['content'] for row in body['results']], ['Message 0', 'Message 1', 'Message 2'])
+        self.assertFalse(body['has_more'])
+        cursor = body['next_cursor']
+
+        Message.objects.create(conversation=self.conversation, content='Message 3')
+        body = self.client.get(self.url, {'since': cursor}).json()
+
+        self.assertEqual([row['content'] for row in body['results']], ['Message 3'])
+        self.assertNotEqual(body['next_cursor'], cursor)
+
+    def test_poll_without_changes_is_a_single_query(self):
+        cursor = self.client.get(self.url, {'since': ''}).json()['next_cursor']
+
+        with self.assertNumQueries(1):
+            body = self.client.get(self.url, {'since': cursor}).json()
+
+        self.assertEqual(body['results'], [])
+        self.assertEqual(body['next_cursor'], cursor)
+
+    def test_sync_respects_page_size(self):
+        body = self.client.get(self.url, {'since': '', 'page_size': 2}).json()
+
+        self.assertEqual(len(body['results']), 2)
+        self.assertTrue(body['has_more'])
+        body = self.client.get(self.url, {'since': body['next_cursor'], 'page_size': 2}).json()
+        self.assertEqual([row['content'] for row in body['results']], ['Message 2'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(self.url, {'since': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(SUPPORT_SYNC_OVERLAP=5)
+    def test_late_commit_behind_the_cursor_is_resent(self):
+        cursor = self.client.get(self.url, {'since': ''}).json()['next_cursor']
+        last = Message.objects.order_by('created_at').last()
+        # Saved before the last message but committed after the client synced
+        late = Message.objects.create(conversation=self.conversation, content='Late')
+        Message.objects.filter(pk=late.pk).update(created_at=last.created_at - timedelta(seconds=1))
+        Message.objects.filter(content='Message 0').update(created_at=last.created_at - timedelta(seconds=10))
+
+        body = self.client.get(self.url, {'since': cursor}).json()
+
+        self.assertEqual([row['content'] for row in body['results']], ['Late', 'Message 1'])
+        self.assertEqual(body['next_cursor'], cursor)
+        self.assertFalse(body['has_more'])
+
+    @override_settings(SUPPORT_SYNC_OVERLAP=5)
+    def test_resent_window_is_capped_at_the_page_size(self):
+        cursor = self.client.get(self.url, {'since': ''}).json()['next_cursor']
+
+        body = self.client.get(self.url, {'since': cursor, 'page_size': 1}).json()
+
+        self.assertEqual([row['content'] for row in body['results']], ['Message 1'])
+
+    @override_settings(SUPPORT_SYNC_OVERLAP=5)
+    def test_no_change_poll_past_the_overlap_is_empty(self):
+        Message.objects.update(created_at=timezone.now() - timedelta(minutes=1))
+        cursor = self.client.get(self.url, {'since': ''}).json()['next_cursor']
+
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                body = self.client.get(self.url, {'since': cursor}).json()
+            self.assertEqual(body, {'results': [], 'next_cursor': cursor, 'has_more': False})
+
+
+class RecordingBroker(InProcessBroker):
+    def __init__(self):
+        super().__init__()
+        self.published = []
+
+    def publish(self, channel, event):
+        self.published.append((channel, event))
+        super().publish(channel, event)
+
+
+class InProcessBrokerTests(TestCase):
+    def test_events_reach_subscribers_of_the_channel_only(self):
+        async def scenario():
+            broker = InProcessBroker()
+            subscription = broker.subscribe('a')
+            other = broker.subscribe('b')
+            broker.publish('a', {'type': 'ping', 'data': 1})
+            event = await subscription.get(timeout=1)
+            self.assertTrue(other.queue.empty())
+            subscription.close()
+            other.close()
+            self.assertEqual(broker.subscriber_count('a'), 0)
+            return event
+
+        self.assertEqual(asyncio.run(scenario()), {'type': 'ping', 'data': 1})
+
+    def test_slow_subscribers_drop_oldest_events(self):
+        async def scenario():
+            broker = InProcessBroker(max_queue_size=2)
+            subscription = broker.subscribe('a')
+            for i in range(3):
+                broker.publish('a', {'type': 'ping', 'data': i})
+            await asyncio.sleep(0)
+            return [(await subscription.get(timeout=1))['data'] for _ in range(2)], subscription.dropped
+
+        self.assertEqual(asyncio.run(scenario()), ([1, 2], 1))
+
+
+@override_settings(SUPPORT_EVENT_BROKER='support.tests.RecordingBroker')
+class ConversationEventTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.conversation = Conversation.objects.create(title='Live')
+        self.broker = get_broker()
+        self.broker.published.clear()
+
+    def test_write_paths_publish_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('conversation-add-message', args=[self.conversation.id]),
+                {'content': 'Hi'}, format='json'
+            )
+            self.client.post(
+                reverse('message-list', args=[self.conversation.id]),
+                {'content': 'Hello again'}, format='json'
+            )
+            self.client.patch(
+                reverse('conversation-set-status', args=[self.conversation.id]),
+                {'status': 'resolved'}, format='json'
+            )
+
+        types = [event['type'] for channel, event in self.broker.published]
+        self.assertEqual(types, ['message.created', 'message.created', 'conversation.status'])
+        self.assertTrue(all(channel == str(self.conversation.id) for channel, event in self.broker.published))
+        self.assertIsNotNone(self.broker.published[0][1]['id'])
+
+    async def test_stream_delivers_published_events(self):
+        response = await AsyncClient().get(reverse('conversation-stream', args=[self.conversation.id]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        event = {'id': None, 'type': 'conversation.status', 'data': {'status': 'closed'}}
+        self.broker.publish(str(self.conversation.id), event)
+        self.assertEqual(await anext(stream), format_sse(event).encode())
+        await stream.aclose()
+
+    async def test_stream_for_unknown_conversation_is_404(self):
+        response = await AsyncClient().get(reverse('conversation-stream', args=['00000000-0000-0000-0000-000000000000']))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_stream_requires_asgi(self):
+        response = self.client.get(reverse('conversation-stream', args=[self.conversation.id]))
+
+        self.assertEqual(response.status_code, 501)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.conversation = Conversation.objects.create(title='Cached', session_key='etag')
+        self.detail_url = reverse('conversation-detail', args=[self.conversation.id])
+        self.list_url = reverse('conversation-list')
+
+    def test_detail_revalidates_until_a_message_arrives(self):
+        response = self.client.get(self.detail_url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        self.client.post(reverse('message-list', args=[self.conversation.id]), {'content': 'New'}, format='json')
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['messages']), 1)
+
+    def test_detail_honours_if_modified_since(self):
+        last_modified = self.client.get(self.detail_url)['Last-Modified']
+
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_etag_changes_when_a_conversation_is_deleted(self):
+        other = Conversation.objects.create(title='Other', session_key='etag')
+        etag = self.client.get(self.list_url, {'session_key': 'etag'})['ETag']
+        self.assertEqual(
+            self.client.get(self.list_url, {'session_key': 'etag'}, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+        other.delete()
+        response = self.client.get(self.list_url, {'session_key': 'etag'}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 1)
+
+    def test_list_etag_depends_on_query(self):
+        first = self.client.get(self.list_url, {'session_key': 'etag'})['ETag']
+        second = self.client.get(self.list_url, {'session_key': 'etag', 'page_size': 1})['ETag']
+
+        self.assertNotEqual(first, second)
+
+    def test_unknown_conversation_is_404(self):
+        response = self.client.get(reverse('conversation-detail', args=['00000000-0000-0000-0000-000000000000']))
+
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True)
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        cache_stats.reset()
+        self.conversation = Conversation.objects.create(title='Cached', session_key='rc')
+        self.url = reverse('conversation-detail', args=[self.conversation.id])
+
+    def test_repeated_detail_is_served_from_cache(self):
+        self.client.get(self.url)
+
+        # Only the validator query runs on a hit
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.json()['title'], 'Cached')
+        counters = cache_stats.snapshot()['conversation']
+        self.assertEqual((counters['hits'], counters['misses']), (1, 1))
+
+    def test_add_message_invalidates_detail_and_list(self):
+        list_url = reverse('conversation-list')
+        self.client.get(self.url)
+        self.client.get(list_url, {'session_key': 'rc'})
+
+        self.client.post(
+            reverse('conversation-add-message', args=[self.conversation.id]), {'content': 'Hi'}, format='json'
+        )
+
+        self.assertEqual(len(self.client.get(self.url).json()['messages']), 1)
+        self.assertEqual(self.client.get(list_url, {'session_key': 'rc'}).json()['results'][0]['message_count'], 1)
+
+    def test_set_status_invalidates_filtered_lists(self):
+        list_url = reverse('conversation-list')
+        self.assertEqual(len(self.client.get(list_url, {'status': 'open'}).json()['results']), 1)
+
+        self.client.patch(
+            reverse('conversation-set-status', args=[self.conversation.id]), {'status': 'closed'}, format='json'
+        )
+
+        self.assertEqual(self.client.get(list_url, {'status': 'open'}).json()['results'], [])
+
+    def test_stats_endpoint_reports_counters(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+
+        body = self.client.get(reverse('cache-stats')).json()
+
+        self.assertEqual(body['namespaces']['conversation']['hit_ratio'], 0.5)
+
+
+class ConcurrentMessageTests(TransactionTestCase):
+    """
+    Parallel message posts must all land and leave the conversation touched
+    """
+    workers = 8
+    posts_per_worker = 5
+
+    def post_messages(self, url, worker):
+        client = APIClient()
+        try:
+            return [
+                client.post(url, {'content': f'{worker}-{i}'}, format='json').status_code
+                for i in range(self.posts_per_worker)
+            ]
+        finally:
+            connection.close()
+
+    def test_parallel_posts_to_one_conversation(self):
+        conversation = Conversation.objects.create(title='Busy')
+        before = conversation.updated_at
+        urls = [
+            reverse('conversation-add-message', args=[conversation.id]),
+            reverse('message-list', args=[conversation.id]),
+        ]
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            statuses = [
+                code
+                for codes in pool.map(
+                    lambda worker: self.post_messages(urls[worker % 2], worker), range(self.workers)
+                )
+                for code in codes
+            ]
+
+        self.assertEqual(statuses, [201] * self.workers * self.posts_per_worker)
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.messages.count(), self.workers * self.posts_per_worker)
+        latest = conversation.messages.order_by('-created_at').first()
+        self.assertGreaterEqual(conversation.updated_at, latest.created_at)
+        self.assertGreater(conversation.updated_at, before)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ConversationCounterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.conversation = Conversation.objects.create(title='Counted')
+
+    def post_message(self, content, staff=False):
+        response = self.client.post(
+            reverse('conversation-add-message', args=[self.conversation.id]),
+            {'content': content, 'is_from_staff': staff}, format='json'
+        )
+        return response.json()['id']
+
+    def upload(self, message_id):
+        response = self.client.post(
+            reverse('attachment-list', args=[self.conversation.id, message_id]),
+            {'file': SimpleUploadedFile('a.txt', b'data', content_type='text/plain')}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def test_write_paths_maintain_counters(self):
+        first = self.post_message('Help')
+        self.upload(first)
+        attachment = self.upload(first)
+        self.client.post(reverse('message-list', args=[self.conversation.id]), {'content': 'More'}, format='json')
+        reply = self.post_message('On it', staff=True)
+
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.message_count, 3)
+        self.assertEqual(self.conversation.attachment_count, 2)
+        self.assertTrue(self.conversation.last_message_from_staff)
+
+        self.client.delete(reverse('attachment-detail', args=[self.conversation.id, first, attachment]))
+        self.client.delete(reverse('message-detail', args=[self.conversation.id, reply]))
+        self.client.delete(reverse('message-detail', args=[self.conversation.id, first]))
+
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.message_count, 1)
+        self.assertEqual(self.conversation.attachment_count, 0)
+        self.assertFalse(self.conversation.last_message_from_staff)
+        self.assertFalse(Conversation.objects.with_counter_drift().exists())
+
+    def test_command_detects_and_repairs_drift(self):
+        self.post_message('Help')
+        Message.objects.create(conversation=self.conversation, content='Written behind our back')
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_conversation_counters', '--check', stdout=StringIO())
+
+        call_command('rebuild_conversation_counters', stdout=StringIO())
+
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.message_count, 2)
+        call_command('rebuild_conversation_counters', '--check', stdout=StringIO())
+
+
+@override_settings(STORAGES=STUB_MINIO_STORAGES, SUPPORT_ATTACHMENT_MAX_SIZE=1024)
+class DirectUploadTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        # Every test gets an empty bucket
+        self.minio = storages['default'].client = StubMinioClient()
+        self.conversation = Conversation.objects.create(title='Uploads')
+        self.message = Message.objects.create(conversation=self.conversation, content='See attached')
+        args = [self.conversation.id, self.message.id]
+        self.presign_url = reverse('attachment-presign', args=args)
+        self.finalize_url = reverse('attachment-finalize', args=args)
+
+    def presign(self, **data):
+        payload = {'filename': 'report.pdf', 'content_type': 'application/pdf', 'file_size': 4}
+        payload.update(data)
+        return self.client.post(self.presign_url, payload, format='json')
+
+    def test_presign_upload_and_finalize(self):
+        response = self.presign()
+        self.assertEqual(response.status_code, 201)
+        upload = response.json()
+        self.assertTrue(upload['upload_url'].startswith('http://minio.local/media/support_attachments/'))
+        self.assertTrue(upload['object_name'].endswith('/report.pdf'))
+
+        self.minio.put('media', upload['object_name'], b'%PDF', 'application/pdf')
+        response = self.client.post(self.finalize_url, {'upload_token': upload['upload_token']}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        attachment = Attachment.objects.get(id=response.json()['id'])
+        self.assertEqual(attachment.file.name, upload['object_name'])
+        self.assertEqual((attachment.file_size, attachment.content_type), (4, 'application/pdf'))
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.attachment_count, 1)
+
+        # Finalizing again is idempotent
+        response = self.client.post(self.finalize_url, {'upload_token': upload['upload_token']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Attachment.objects.count(), 1)
+
+    def test_maximum_length_filename_fits_the_file_column(self):
+        filename = 'r' * 251 + '.pdf'
+        upload = self.presign(filename=filename).json()
+        self.minio.put('media', upload['object_name'], b'%PDF', 'application/pdf')
+
+        response = self.client.post(self.finalize_url, {'upload_token': upload['upload_token']}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        attachment = Attachment.objects.get(id=response.json()['id'])
+        self.assertLessEqual(len(attachment.file.name), Attachment._meta.get_field('file').max_length)
+        self.assertTrue(attachment.file.name.endswith('r.pdf'))
+        self.assertEqual(attachment.filename, filename)
+
+    def test_finalize_requires_the_object(self):
+        upload = self.presign().json()
+
+        response = self.client.post(self.finalize_url, {'upload_token': upload['upload_token']}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Attachment.objects.exists())
+
+    def test_finalize_rejects_oversized_objects(self):
+        upload = self.presign().json()
+        self.minio.put('media', upload['object_name'], b'x' * 2048, 'application/pdf')
+
+        response = self.client.post(self.finalize_url, {'upload_token': upload['upload_token']}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.minio.objects, {})
+
+    def test_presign_validates_declared_size(self):
+        self.assertEqual(self.presign(file_size=4096).status_code, 400)
+
+    def test_token_is_bound_to_its_message(self):
+        upload = self.presign().json()
+        other = Message.objects.create(conversation=self.conversation, content='Other')
+        self.minio.put('media', upload['object_name'], b'%PDF', 'application/pdf')
+
+        response = self.client.post(
+            reverse('attachment-finalize', args=[self.conversation.id, other.id]),
+            {'upload_token': upload['upload_token']}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_tampered_token_is_rejected(self):
+        response = self.client.post(self.finalize_url, {'upload_token': 'forged'}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_direct_upload_can_be_downloaded_by_range(self):
+        upload = self.presign().json()
+        self.minio.put('media', upload['object_name'], b'%PDF', 'application/pdf')
+        attachment_id = self.client.post(
+            self.finalize_url, {'upload_token': upload['upload_token']}, format='json'
+        ).json()['id']
+
+        response = self.client.get(
+            reverse('attachment-download', args=[self.conversation.id, self.message.id, attachment_id]),
+            HTTP_RANGE='bytes=1-2'
+        )
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'PD')
+        self.assertEqual(response['ETag'], '"abc"')
+
+    @override_settings(STORAGES=TEST_STORAGES)
+    def test_presign_needs_a_client_backed_storage(self):
+        self.assertEqual(self.presign().status_code, 501)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class AttachmentDownloadTests(TestCase):
+    body = bytes(range(256)) * 1024
+
+    def setUp(self):
+        self.client = APIClient()
+        conversation = Conversation.objects.create(title='Downloads')
+        message = Message.objects.create(conversation=conversation, content='File')
+        self.attachment = Attachment(
+            message=message, filename='blob.bin', file_size=len(self.body), content_type='application/octet-stream'
+        )
+        self.attachment.file.save('blob.bin', ContentFile(self.body), save=False)
+        self.attachment.save()
+        self.url = reverse('attachment-download', args=[conversation.id, message.id, self.attachment.id])
+
+    def read(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_download_is_streamed(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(self.read(response), self.body)
+        self.assertEqual(response['Content-Length'], str(len(self.body)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('attachment; filename="blob.bin"', response['Content-Disposition'])
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+    def test_range_request(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.read(response), self.body[100:200])
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.body)}')
+
+    def test_open_ended_and_suffix_ranges(self):
+        resumed = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.body) - 10}-')
+        suffix = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+
+        self.assertEqual(self.read(resumed), self.body[-10:])
+        self.assertEqual(self.read(suffix), self.body[-5:])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.body)}-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.body)}')
+
+    def test_stale_if_range_returns_full_body(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.read(response)), len(self.body))
+
+    def test_matching_if_range_returns_partial_body(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+
+        self.assertEqual(response.status_code, 206)
+
+    def test_if_range_date_must_equal_last_modified(self):
+        last_modified = self.client.get(self.url)['Last-Modified']
+        later = http_date(parse_http_date(last_modified) + 60)
+
+        exact = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=last_modified)
+        newer = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=later)
+
+        self.assertEqual(exact.status_code, 206)
+        self.assertEqual(newer.status_code, 200)
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_any_accept_header_is_served(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='image/png')
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_object_is_404(self):
+        self.attachment.file.storage.delete(self.attachment.file.name)
+
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+def make_image(size=(800, 600)):
+    from PIL import Image
+
+    output = BytesIO()
+    Image.new('RGBA', size, (200, 30, 30, 128)).save(output, 'PNG')
+    return output.getvalue()
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.conversation = Conversation.objects.create(title='Screenshots')
+        self.message = Message.objects.create(conversation=self.conversation, content='Look')
+
+    def create_attachment(self, filename='screen.png', content_type='image/png', body=None):
+        body = make_image() if body is None else body
+        attachment = Attachment(message=self.message, filename=filename, file_size=len(body), content_type=content_type)
+        attachment.file.save(filename, ContentFile(body), save=False)
+        attachment.save()
+        return attachment
+
+    def test_thumbnail_is_bounded_and_stored_next_to_the_original(self):
+        from PIL import Image
+
+        attachment = self.create_attachment()
+
+        name = generate_thumbnail(attachment.id)
+
+        attachment.refresh_from_db()
+        self.assertEqual(attachment.thumbnail.name, name)
+        self.assertTrue(name.startswith(attachment.file.name.rsplit('/', 1)[0] + '/thumbnails/'))
+        with attachment.thumbnail.open('rb') as f, Image.open(f) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (320, 240))
+
+    def test_generation_is_idempotent(self):
+        attachment = self.create_attachment()
+        name = generate_thumbnail(attachment.id)
+
+        with mock.patch('support.thumbnails.render_thumbnail') as render:
+            self.assertEqual(generate_thumbnail(attachment.id), name)
+        render.assert_not_called()
+        self.assertEqual(generate_thumbnail(attachment.id, force=True), name)
+
+    def test_same_stem_originals_keep_their_own_thumbnails(self):
+        png = self.create_attachment(filename='photo.png')
+        jpeg = self.create_attachment(filename='photo.jpg', content_type='image/jpeg')
+        png_thumbnail = generate_thumbnail(png.id)
+
+        jpeg_thumbnail = generate_thumbnail(jpeg.id)
+
+        self.assertNotEqual(png_thumbnail, jpeg_thumbnail)
+        self.assertTrue(png.file.storage.exists(png_thumbnail))
+        self.assertTrue(jpeg.file.storage.exists(jpeg_thumbnail))
+
+    def test_generation_moves_the_conversation_etag(self):
+        attachment = self.create_attachment()
+        url = reverse('conversation-detail', args=[self.conversation.id])
+        etag = self.client.get(url)['ETag']
+
+        generate_thumbnail(attachment.id)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.json()['messages'][0]['attachments'][0]['thumbnail_url'])
+
+    def test_upload_defers_a_thumbnail_job_for_images(self):
+        url = reverse('attachment-list', args=[self.conversation.id, self.message.id])
+        image = self.client.post(
+            url, {'file': SimpleUploadedFile('a.png', make_image(), content_type='image/png')}, format='multipart'
+        )
+        self.client.post(url, {'file': SimpleUploadedFile('a.txt', b'data', content_type='text/plain')}, format='multipart')
+
+        self.assertEqual(image.status_code, 201)
+        self.assertIsNone(image.json()['thumbnail_url'])
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.payload), ('support.generate_thumbnail', {'attachment_id': image.json()['id']}))
+
+        call_command('run_workers', '--once', '--threads', '0', stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertTrue(Attachment.objects.get(id=image.json()['id']).thumbnail)
+
+    @override_settings(SUPPORT_THUMBNAIL_MAX_SOURCE_SIZE=100)
+    def test_oversized_sources_are_never_decoded(self):
+        attachment = self.create_attachment()
+        out = StringIO()
+
+        with mock.patch('support.thumbnails.render_thumbnail') as render:
+            self.assertIsNone(generate_thumbnail(attachment.id))
+            call_command('generate_thumbnails', '--workers', '1', stdout=out)
+
+        render.assert_not_called()
+        self.assertIn('for 0 attachment(s)', out.getvalue())
+
+    def test_backfill_command_and_thumbnail_url(self):
+        image = self.create_attachment()
+        self.create_attachment(filename='notes.txt', content_type='text/plain', body=b'notes')
+        out = StringIO()
+
+        call_command('generate_thumbnails', '--workers', '1', stdout=out)
+
+        self.assertIn('Generated 1 thumbnail(s) for 1 attachment(s)', out.getvalue())
+        response = self.client.get(reverse('attachment-detail', args=[self.conversation.id, self.message.id, image.id]))
+        self.assertTrue(response.json()['thumbnail_url'].endswith(f'/thumbnails/{image.id}.jpg'))
+
+        out = StringIO()
+        call_command('generate_thumbnails', '--workers', '1', stdout=out)
+        self.assertIn('for 0 attachment(s)', out.getvalue())
+
+
+class ConversationSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('conversation-search')
+        self.billing = Conversation.objects.create(title='Billing', session_key='alice')
+        self.shipping = Conversation.objects.create(title='Shipping', session_key='bob')
+        Message.objects.create(conversation=self.billing, content='My invoice is wrong, the invoice total doubled')
+        Message.objects.create(conversation=self.billing, content='Please refund the difference')
+        self.shipping_message = Message.objects.create(
+            conversation=self.shipping, content='The parcel arrived without an invoice and the box was damaged'
+        )
+        Conversation.objects.rebuild_counters()
+
+    def search(self, q, **params):
+        response = self.client.get(self.url, {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [result['id'] for result in response.json()['results']]
+
+    def test_results_are_ranked_by_message_content(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'q': 'invoice'})
+
+        results = response.json()['results']
+        self.assertEqual([r['id'] for r in results], [str(self.billing.id), str(self.shipping.id)])
+        self.assertGreater(results[0]['rank'], results[1]['rank'])
+        self.assertEqual(results[0]['message_count'], 2)
+
+    def test_all_terms_must_match_and_words_are_stemmed(self):
+        self.assertEqual(self.search('refunds'), [str(self.billing.id)])
+        self.assertEqual(self.search('invoice damaged'), [str(self.shipping.id)])
+        self.assertEqual(self.search('refund damaged'), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.shipping_message.content = 'Courier lost the package'
+        self.shipping_message.save()
+        self.assertEqual(self.search('courier'), [str(self.shipping.id)])
+        self.assertEqual(self.search('parcel'), [])
+
+        self.shipping_message.delete()
+        self.assertEqual(self.search('courier'), [])
+
+    def test_filters_and_query_syntax(self):
+        self.assertEqual(self.search('invoice', session_key='bob'), [str(self.shipping.id)])
+        self.assertEqual(self.search('"invoice AND (NEAR'), [])
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+
+    def test_lookup_uses_the_full_text_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite query plan')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "EXPLAIN QUERY PLAN SELECT m.conversation_id FROM ("
+                "SELECT rowid FROM support_message_fts WHERE support_message_fts MATCH 'invoice'"
+                ") AS hits JOIN support_message_fts_ids ids ON ids.docid = hits.rowid"
+                " JOIN support_message m ON m.id = ids.message_id"
+            )
+            plan = ' / '.join(row[-1] for row in cursor.fetchall())
+
+        self.assertIn('VIRTUAL TABLE INDEX', plan)
+        self.assertNotIn('SCAN ids', plan)
+        self.assertNotIn('SCAN m', plan)
+
+    def test_index_survives_renumbered_rowids(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite rowids')
+        # What VACUUM may do to a table without an INTEGER PRIMARY KEY:
+        # new rowids, and no trigger sees it
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT rowid FROM support_message ORDER BY rowid')
+            rowids = [row[0] for row in cursor.fetchall()]
+            for name in FTS_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER {name}')
+            for rowid, renumbered in zip(rowids, reversed(rowids)):
+                cursor.execute('UPDATE support_message SET rowid = %s WHERE rowid = %s', [-renumbered, rowid])
+            cursor.execute('UPDATE support_message SET rowid = -rowid')
+            for sql in SQLITE_TRIGGERS:
+                cursor.execute(sql)
+
+        self.assertEqual(self.search('refund'), [str(self.billing.id)])
+        self.assertEqual(self.search('parcel'), [str(self.shipping.id)])
+        self.shipping_message.delete()
+        self.assertEqual(self.search('parcel'), [])
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        long_ago = timezone.now() - timedelta(days=400)
+        self.closed = Conversation.objects.create(title='Old', status='closed')
+        message = Message.objects.create(conversation=self.closed, content='Solved, thanks', is_from_staff=True)
+        attachment = Attachment(message=message, filename='log.txt', file_size=3, content_type='text/plain')
+        attachment.file.save('log.txt', ContentFile(b'log'), save=False)
+        attachment.save()
+        self.open = Conversation.objects.create(title='Still open')
+        self.recent = Conversation.objects.create(title='Recently closed', status='resolved')
+        Conversation.objects.rebuild_counters()
+        Message.objects.update(created_at=long_ago)
+        Conversation.objects.exclude(pk=self.recent.pk).update(created_at=long_ago, updated_at=long_ago)
+        self.long_ago = long_ago
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_conversations', '--older-than', '30', *args, stdout=out)
+        return out.getvalue()
+
+    def test_archives_only_old_closed_conversations(self):
+        self.assertIn('1 conversation(s) would be archived', self.archive('--dry-run'))
+
+        self.assertIn('Archived 1 conversation(s)', self.archive('--batch-size', '1'))
+
+        self.assertFalse(Conversation.objects.filter(pk=self.closed.pk).exists())
+        self.assertFalse(Message.objects.filter(conversation_id=self.closed.pk).exists())
+        self.assertEqual(Conversation.objects.count(), 2)
+        entry = ArchivedConversation.objects.get()
+        with storages['default'].open(entry.archive, 'rb') as f:
+            lines = gzip.decompress(f.read()).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [str(self.closed.pk)])
+
+    def test_batch_cost_does_not_grow_with_its_rows(self):
+        def old_conversations(count):
+            ids = []
+            for i in range(count):
+                conversation = Conversation.objects.create(title=f'Old {i}', status='closed')
+                for j in range(3):
+                    message = Message.objects.create(conversation=conversation, content=f'{j}')
+                    Attachment.objects.create(message=message, file=f'seed/{message.id}.txt', filename='seed.txt',
+                                              file_size=1, content_type='text/plain')
+                ids.append(conversation.id)
+            return ids
+
+        small, large = old_conversations(1), old_conversations(5)
+        with mock.patch('core.cache.bump') as bump, CaptureQueriesContext(connection) as small_queries:
+            self.assertEqual(archive_batch(small), 1)
+        bump.assert_called_once()
+        with CaptureQueriesContext(connection) as large_queries:
+            self.assertEqual(archive_batch(large), 5)
+
+        self.assertEqual(len(large_queries), len(small_queries))
+        self.assertFalse(Message.objects.filter(conversation_id__in=small + large).exists())
+
+    def test_retrieve_rehydrates_archived_conversation(self):
+        self.archive()
+
+        response = self.client.get(reverse('conversation-detail', args=[self.closed.pk]))
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['messages'][0]['content'], 'Solved, thanks')
+        self.assertEqual(data['messages'][0]['attachments'][0]['filename'], 'log.txt')
+        self.assertFalse(ArchivedConversation.objects.exists())
+        conversation = Conversation.objects.get(pk=self.closed.pk)
+        self.assertEqual((conversation.updated_at, conversation.message_count), (self.long_ago, 1))
+        self.assertEqual(conversation.messages.get().created_at, self.long_ago)
+
+    def test_unknown_conversation_is_still_404(self):
+        response = self.client.get(reverse('conversation-detail', args=[uuid.uuid4()]))
+
+        self.assertEqual(response.status_code, 404)
+
+
+class QueryPlanTests(TestCase):
+    """
+    The hot list queries must be served from indexes, in pagination order,
+    never by a sequential scan or an extra sort
+    """
+    @classmethod
+    def setUpTestData(cls):
+        statuses = [choice[0] for choice in Conversation.STATUS_CHOICES]
+        conversations = Conversation.objects.bulk_create(
+            Conversation(title=f'Conversation {i}', session_key=f'session-{i % 40}', status=statuses[i % len(statuses)])
+            for i in range(400)
+        )
+        messages = Message.objects.bulk_create(
+            Message(conversation=conversation, content=f'Message {j}')
+            for conversation in conversations[:100] for j in range(5)
+        )
+        Attachment.objects.bulk_create(
+            Attachment(message=message, file=f'seed/{message.id}.txt', filename='seed.txt', file_size=1,
+                       content_type='text/plain')
+            for message in messages[:100]
+        )
+        cls.conversation = conversations[0]
+        cls.message = messages[0]
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertIndexed(self, queryset):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('SET LOCAL enable_sort = off')
+            plan = queryset.explain()
+            self.assertNotIn('Seq Scan', plan)
+            self.assertNotIn('Sort', plan)
+        else:
+            plan = queryset.explain()
+            # "SCAN t USING INDEX i" is an ordered index walk; a bare "SCAN t" reads the table
+            self.assertNotRegex(plan, r'(?m)\bSCAN\b(?!.*\bUSING\b)')
+            self.assertNotIn('TEMP B-TREE', plan)
+        return plan
+
+    def conversations(self):
+        return Conversation.objects.with_summary().order_by(*ConversationCursorPagination.ordering)
+
+    def test_conversation_list(self):
+        self.assertIndexed(self.conversations()[:50])
+
+    def test_conversation_list_by_session(self):
+        plan = self.assertIndexed(self.conversations().filter(session_key='session-3')[:50])
+        self.assertIn('support_conv_session_upd_idx', plan)
+
+    def test_conversation_list_by_status(self):
+        plan = self.assertIndexed(self.conversations().filter(status='resolved')[:50])
+        self.assertIn('support_conv_status_upd_idx', plan)
+
+    def test_active_conversation_list(self):
+        plan = self.assertIndexed(self.conversations().active()[:50])
+        if connection.vendor == 'postgresql':
+            # SQLite's planner may prefer walking support_conv_updated_id_idx here
+            self.assertIn('support_conv_active_upd_idx', plan)
+
+    def test_message_list(self):
+        self.assertIndexed(
+            Message.objects.filter(conversation=self.conversation).order_by(*MessageCursorPagination.ordering)[:50]
+        )
+
+    def test_attachment_list(self):
+        self.assertIndexed(
+            Attachment.objects.filter(message=self.message).order_by(*AttachmentCursorPagination.ordering)[:50]
+        )
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.conversations = seed_conversations(3, messages=3, attachments=1, session_key='async')
+        self.conversation = self.conversations[0]
+
+    def get_both(self, sync_name, async_name, args=(), params=None):
+        sync_response = self.client.get(reverse(sync_name, args=args), params or {})
+        async_response = self.client.get(reverse(async_name, args=args), params or {})
+        self.assertEqual(async_response['Content-Type'], 'application/json')
+        return sync_response, async_response
+
+    def assert_same_pages(self, sync_name, async_name, args=(), params=None):
+        sync_response, async_response = self.get_both(sync_name, async_name, args, params)
+        self.assertEqual(async_response.status_code, 200)
+        pages = 0
+        while True:
+            sync_body, async_body = sync_response.json(), async_response.json()
+            self.assertEqual(async_body['results'], sync_body['results'])
+            self.assertEqual(async_body['next'] is None, sync_body['next'] is None)
+            pages += 1
+            if sync_body['next'] is None:
+                return pages
+            sync_response = self.client.get(sync_body['next'])
+            async_response = self.client.get(async_body['next'])
+
+    def test_conversation_list_matches_sync_view(self):
+        self.assertEqual(self.assert_same_pages(
+            'conversation-list', 'async-conversation-list', params={'session_key': 'async', 'page_size': 2}
+        ), 2)
+        self.assert_same_pages(
+            'conversation-list', 'async-conversation-list', params={'session_key': 'async', 'expand': 'messages'}
+        )
+
+    def test_conversation_detail_matches_sync_view(self):
+        sync_response, async_response = self.get_both(
+            'conversation-detail', 'async-conversation-detail', args=[self.conversation.id]
+        )
+
+        self.assertEqual(async_response.status_code, 200)
+        self.assertEqual(async_response.content, sync_response.content)
+
+    def test_messages_match_sync_view(self):
+        args = [self.conversation.id]
+        self.assertEqual(self.assert_same_pages(
+            'message-list', 'async-message-list', args=args, params={'page_size': 2}
+        ), 2)
+
+        sync_response, async_response = self.get_both('message-list', 'async-message-list', args, {'since': ''})
+        self.assertEqual(async_response.content, sync_response.content)
+
+        message = self.conversation.messages.first()
+        sync_response, async_response = self.get_both(
+            'message-detail', 'async-message-detail', args=[self.conversation.id, message.id]
+        )
+        self.assertEqual(async_response.content, sync_response.content)
+
+    def test_errors_match_sync_view(self):
+        sync_response, async_response = self.get_both(
+            'conversation-detail', 'async-conversation-detail', args=[uuid.uuid4()]
+        )
+        self.assertEqual((async_response.status_code, async_response.json()), (404, sync_response.json()))
+
+        sync_response, async_response = self.get_both(
+            'message-list', 'async-message-list', args=[self.conversation.id], params={'since': 'bogus'}
+        )
+        self.assertEqual((async_response.status_code, async_response.json()), (400, sync_response.json()))
+
+        response = self.client.post(reverse('async-conversation-list'), {})
+        self.assertEqual(response.status_code, 405)
+
+    async def test_served_by_asgi_handler(self):
+        client = AsyncClient()
+        url = reverse('async-conversation-detail', args=[self.conversation.id])
+
+        response = await client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['messages']), 3)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ValuesSerializerTests(TestCase):
+    """
+    Randomized check that the values serializers render the same bytes as
+    the ModelSerializers they stand in for
+    """
+    def setUp(self):
+        self.context = {'request': Request(APIRequestFactory().get('/support/'))}
+        self.renderer = JSONRenderer()
+
+    def create_messages(self, rng):
+        conversation = Conversation.objects.create(title=random_text(rng))
+        for _ in range(rng.randint(0, 6)):
+            message = Message.objects.create(
+                conversation=conversation, content=random_text(rng, 200),
+                is_from_staff=rng.random() < 0.5, sender_name=random_text(rng, 10),
+            )
+            Message.objects.filter(pk=message.pk).update(created_at=random_datetime(rng))
+            for _ in range(rng.randint(0, 3)):
+                attachment = Attachment.objects.create(
+                    message=message, file=f'support_attachments/{uuid.uuid4()}/{random_text(rng, 10)}.bin',
+                    filename=random_text(rng, 20), file_size=rng.randint(1, 2 ** 31 - 1),
+                    content_type=rng.choice(['image/png', 'text/plain', 'application/pdf']),
+                    thumbnail=rng.choice(['', f'support_attachments/thumbnails/{uuid.uuid4()}.jpg']),
+                )
+                Attachment.objects.filter(pk=attachment.pk).update(uploaded_at=random_datetime(rng))
+        return conversation
+
+    def assert_same_output(self, serializer_class, values_class, queryset, many=True):
+        if many:
+            expected = serializer_class(queryset, many=True, context=self.context).data
+            actual = values_class(values_class.values(queryset), many=True, context=self.context).data
+        else:
+            expected = serializer_class(queryset.get(), context=self.context).data
+            actual = values_class(values_class.values(queryset).get(), context=self.context).data
+        self.assertEqual(self.renderer.render(actual), self.renderer.render(expected))
+
+    def test_messages_and_attachments_render_identically(self):
+        for seed in range(30):
+            rng = random.Random(seed)
+            conversation = self.create_messages(rng)
+            messages = Message.objects.filter(conversation=conversation).with_attachments().order_by('created_at', 'id')
+            attachments = Attachment.objects.filter(message__conversation=conversation).order_by('uploaded_at', 'id')
+            with self.subTest(seed=seed):
+                self.assert_same_output(MessageSerializer, MessageValuesSerializer, messages)
+                self.assert_same_output(AttachmentSerializer, AttachmentValuesSerializer, attachments)
+                if messages:
+                    self.assert_same_output(
+                        MessageSerializer, MessageValuesSerializer, messages.filter(pk=messages[0].pk), many=False
+                    )
+
+    def test_endpoints_read_values_rows(self):
+        conversation = self.create_messages(random.Random(7))
+        message = Message.objects.create(conversation=conversation, content='hello')
+        Attachment.objects.create(message=message, file='a.txt', filename='a.txt', file_size=1, content_type='text/plain')
+        client = APIClient()
+        url = reverse('message-list', args=[conversation.pk])
+
+        # One query for the page of messages, one for their attachments
+        with self.assertNumQueries(2):
+            fast = client.get(url, {'page_size': 100})
+        with mock.patch('support.views.MessageViewSet.values_serializer_class', None):
+            slow = client.get(url, {'page_size': 100})
+        self.assertEqual(fast.content, slow.content)
+
+        detail = reverse('message-detail', args=[conversation.pk, message.pk])
+        fast = client.get(detail)
+        with mock.patch('support.views.MessageViewSet.values_serializer_class', None):
+            slow = client.get(detail)
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, slow.content)
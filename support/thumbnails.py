@@ -0,0 +1,105 @@
+"""
+Thumbnail generation for image attachments.
+
+Request handlers only defer a ``support.generate_thumbnail`` job; the image
+work happens in ``manage.py run_workers``, off the request path. Anything
+missed can be caught up with the ``generate_thumbnails`` backfill command.
+Generation is idempotent, so re-running it for an attachment is harmless.
+"""
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from jobs.registry import defer
+from .models import Attachment, Conversation, Message
+
+THUMBNAIL_CONTENT_TYPES = ('image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/bmp')
+
+
+def needs_thumbnail(attachment, force=False):
+    """
+    Whether the attachment is an image small enough to decode, lacking a
+    thumbnail unless ``force``
+    """
+    return (
+        attachment.content_type in THUMBNAIL_CONTENT_TYPES
+        and (force or not attachment.thumbnail)
+        and attachment.file_size <= settings.SUPPORT_THUMBNAIL_MAX_SOURCE_SIZE
+    )
+
+
+def thumbnail_name(attachment):
+    """
+    Storage name of the thumbnail, next to the original object. Keyed on the
+    attachment so originals sharing a stem (photo.png, photo.jpg) don't share
+    a thumbnail
+    """
+    directory = posixpath.dirname(attachment.file.name)
+    return posixpath.join(directory, 'thumbnails', f'{attachment.pk}.jpg')
+
+
+def render_thumbnail(source, size):
+    """
+    Return JPEG bytes of ``source`` scaled down to fit within ``size``
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        # Lets the JPEG decoder skip most of the pixels it would throw away
+        image.draft('RGB', size)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(size)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        output = BytesIO()
+        image.save(output, 'JPEG', quality=settings.SUPPORT_THUMBNAIL_QUALITY, optimize=True)
+        return output.getvalue()
+
+
+def generate_thumbnail(attachment_id, force=False):
+    """
+    Create and record the thumbnail of one attachment; returns its storage name
+    """
+    from .signals import invalidate_conversation
+
+    attachment = Attachment.objects.filter(pk=attachment_id).first()
+    if attachment is None:
+        return None
+    if attachment.thumbnail and not force:
+        return attachment.thumbnail.name
+    # Queued and retried jobs may predate a lower size limit
+    if not needs_thumbnail(attachment, force=True):
+        return None
+
+    storage = attachment.file.storage
+    with attachment.file.open('rb') as source:
+        data = render_thumbnail(source, settings.SUPPORT_THUMBNAIL_SIZE)
+
+    # Only replace the object this attachment already points at; any other
+    # name taken in storage gets a suffixed alternative from save()
+    if attachment.thumbnail:
+        storage.delete(attachment.thumbnail.name)
+    name = storage.save(thumbnail_name(attachment), ContentFile(data))
+
+    Attachment.objects.filter(pk=attachment_id).update(thumbnail=name)
+    conversation_id = Message.objects.values_list('conversation_id', flat=True).get(pk=attachment.message_id)
+    # Moves the conversation's validators so clients see the new thumbnail_url
+    Conversation.objects.filter(pk=conversation_id).touch()
+    invalidate_conversation(conversation_id)
+    return name
+
+
+def schedule_thumbnail(attachment):
+    """
+    Defer thumbnail generation for an image attachment
+    """
+    if needs_thumbnail(attachment):
+        defer('support.generate_thumbnail', attachment_id=attachment.pk)
@@ -1,6 +1,9 @@
 from django.urls import path, include
 from rest_framework_nested import routers
-from .views import ConversationViewSet, MessageViewSet, AttachmentViewSet
+from . import async_views
+from .views import (
+    ConversationViewSet, MessageViewSet, AttachmentViewSet, ConversationSearchView, conversation_stream
+)
 
 # Main router for conversations
 router = routers.DefaultRouter()
@@ -15,6 +18,19 @@ message_router = routers.NestedDefaultRouter(conversation_router, r'messages', l
 message_router.register(r'attachments', AttachmentViewSet, basename='attachment')
 
 urlpatterns = [
+    path('v1/conversations/<uuid:pk>/stream/', conversation_stream, name='conversation-stream'),
+    path('v1/search/', ConversationSearchView.as_view(), name='conversation-search'),
+    # Async ORM variants of the read endpoints, for the ASGI application
+    path('v1/async/conversations/', async_views.conversation_list, name='async-conversation-list'),
+    path('v1/async/conversations/<uuid:pk>/', async_views.conversation_detail, name='async-conversation-detail'),
+    path(
+        'v1/async/conversations/<uuid:conversation_pk>/messages/', async_views.message_list,
+        name='async-message-list'
+    ),
+    path(
+        'v1/async/conversations/<uuid:conversation_pk>/messages/<uuid:pk>/', async_views.message_detail,
+        name='async-message-detail'
+    ),
     path('v1/', include(router.urls)),
     path('v1/', include(conversation_router.urls)),
     path('v1/', include(message_router.urls)),
@@ -1,39 +1,167 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.views import APIView
+from django.conf import settings
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Q
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+import asyncio
 import logging
+import uuid
+from datetime import timedelta
 
+from core.cache import CachedResponseMixin
+from core.conditional import ConditionalGetMixin
+from core.parsers import JSONParser
+from core.renderers import JSONRenderer
+from core.serializers import ValuesReadMixin
+from jobs.registry import defer
+from .events import get_broker, publish_event, format_sse
 from .models import Conversation, Message, Attachment
-from .serializers import ConversationSerializer, MessageSerializer, AttachmentSerializer
+from .pagination import (
+    ConversationCursorPagination, MessageCursorPagination, AttachmentCursorPagination,
+    encode_message_cursor, decode_message_cursor
+)
+from .signals import invalidate_conversation
+from .serializers import (
+    ConversationSerializer, ConversationSummarySerializer, MessageSerializer, AttachmentSerializer,
+    AttachmentUploadSerializer, AttachmentFinalizeSerializer, ConversationSearchResultSerializer,
+    MessageValuesSerializer, AttachmentValuesSerializer
+)
+from .archive import rehydrate_conversation
+from .downloads import download_response
+from .renderers import PassthroughRenderer
+from .search import search_conversations
+from .storage import DirectUploadNotSupported, fit_object_name, get_object_store
+from .thumbnails import schedule_thumbnail
 
 logger = logging.getLogger(__name__)
 
-class ConversationViewSet(viewsets.ModelViewSet):
+def filter_conversations(queryset, query_params):
+    """
+    Filter conversations by session_key and status if provided
+    (status=active selects open and in-progress conversations)
+    """
+    session_key = query_params.get('session_key', None)
+    status_param = query_params.get('status', None)
+    
+    if session_key:
+        queryset = queryset.filter(session_key=session_key)
+        
+    if status_param == 'active':
+        queryset = queryset.active()
+    elif status_param:
+        queryset = queryset.filter(status=status_param)
+        
+    return queryset
+
+def wants_messages(query_params):
+    """
+    List views return summaries unless the client opts in with ?expand=messages
+    """
+    return 'messages' in query_params.get('expand', '').split(',')
+
+def messages_since(queryset, since):
+    """
+    Messages created after the ?since= sync cursor, oldest first
+    (an empty cursor starts from the beginning of the conversation)
+    """
+    queryset = queryset.order_by('created_at', 'id')
+    if since:
+        created_at, message_id = decode_message_cursor(since)
+        queryset = queryset.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=message_id)
+        )
+    return queryset
+
+def messages_resent(queryset, since, limit):
+    """
+    Up to ``limit`` messages created in the SUPPORT_SYNC_OVERLAP seconds
+    before the ?since= cursor (the cursor's own message excluded), newest
+    first; None once the cursor is older than the overlap.
+
+    created_at is assigned on save, not on commit, so a message whose
+    transaction commits late can appear behind a cursor a client just
+    synced past. While the cursor is that recent, syncs re-send the window
+    to pick such messages up; clients dedupe by id.
+    """
+    overlap = timedelta(seconds=settings.SUPPORT_SYNC_OVERLAP)
+    if not since or not overlap:
+        return None
+    created_at, message_id = decode_message_cursor(since)
+    if created_at < timezone.now() - overlap:
+        return None
+    return queryset.order_by('-created_at', '-id').filter(
+        Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=message_id),
+        created_at__gte=created_at - overlap,
+    )[:limit]
+
+class ConversationViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
     """
     API endpoint for support conversations
     """
     serializer_class = ConversationSerializer
+    pagination_class = ConversationCursorPagination
     parser_classes = [JSONParser, MultiPartParser, FormParser]
     http_method_names = ['get', 'post', 'put', 'patch', 'delete']
     
+    # Actions whose response renders the nested message/attachment tree
+    tree_actions = ('list', 'retrieve', 'set_status')
+    
+    def wants_messages(self):
+        if self.action != 'list':
+            return True
+        return wants_messages(self.request.query_params)
+    
+    def get_serializer_class(self):
+        if self.wants_messages():
+            return ConversationSerializer
+        return ConversationSummarySerializer
+    
+    def filter_conversations(self, queryset):
+        return filter_conversations(queryset, self.request.query_params)
+    
+    def get_cache_namespaces(self, detail):
+        if detail:
+            return [f"conversation:{self.kwargs['pk']}"]
+        return ['conversations']
+    
+    def get_validator_queryset(self):
+        return self.filter_conversations(Conversation.objects.all())
+    
     def get_queryset(self):
-        """
-        Filter conversations by session_key and status if provided
-        """
-        queryset = Conversation.objects.all()
-        session_key = self.request.query_params.get('session_key', None)
-        status_param = self.request.query_params.get('status', None)
-        
-        if session_key:
-            queryset = queryset.filter(session_key=session_key)
-            
-        if status_param:
-            queryset = queryset.filter(status=status_param)
-            
+        queryset = self.filter_conversations(Conversation.objects.all())
+        if not self.wants_messages():
+            queryset = queryset.with_summary()
+        elif self.action in self.tree_actions:
+            queryset = queryset.with_messages()
         return queryset
     
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            # Archived conversations come back from cold storage on first access
+            if not rehydrate_conversation(kwargs[self.lookup_url_kwarg or self.lookup_field]):
+                raise
+        return super().retrieve(request, *args, **kwargs)
+    
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        serializer = self.get_serializer(self.get_object(), data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        # Render the saved conversation through the prefetched tree rather
+        # than loading every message's attachments one by one
+        conversation = self.get_queryset().with_messages().get(pk=serializer.instance.pk)
+        return Response(self.get_serializer(conversation).data)
+    
     @action(detail=True, methods=['post'])
     def add_message(self, request, pk=None):
         """
@@ -47,14 +175,20 @@ class ConversationViewSet(viewsets.ModelViewSet):
             # Set is_from_staff based on request data or default to user message
             is_staff = request.data.get('is_from_staff', False)
             
-            message = serializer.save(
-                conversation=conversation,
-                is_from_staff=is_staff,
-                sender_name=request.data.get('sender_name', '')
-            )
+            with transaction.atomic():
+                message = serializer.save(
+                    conversation=conversation,
+                    is_from_staff=is_staff,
+                    sender_name=request.data.get('sender_name', '')
+                )
+                # Update conversation timestamp and counters (targeted UPDATE)
+                Conversation.objects.filter(pk=conversation.pk).record_message(message)
+            invalidate_conversation(conversation.id)
             
-            # Update conversation timestamp (touches updated_at)
-            conversation.save()
+            publish_event(
+                conversation.id, 'message.created', serializer.data,
+                event_id=encode_message_cursor(message)
+            )
             
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         
@@ -65,13 +199,12 @@ class ConversationViewSet(viewsets.ModelViewSet):
         """
         Update the status of a conversation
         """
-        logger.info(f"Status update request: {request.data}")
+        logger.debug("Status update request: %s", request.data)
         
         conversation = self.get_object()
         
         status_value = request.data.get('status')
         if not status_value:
-            logger.error("No status value provided")
             return Response(
                 {'error': 'Status value is required'}, 
                 status=status.HTTP_400_BAD_REQUEST
@@ -79,42 +212,144 @@ class ConversationViewSet(viewsets.ModelViewSet):
             
         # Validate status is one of the allowed choices
         valid_statuses = [choice[0] for choice in Conversation.STATUS_CHOICES]
-        logger.info(f"Valid statuses: {valid_statuses}")
         if status_value not in valid_statuses:
-            logger.error(f"Invalid status: {status_value}")
+            logger.debug("Invalid status: %s", status_value)
             return Response(
                 {'error': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
             
+        previous_status = conversation.status
         conversation.status = status_value
-        conversation.save()
+        conversation.updated_at = timezone.now()
+        with transaction.atomic():
+            Conversation.objects.filter(pk=conversation.pk).touch(at=conversation.updated_at, status=status_value)
+            if status_value != previous_status:
+                defer(
+                    'support.conversation_status_changed', conversation_id=conversation.id,
+                    status=status_value, previous_status=previous_status
+                )
+        invalidate_conversation(conversation.id)
+        
+        publish_event(conversation.id, 'conversation.status', {'id': str(conversation.id), 'status': status_value})
         
         return Response(
             ConversationSerializer(conversation).data,
             status=status.HTTP_200_OK
         )
 
-class MessageViewSet(viewsets.ModelViewSet):
+async def conversation_stream(request, pk):
+    """
+    Server-sent event stream of updates for a single conversation.
+    
+    Each idle client only holds a coroutine, so this has to be served by the
+    ASGI application. Message events carry their sync cursor as the event id;
+    after reconnecting, clients catch up with ``messages/?since=<Last-Event-ID>``.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(
+            'Conversation streams require the ASGI server.',
+            status=status.HTTP_501_NOT_IMPLEMENTED, content_type='text/plain'
+        )
+    if not await Conversation.objects.filter(pk=pk).aexists():
+        raise Http404
+    
+    subscription = get_broker().subscribe(str(pk))
+    heartbeat = settings.SUPPORT_STREAM_HEARTBEAT
+    
+    async def events():
+        try:
+            yield f'retry: {settings.SUPPORT_STREAM_RETRY_MS}\n\n'
+            while True:
+                try:
+                    event = await subscription.get(timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing the idle connection
+                    yield ': keep-alive\n\n'
+                    continue
+                yield format_sse(event)
+        finally:
+            subscription.close()
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+class MessageViewSet(ValuesReadMixin, viewsets.ModelViewSet):
     """
     API endpoint for messages within a conversation
     """
     serializer_class = MessageSerializer
+    values_serializer_class = MessageValuesSerializer
+    pagination_class = MessageCursorPagination
     
     def get_queryset(self):
         conversation_id = self.kwargs.get('conversation_pk')
-        return Message.objects.filter(conversation__id=conversation_id)
+        return Message.objects.filter(conversation__id=conversation_id).with_attachments()
+    
+    def list(self, request, *args, **kwargs):
+        """
+        With ?since=<cursor> return the messages created after the cursor,
+        preceded, while the cursor is recent, by the ones re-sent from the
+        overlap window before it (see messages_resent). An empty cursor starts from the beginning of the
+        conversation.
+        """
+        since = request.query_params.get('since')
+        if since is None:
+            return super().list(request, *args, **kwargs)
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        page_size = self.paginator.get_page_size(request)
+        resent = messages_resent(queryset, since, page_size)
+        resent = list(resent)[::-1] if resent is not None else []
+        messages = list(messages_since(queryset, since)[:page_size + 1])
+        has_more = len(messages) > page_size
+        messages = messages[:page_size]
+        
+        return Response({
+            'results': self.get_serializer([*resent, *messages], many=True).data,
+            'next_cursor': encode_message_cursor(messages[-1]) if messages else since,
+            'has_more': has_more,
+        })
+    
+    def get_conversation_queryset(self):
+        return Conversation.objects.filter(id=self.kwargs.get('conversation_pk'))
     
+    @transaction.atomic
     def perform_create(self, serializer):
         conversation_id = self.kwargs.get('conversation_pk')
-        conversation = get_object_or_404(Conversation, id=conversation_id)
-        serializer.save(conversation=conversation)
+        if not self.get_conversation_queryset().exists():
+            raise Http404
+        message = serializer.save(conversation_id=conversation_id)
+        self.get_conversation_queryset().record_message(message)
+        invalidate_conversation(conversation_id)
+        
+        publish_event(
+            conversation_id, 'message.created', serializer.data,
+            event_id=encode_message_cursor(message)
+        )
+    
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
+        self.get_conversation_queryset().touch()
+        invalidate_conversation(self.kwargs.get('conversation_pk'))
+    
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        attachment_count = instance.attachments.count()
+        instance.delete()
+        self.get_conversation_queryset().forget_message(attachment_count=attachment_count)
+        invalidate_conversation(self.kwargs.get('conversation_pk'))
 
-class AttachmentViewSet(viewsets.ModelViewSet):
+class AttachmentViewSet(ValuesReadMixin, viewsets.ModelViewSet):
     """
     API endpoint for file attachments
     """
     serializer_class = AttachmentSerializer
+    values_serializer_class = AttachmentValuesSerializer
+    pagination_class = AttachmentCursorPagination
     parser_classes = [MultiPartParser, FormParser]
     
     def get_queryset(self):
@@ -134,10 +369,167 @@ class AttachmentViewSet(viewsets.ModelViewSet):
             )
         
         # Save attachment with file metadata
-        serializer.save(
+        # (no transaction: it would hold the write lock during the storage upload)
+        attachment = serializer.save(
             message=message,
             file=file_obj,
             filename=file_obj.name,
             file_size=file_obj.size,
             content_type=file_obj.content_type or 'application/octet-stream'
-        )
\ No newline at end of file
+        )
+        self.attachment_created(attachment, message)
+    
+    @transaction.atomic
+    def attachment_created(self, attachment, message):
+        Conversation.objects.filter(pk=message.conversation_id).record_attachments(1, at=attachment.uploaded_at)
+        invalidate_conversation(message.conversation_id)
+        schedule_thumbnail(attachment)
+    
+    def get_message(self):
+        return get_object_or_404(
+            Message, id=self.kwargs.get('message_pk'), conversation_id=self.kwargs.get('conversation_pk')
+        )
+    
+    @action(detail=True, methods=['get'], renderer_classes=[JSONRenderer, PassthroughRenderer])
+    def download(self, request, **kwargs):
+        """
+        Stream the file from storage in chunks. Supports single byte ranges
+        (resumable downloads), If-Range, ETag and Last-Modified validators.
+        Use ?inline=1 to display in the browser instead of downloading.
+        """
+        attachment = self.get_object()
+        store = get_object_store()
+        info = store.stat(attachment.file.name)
+        if info is None:
+            raise Http404
+        as_attachment = request.query_params.get('inline') not in ('1', 'true')
+        return download_response(request, attachment, store, info, as_attachment=as_attachment)
+    
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, FormParser])
+    def presign(self, request, **kwargs):
+        """
+        Start a direct upload: returns a presigned PUT URL for the object
+        storage and a token to finalize the attachment with afterwards
+        """
+        message = self.get_message()
+        serializer = AttachmentUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data
+        
+        # Unique prefix so concurrent uploads of the same filename can't collide
+        file_field = Attachment._meta.get_field('file')
+        object_name = file_field.generate_filename(None, f"{uuid.uuid4().hex}/{upload['filename']}")
+        # The filename alone may use the whole column; the stored name must fit too
+        object_name = fit_object_name(object_name, file_field.max_length)
+        
+        expires_in = settings.SUPPORT_UPLOAD_URL_EXPIRY
+        try:
+            upload_url = get_object_store().presigned_put_url(object_name, expires_in)
+        except DirectUploadNotSupported:
+            return Response(
+                {'error': 'Direct uploads are not supported by the storage backend'},
+                status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+        
+        upload_token = signing.dumps({
+            'message': str(message.id),
+            'object_name': object_name,
+            'filename': upload['filename'],
+            'content_type': upload['content_type'],
+        }, salt='support.attachment-upload')
+        
+        return Response({
+            'upload_url': upload_url,
+            'method': 'PUT',
+            'headers': {'Content-Type': upload['content_type']},
+            'object_name': object_name,
+            'upload_token': upload_token,
+            'expires_in': expires_in,
+        }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, FormParser])
+    def finalize(self, request, **kwargs):
+        """
+        Record the attachment once the client finished its direct upload
+        """
+        message = self.get_message()
+        serializer = AttachmentFinalizeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        try:
+            upload = signing.loads(
+                serializer.validated_data['upload_token'], salt='support.attachment-upload',
+                max_age=settings.SUPPORT_UPLOAD_URL_EXPIRY * 2
+            )
+        except signing.BadSignature:
+            return Response({'error': 'Invalid or expired upload token'}, status=status.HTTP_400_BAD_REQUEST)
+        if upload['message'] != str(message.id):
+            return Response({'error': 'Upload token belongs to another message'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Finalizing twice returns the attachment recorded the first time
+        existing = Attachment.objects.filter(message=message, file=upload['object_name']).first()
+        if existing:
+            return Response(AttachmentSerializer(existing, context=self.get_serializer_context()).data)
+        
+        info = get_object_store().stat(upload['object_name'])
+        if info is None:
+            return Response({'error': 'Uploaded object not found'}, status=status.HTTP_400_BAD_REQUEST)
+        if info.size > settings.SUPPORT_ATTACHMENT_MAX_SIZE:
+            get_object_store().storage.delete(upload['object_name'])
+            return Response(
+                {'error': f'Attachments are limited to {settings.SUPPORT_ATTACHMENT_MAX_SIZE} bytes'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        attachment = Attachment.objects.create(
+            message=message,
+            file=upload['object_name'],
+            filename=upload['filename'],
+            file_size=info.size,
+            content_type=info.content_type or upload['content_type'],
+        )
+        self.attachment_created(attachment, message)
+        
+        return Response(
+            AttachmentSerializer(attachment, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED
+        )
+    
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        conversation_id = Message.objects.values_list('conversation_id', flat=True).get(pk=instance.message_id)
+        instance.delete()
+        Conversation.objects.filter(pk=conversation_id).record_attachments(-1)
+        invalidate_conversation(conversation_id)
+
+class ConversationSearchView(APIView):
+    """
+    Full-text search: conversations ranked by how well their messages match ``q``
+    """
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'Search query is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', settings.SUPPORT_SEARCH_PAGE_SIZE))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, settings.SUPPORT_SEARCH_MAX_RESULTS))
+        
+        hits = search_conversations(
+            query, limit,
+            session_key=request.query_params.get('session_key'),
+            status=request.query_params.get('status'),
+        )
+        to_uuid = Conversation._meta.pk.to_python
+        ranks = {to_uuid(conversation_id): rank for conversation_id, rank in hits}
+        conversations = Conversation.objects.filter(pk__in=ranks).with_summary().in_bulk()
+        results = []
+        for conversation_id, rank in ranks.items():
+            conversation = conversations.get(conversation_id)
+            if conversation is not None:
+                conversation.rank = rank
+                results.append(conversation)
+        
+        serializer = ConversationSearchResultSerializer(results, many=True, context={'request': request})
+        return Response({'query': query, 'results': serializer.data})
@@ -7,5 +7,10 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='tasks_task_created_id_idx'),
+        ]
+
     def __str__(self):
         return self.title
\ No newline at end of file
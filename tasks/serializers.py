@@ -1,8 +1,18 @@
 from rest_framework import serializers
+
+from core.metrics import TimedDataMixin, TimedListSerializer
+from core.serializers import ValuesSerializer
 from .models import Task
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(TimedDataMixin, serializers.ModelSerializer):
     class Meta:
         model = Task
+        list_serializer_class = TimedListSerializer
         fields = ['id', 'title', 'description', 'completed', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at']
\ No newline at end of file
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+class TaskValuesSerializer(ValuesSerializer):
+    """
+    TaskSerializer output for list/retrieve, read from ``.values()`` rows
+    """
+    serializer_class = TaskSerializer
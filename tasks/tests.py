@@ -1,3 +1,260 @@
-from django.test import TestCase
+import random
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.randomized import random_datetime, random_text
+
+from .models import Task
+from .pagination import TaskCursorPagination
+from .serializers import TaskSerializer, TaskValuesSerializer
+
+
+class TaskPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.tasks = [Task.objects.create(title=f'Task {i}') for i in range(5)]
+
+    def test_tasks_are_paged_newest_first_without_count(self):
+        response = self.client.get(reverse('task-list'), {'page_size': 2})
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertNotIn('count', body)
+        self.assertEqual([row['title'] for row in body['results']], ['Task 4', 'Task 3'])
+
+        titles = [row['title'] for row in body['results']]
+        while body['next']:
+            body = self.client.get(body['next']).json()
+            titles.extend(row['title'] for row in body['results'])
+        self.assertEqual(titles, [f'Task {i}' for i in reversed(range(5))])
+
+    def test_page_order_walks_the_index(self):
+        plan = Task.objects.order_by(*TaskCursorPagination.ordering).explain()
+
+        self.assertNotIn('TEMP B-TREE', plan)
+        self.assertNotRegex(plan, r'\bSort\b')
+
+
+class TaskConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.task = Task.objects.create(title='Cached')
+
+    def test_list_answers_304_until_a_task_changes(self):
+        url = reverse('task-list')
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.client.patch(reverse('task-detail', args=[self.task.id]), {'completed': True}, format='json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail_answers_304(self):
+        url = reverse('task-detail', args=[self.task.id])
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True)
+class TaskCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.task = Task.objects.create(title='Cached')
+        self.url = reverse('task-detail', args=[self.task.id])
+
+    def test_detail_hit_skips_serialization_queries(self):
+        self.client.get(self.url)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.json()['title'], 'Cached')
+
+    def test_update_and_delete_invalidate(self):
+        list_url = reverse('task-list')
+        self.client.get(self.url)
+        self.client.get(list_url)
+
+        self.client.patch(self.url, {'title': 'Renamed'}, format='json')
+        self.assertEqual(self.client.get(self.url).json()['title'], 'Renamed')
+        self.assertEqual(self.client.get(list_url).json()['results'][0]['title'], 'Renamed')
+
+        self.client.delete(self.url)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.get(list_url).json()['results'], [])
+
+    def test_stale_hit_keeps_its_own_etag(self):
+        first = self.client.get(self.url)
+        # A write another worker handled: this worker's cache isn't invalidated
+        Task.objects.filter(pk=self.task.pk).update(title='Elsewhere', updated_at=timezone.now())
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'Cached')
+        self.assertEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response['Last-Modified'], first['Last-Modified'])
+
+
+class TaskBulkTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.url = reverse('task-bulk')
+
+    def test_bulk_create_uses_one_insert(self):
+        payload = [{'title': f'Imported {i}'} for i in range(100)]
+
+        # savepoint, insert, release
+        with self.assertNumQueries(3):
+            response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        results = response.json()['results']
+        self.assertEqual(len(results), 100)
+        self.assertEqual(results[0]['status'], 'created')
+        self.assertIsNotNone(results[0]['data']['id'])
+        self.assertEqual(Task.objects.count(), 100)
+
+    def test_bulk_create_is_all_or_nothing(self):
+        response = self.client.post(self.url, [{'title': 'Fine'}, {'completed': True}], format='json')
+
+        self.assertEqual(response.status_code, 400)
+        results = response.json()['results']
+        self.assertEqual(results[0]['status'], 'skipped')
+        self.assertIn('title', results[1]['errors'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_bulk_update(self):
+        tasks = [Task.objects.create(title=f'Task {i}') for i in range(3)]
+        detail_url = reverse('task-detail', args=[tasks[0].id])
+        self.client.get(detail_url)
+
+        response = self.client.patch(
+            self.url, [{'id': task.id, 'completed': True} for task in tasks], format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['status'] for row in response.json()['results']], ['updated'] * 3)
+        self.assertEqual(Task.objects.filter(completed=True).count(), 3)
+        self.assertGreater(Task.objects.get(id=tasks[0].id).updated_at, tasks[0].updated_at)
+        self.assertTrue(self.client.get(detail_url).json()['completed'])
+
+    def test_bulk_update_reports_missing_tasks(self):
+        task = Task.objects.create(title='Task')
+
+        response = self.client.patch(
+            self.url, [{'id': task.id, 'title': 'Renamed'}, {'id': 999999, 'title': 'Ghost'}, {'title': 'No id'}],
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [row['status'] for row in response.json()['results']], ['skipped', 'not_found', 'error']
+        )
+        task.refresh_from_db()
+        self.assertEqual(task.title, 'Task')
+
+    def test_bulk_update_rejects_boolean_ids(self):
+        Task.objects.create(id=1, title='Task')
+
+        response = self.client.patch(self.url, [{'id': True, 'title': 'Renamed'}], format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['results'][0]['status'], 'error')
+        self.assertEqual(Task.objects.get(id=1).title, 'Task')
+
+    def test_bulk_delete(self):
+        tasks = [Task.objects.create(title=f'Task {i}') for i in range(3)]
+
+        response = self.client.delete(self.url, {'ids': [tasks[0].id, tasks[1].id, 999999]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row['status'] for row in response.json()['results']], ['deleted', 'deleted', 'not_found']
+        )
+        self.assertEqual(list(Task.objects.values_list('id', flat=True)), [tasks[2].id])
+
+    def test_bulk_delete_invalidates_once(self):
+        tasks = [Task.objects.create(title=f'Task {i}') for i in range(50)]
+        detail_url = reverse('task-detail', args=[tasks[0].id])
+
+        with mock.patch('core.cache.bump') as bump:
+            # savepoint, lock ids, collect rows for the delete signals, delete, release
+            with self.assertNumQueries(5):
+                self.client.delete(self.url, {'ids': [task.id for task in tasks]}, format='json')
+
+        bump.assert_called_once_with('tasks', *(f'task:{task.id}' for task in tasks))
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(self.client.get(detail_url).status_code, 404)
+
+    def test_bulk_delete_accepts_query_param(self):
+        task = Task.objects.create(title='Task')
+
+        response = self.client.delete(f'{self.url}?ids={task.id}')
+
+        self.assertEqual(response.json()['results'], [{'id': task.id, 'status': 'deleted'}])
+
+    def test_bulk_requests_are_bounded(self):
+        response = self.client.post(self.url, [{'title': 'x'}] * 1001, format='json')
+
+        self.assertEqual(response.status_code, 400)
+
+
+class TaskValuesSerializerTests(TestCase):
+    """
+    Randomized check that TaskValuesSerializer renders the same bytes as
+    TaskSerializer
+    """
+    def test_tasks_render_identically(self):
+        renderer = JSONRenderer()
+        for seed in range(20):
+            rng = random.Random(seed)
+            Task.objects.all().delete()
+            for _ in range(rng.randint(1, 15)):
+                task = Task.objects.create(
+                    title=random_text(rng, 200),
+                    description=rng.choice([None, '', random_text(rng, 500)]),
+                    completed=rng.random() < 0.5,
+                )
+                Task.objects.filter(pk=task.pk).update(
+                    created_at=random_datetime(rng), updated_at=random_datetime(rng)
+                )
+            tasks = Task.objects.order_by(*TaskCursorPagination.ordering)
+            with self.subTest(seed=seed):
+                rows = TaskValuesSerializer.values(tasks)
+                self.assertEqual(
+                    renderer.render(TaskValuesSerializer(rows, many=True).data),
+                    renderer.render(TaskSerializer(tasks, many=True).data),
+                )
+                self.assertEqual(
+                    renderer.render(TaskValuesSerializer(rows[0]).data), renderer.render(TaskSerializer(tasks[0]).data)
+                )
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_list_and_detail_responses_are_unchanged(self):
+        task = Task.objects.create(title='Fast', description=None)
+        Task.objects.create(title='Path', description='ü')
+        client = APIClient()
+        for url in (reverse('task-list'), reverse('task-detail', args=[task.pk])):
+            fast = client.get(url)
+            with mock.patch('tasks.views.TaskViewSet.values_serializer_class', None):
+                slow = client.get(url)
+            self.assertEqual(fast.status_code, 200)
+            self.assertEqual(fast.content, slow.content)
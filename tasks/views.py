@@ -1,13 +1,160 @@
-from rest_framework import viewsets
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from core.cache import CachedResponseMixin, invalidate, mute_invalidation
+from core.conditional import ConditionalGetMixin
+from core.serializers import ValuesReadMixin
 from .models import Task
-from .serializers import TaskSerializer
+from .pagination import TaskCursorPagination
+from .serializers import TaskSerializer, TaskValuesSerializer
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ValuesReadMixin, ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows tasks to be viewed or edited.
     """
     queryset = Task.objects.all().order_by('-created_at')
     serializer_class = TaskSerializer
+    values_serializer_class = TaskValuesSerializer
+    pagination_class = TaskCursorPagination
     permission_classes = [AllowAny]
-    authentication_classes = []
\ No newline at end of file
+    authentication_classes = []
+
+    # Upper bound on items per bulk request
+    bulk_max_items = 1000
+
+    def get_cache_namespaces(self, detail):
+        if detail:
+            return [f"task:{self.kwargs['pk']}"]
+        return ['tasks']
+
+    def get_bulk_items(self, request):
+        """
+        Return the list payload of a bulk request, or an error response
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return None, Response(
+                {'error': 'Expected a non-empty list of tasks'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > self.bulk_max_items:
+            return None, Response(
+                {'error': f'At most {self.bulk_max_items} tasks per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return items, None
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create many tasks with a single INSERT
+        """
+        items, error = self.get_bulk_items(request)
+        if error:
+            return error
+
+        serializer = self.get_serializer(data=items, many=True)
+        if not serializer.is_valid():
+            return Response({'results': [
+                {'index': index, 'status': 'error', 'errors': errors} if errors
+                else {'index': index, 'status': 'skipped'}
+                for index, errors in enumerate(serializer.errors)
+            ]}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            tasks = Task.objects.bulk_create([Task(**attrs) for attrs in serializer.validated_data])
+            invalidate('tasks')
+
+        return Response({'results': [
+            {'index': index, 'status': 'created', 'data': TaskSerializer(task).data}
+            for index, task in enumerate(tasks)
+        ]}, status=status.HTTP_201_CREATED)
+
+    @bulk.mapping.patch
+    def bulk_update(self, request):
+        """
+        Partially update many tasks; every item must carry its id
+        """
+        items, error = self.get_bulk_items(request)
+        if error:
+            return error
+
+        ids = [item.get('id') if isinstance(item, dict) else None for item in items]
+        # bool is an int subclass, but true/false aren't task ids
+        ids = [None if isinstance(task_id, bool) else task_id for task_id in ids]
+        tasks = Task.objects.in_bulk([task_id for task_id in ids if isinstance(task_id, int)])
+
+        results, serializers, seen = [], [], set()
+        for index, (item, task_id) in enumerate(zip(items, ids)):
+            if not isinstance(task_id, int):
+                results.append({'index': index, 'status': 'error', 'errors': {'id': ['A task id is required.']}})
+            elif task_id in seen:
+                results.append({'index': index, 'id': task_id, 'status': 'error', 'errors': {'id': ['Duplicate id.']}})
+            elif task_id not in tasks:
+                results.append({'index': index, 'id': task_id, 'status': 'not_found'})
+            else:
+                serializer = self.get_serializer(tasks[task_id], data=item, partial=True)
+                if serializer.is_valid():
+                    serializers.append(serializer)
+                    results.append({'index': index, 'id': task_id, 'status': 'skipped'})
+                else:
+                    results.append({'index': index, 'id': task_id, 'status': 'error', 'errors': serializer.errors})
+            seen.add(task_id)
+
+        if len(serializers) != len(items):
+            return Response({'results': results}, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        fields = {'updated_at'}
+        for serializer in serializers:
+            for attr, value in serializer.validated_data.items():
+                setattr(serializer.instance, attr, value)
+                fields.add(attr)
+            serializer.instance.updated_at = now
+
+        with transaction.atomic():
+            Task.objects.bulk_update([serializer.instance for serializer in serializers], sorted(fields))
+            invalidate('tasks', *(f'task:{task_id}' for task_id in ids))
+
+        return Response({'results': [
+            {'index': index, 'id': serializer.instance.id, 'status': 'updated', 'data': TaskSerializer(serializer.instance).data}
+            for index, serializer in enumerate(serializers)
+        ]})
+
+    @bulk.mapping.delete
+    def bulk_destroy(self, request):
+        """
+        Delete tasks by id list, given as {"ids": [...]} or ?ids=1,2,3
+        """
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if ids is None and request.query_params.get('ids'):
+            ids = request.query_params['ids'].split(',')
+        try:
+            ids = [int(task_id) for task_id in ids]
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'Expected "ids" as a list of task ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not ids or len(ids) > self.bulk_max_items:
+            return Response(
+                {'error': f'Between 1 and {self.bulk_max_items} ids per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic():
+            # Locked, so the rows reported as deleted are the ones deleted
+            existing = set(Task.objects.select_for_update().filter(id__in=ids).values_list('id', flat=True))
+            # The post_delete receiver would bump the cache per row; bump once
+            with mute_invalidation():
+                Task.objects.filter(id__in=existing).delete()
+            invalidate('tasks', *(f'task:{task_id}' for task_id in existing))
+
+        return Response({'results': [
+            {'id': task_id, 'status': 'deleted' if task_id in existing else 'not_found'}
+            for task_id in ids
+        ]})
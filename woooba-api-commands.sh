@@ -131,7 +131,7 @@ done
 run_test "Response Time" \
   "time curl -s -X GET \"${BASE_URL}/tasks/v1/\"" \
   "" \
-  "jq 'length > 5' > /dev/null && echo true"
+  "jq '.results | length > 5' > /dev/null && echo true"
 
 # Print summary
 echo "========== Test Summary =========="